@@ -0,0 +1,357 @@
+"""
+Write-behind audit log: who changed what, with a before/after diff.
+
+Changes are captured from the ORM session, so every router is covered
+without calling anything:
+
+- ORM writes (add / attribute change / delete) are read in `after_flush`:
+  `create` stores the new row, `update` only the changed columns as
+  before/after, `delete` the row as it was loaded.
+- Bulk statements (`db.execute(delete(...) / update(...) / insert(...))`,
+  the cascades in delete_member, delete_user, delete_schedule) become one
+  entry per statement with its WHERE clause, the SET values, the affected
+  row count and, for DELETE/UPDATE, a before-image of the affected rows.
+
+All entries of one transaction share a `txn_id`, so the cascade of a
+delete can be found from the entity it started from (/admin/audit with
+entity and entity_id returns the whole transaction).
+
+Cost on the write path: the audit insert itself is off the request, but a
+before-image is one extra SELECT with the statement's WHERE, run in the
+request's transaction right before each bulk DELETE/UPDATE (several for
+the cascades above). It reads at most AUDIT_MAX_ROWS rows; larger
+statements keep the first ones and set `"truncated": true`.
+AUDIT_BEFORE_IMAGES=0 turns the SELECT off (WHERE and count only).
+Attendance never gets one: its rows are recorded when inserted, and
+sheets are rewritten in full on every save.
+
+Bulk maintenance that only moves data (the message archive job,
+retention.py) turns capture off for its session with `skipped()` and
+writes one summary entry per batch with `record()` instead of copying
+every row into the log.
+
+Entries wait on the session until the transaction commits (a rollback
+drops them), then go to an in-memory queue. A background task writes the
+queue to `audit_log` in batches every AUDIT_FLUSH_SECONDS, so the request
+never waits for the audit insert. The queue is bounded (AUDIT_QUEUE_SIZE);
+if the database stays unreachable long enough to fill it, the oldest
+entries are dropped and counted in `stats`. Entries still queued when a
+worker is killed are lost; a normal shutdown flushes them.
+
+Capture is active only while the flusher runs (started from the app
+lifespan), so scripts using SessionLocal are not audited.
+"""
+
+import asyncio
+import enum
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, insert, inspect, select
+from sqlalchemy.orm import Session
+
+import database, models
+
+# ── Configuration ────────────────────────────────────────────
+AUDIT_ENABLED = os.getenv("AUDIT_LOG", "1") == "1"
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", 1))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 500))
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", 50000))
+AUDIT_MAX_ROWS = int(os.getenv("AUDIT_MAX_ROWS", 500))  # Rows kept per bulk statement entry
+AUDIT_BEFORE_IMAGES = os.getenv("AUDIT_BEFORE_IMAGES", "1") == "1"
+
+# Bookkeeping tables, and token material
+EXCLUDED_TABLES = {
+    "audit_log", "job_locks", "job_runs", "collection_versions", "refresh_tokens", "token_revocations",
+}
+# Bulk DELETE/UPDATE on these records WHERE and count only, no before-image
+SUMMARY_ONLY_TABLES = {"attendance"}
+REDACTED_COLUMNS = {"hashed_password", "token_hash"}
+
+logger = logging.getLogger("audit")
+
+# "DELETE /members/5" for API requests, "job:<name>" for periodic jobs
+current_source: ContextVar[Optional[str]] = ContextVar("audit_source", default=None)
+
+stats = {"queued": 0, "written": 0, "dropped": 0, "failed_batches": 0}
+
+_queue: deque = deque()
+_queue_lock = threading.Lock()
+_flusher_task: Optional[asyncio.Task] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_wakeup: Optional[asyncio.Event] = None
+
+
+def capturing() -> bool:
+    return _flusher_task is not None
+
+
+# ── Values ───────────────────────────────────────────────────
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return None
+    return value
+
+
+def _clean(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: "***" if k in REDACTED_COLUMNS else _jsonable(v) for k, v in row.items()}
+
+
+def _loaded_columns(obj) -> Dict[str, Any]:
+    """Column values already loaded on the object (never triggers a load)."""
+    state = inspect(obj)
+    return _clean({a.key: state.dict[a.key] for a in state.mapper.column_attrs if a.key in state.dict})
+
+
+def _entity_id(obj) -> Optional[str]:
+    # New objects get their identity key only after the flush; read the PK columns
+    key = inspect(obj).mapper.primary_key_from_instance(obj)
+    if any(v is None for v in key):
+        return None
+    return ",".join(str(v) for v in key)
+
+
+def _entry(action: str, entity: str, entity_id: Optional[str], changes: dict) -> dict:
+    return {
+        "created_at": datetime.utcnow(),
+        "actor_id": database.current_user_id.get(),
+        "source": current_source.get(),
+        "action": action,
+        "entity": entity,
+        "entity_id": entity_id,
+        "changes": changes,
+        "_tenant": database.current_tenant.get(),
+    }
+
+
+def _pending(session: Session) -> List[dict]:
+    return session.info.setdefault("audit_pending", [])
+
+
+def _captured(session: Session) -> bool:
+    return capturing() and not session.info.get("audit_skip")
+
+
+@contextmanager
+def skipped(session: Session):
+    """Writes of the session inside the block are not captured; record() a summary instead."""
+    session.info["audit_skip"] = True
+    try:
+        yield
+    finally:
+        session.info.pop("audit_skip", None)
+
+
+def record(session: Session, action: str, entity: str, changes: dict, entity_id: Optional[str] = None):
+    """Adds an entry by hand; like captured ones, it is kept only if the transaction commits."""
+    if capturing():
+        _pending(session).append(_entry(action, entity, entity_id, _clean(changes)))
+
+
+# ── Capture: ORM flush ───────────────────────────────────────
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context):
+    if not _captured(session):
+        return
+    pending = _pending(session)
+    for obj in session.new:
+        table = inspect(obj).mapper.local_table.name
+        if table not in EXCLUDED_TABLES:
+            pending.append(_entry("create", table, _entity_id(obj), {"after": _loaded_columns(obj)}))
+
+    for obj in session.dirty:
+        state = inspect(obj)
+        table = state.mapper.local_table.name
+        if table in EXCLUDED_TABLES or not session.is_modified(obj):
+            continue
+        before, after = {}, {}
+        for attr in state.mapper.column_attrs:
+            history = state.attrs[attr.key].history
+            if history.added or history.deleted:
+                before[attr.key] = history.deleted[0] if history.deleted else None
+                after[attr.key] = history.added[0] if history.added else None
+        if after:
+            pending.append(_entry("update", table, _entity_id(obj), {"before": _clean(before), "after": _clean(after)}))
+
+    for obj in session.deleted:
+        table = inspect(obj).mapper.local_table.name
+        if table not in EXCLUDED_TABLES:
+            pending.append(_entry("delete", table, _entity_id(obj), {"before": _loaded_columns(obj)}))
+
+
+# ── Capture: bulk statements ─────────────────────────────────
+def _where(statement) -> Dict[str, Any]:
+    if statement.whereclause is None:
+        return {}
+    compiled = statement.whereclause.compile()
+    return {"where": str(compiled), "params": _clean(compiled.params)}
+
+
+def _rows(rows) -> Dict[str, Any]:
+    rows = list(rows)
+    out: Dict[str, Any] = {"rows": [_clean(dict(row)) for row in rows[:AUDIT_MAX_ROWS]]}
+    if len(rows) > AUDIT_MAX_ROWS:
+        out["truncated"] = True
+    return out
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(orm_execute_state):
+    if not _captured(orm_execute_state.session) or not (
+        orm_execute_state.is_delete or orm_execute_state.is_update or orm_execute_state.is_insert
+    ):
+        return None
+    statement = orm_execute_state.statement
+    table = statement.table
+    if table.name in EXCLUDED_TABLES:
+        return None
+
+    changes: Dict[str, Any] = {}
+    if orm_execute_state.is_insert:
+        params = orm_execute_state.parameters
+        rows = _rows(params if isinstance(params, list) else [params] if params else [])
+        changes["after"], changes["truncated"] = rows["rows"], rows.get("truncated")
+    else:
+        changes = _where(statement)
+        if orm_execute_state.is_update:
+            # SET values: the statement's bind params minus the WHERE ones
+            params = statement.compile().params
+            changes["after"] = _clean({k: v for k, v in params.items() if k not in changes.get("params", {})})
+        if AUDIT_BEFORE_IMAGES and table.name not in SUMMARY_ONLY_TABLES:
+            query = select(*table.c).limit(AUDIT_MAX_ROWS + 1)
+            if statement.whereclause is not None:
+                query = query.where(statement.whereclause)
+            before = _rows(orm_execute_state.session.execute(query).mappings())
+            changes["before"], changes["truncated"] = before["rows"], before.get("truncated")
+    if not changes.get("truncated"):
+        changes.pop("truncated", None)
+
+    result = orm_execute_state.invoke_statement()
+    changes["count"] = getattr(result, "rowcount", None)
+    action = "delete" if orm_execute_state.is_delete else "update" if orm_execute_state.is_update else "create"
+    _pending(orm_execute_state.session).append(_entry(action, table.name, None, changes))
+    return result
+
+
+# ── Transaction end ──────────────────────────────────────────
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session):
+    entries = session.info.pop("audit_pending", None)
+    if entries:
+        txn_id = uuid.uuid4().hex[:16]
+        for entry in entries:
+            entry["txn_id"] = txn_id
+        enqueue(entries)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session):
+    session.info.pop("audit_pending", None)
+
+
+def enqueue(entries: List[dict]):
+    with _queue_lock:
+        overflow = len(_queue) + len(entries) - AUDIT_QUEUE_SIZE
+        for _ in range(max(0, overflow)):
+            _queue.popleft()
+        stats["dropped"] += max(0, overflow)
+        _queue.extend(entries)
+        stats["queued"] += len(entries)
+        full = len(_queue) >= AUDIT_BATCH_SIZE
+    if full and _loop is not None:
+        _loop.call_soon_threadsafe(_wakeup.set)
+
+
+# ── Flusher ──────────────────────────────────────────────────
+async def _write(tenant: Optional[str], rows: List[dict]):
+    token = database.current_tenant.set(tenant)
+    try:
+        async with database.primary_session() as db:
+            await db.execute(insert(models.AuditLog), rows)
+            await db.commit()
+    finally:
+        database.current_tenant.reset(token)
+
+
+async def flush():
+    """Writes everything queued so far, one batch per club at a time."""
+    while True:
+        with _queue_lock:
+            batch = [_queue.popleft() for _ in range(min(AUDIT_BATCH_SIZE, len(_queue)))]
+        if not batch:
+            return
+        by_tenant: Dict[Optional[str], List[dict]] = {}
+        for entry in batch:
+            entry = dict(entry)
+            by_tenant.setdefault(entry.pop("_tenant"), []).append(entry)
+        for tenant, rows in by_tenant.items():
+            try:
+                await _write(tenant, rows)
+                stats["written"] += len(rows)
+            except Exception:
+                logger.exception("Audit flush failed, %d entries go back to the queue", len(rows))
+                stats["failed_batches"] += 1
+                enqueue([dict(r, _tenant=tenant) for r in rows])
+                return  # Retry on the next tick
+
+
+async def _flusher():
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=AUDIT_FLUSH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+        await flush()
+
+
+def start():
+    global _flusher_task, _loop, _wakeup
+    if AUDIT_ENABLED and _flusher_task is None:
+        _loop = asyncio.get_running_loop()
+        _wakeup = asyncio.Event()
+        _flusher_task = _loop.create_task(_flusher())
+
+
+async def stop():
+    """Stops the flusher after writing what is still queued."""
+    global _flusher_task, _loop
+    if _flusher_task is None:
+        return
+    _flusher_task.cancel()
+    await asyncio.gather(_flusher_task, return_exceptions=True)
+    _flusher_task = None
+    await flush()
+    _loop = None
+
+
+# ── Request source ───────────────────────────────────────────
+class AuditSourceMiddleware:
+    """Records "METHOD /path" as the source of changes made by a request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+        token = current_source.set(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_source.reset(token)
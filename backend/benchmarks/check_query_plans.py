@@ -0,0 +1,171 @@
+"""
+Query-plan regression check: EXPLAIN every SELECT the hot endpoints issue.
+
+Calls each endpoint in-process (httpx + ASGITransport) against a seeded
+database, captures the statements it executes and runs EXPLAIN on each of
+them with the same parameters. Exits with status 1 when a plan reads a
+table front to back:
+
+- SQLite: `SCAN <table>` without an index in EXPLAIN QUERY PLAN
+- Postgres: `Seq Scan on <table>`, with enable_seqscan off so the planner
+  picks an index whenever a usable one exists, even on a small dataset
+
+Tables that are small by nature, and endpoints that return (almost) the
+whole table, are listed with the reason the scan is expected.
+
+    python benchmarks/check_query_plans.py                # temporary SQLite database
+    python benchmarks/check_query_plans.py --verbose      # print every plan
+    DATABASE_URL=postgresql://.../plans_check python benchmarks/check_query_plans.py
+
+The Postgres database must be empty; it is migrated and seeded.
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import shutil
+import sys
+import tempfile
+from datetime import date
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+_TMP_DIR = None
+if not os.getenv("DATABASE_URL"):
+    _TMP_DIR = tempfile.mkdtemp(prefix="plans-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'plans.db')}"
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_TMP_DIR or tempfile.gettempdir(), "uploads"))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from sqlalchemy import event  # noqa: E402
+
+import database, migrations  # noqa: E402
+import dataset  # noqa: E402
+import utils as auth  # noqa: E402
+
+# Scanning these is fine: one row per group/skill, a few hundred at most
+SMALL_TABLES = {"schedules", "skills", "schedule_cancellations"}
+
+_SQLITE_SCAN_RE = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+_PG_SCAN_RE = re.compile(r"Seq Scan on (\w+)")
+
+
+def cases(today: date):
+    """(name, role, method, path, json body, {table: why a scan is expected})"""
+    d = today.isoformat()
+    whole_members = {"members": "returns every (active) member"}
+    return [
+        ("attendance_sheet", "coach", "GET", f"/attendance/schedule/{dataset.BUSY_SCHEDULE_ID}/date/{d}", None, {}),
+        ("attendance_batch", "coach", "POST", "/attendance/batch",
+         {"schedule_id": dataset.BUSY_SCHEDULE_ID, "date": d, "member_ids": [1]}, {}),
+        ("attendance_stats", "owner", "GET", f"/attendance/stats/1?month={today.month}&year={today.year}", None, {}),
+        ("debtors", "owner", "GET", f"/payments/debtors?month={today.month}&year={today.year}", None, whole_members),
+        ("yearly_summary", "owner", "GET", f"/payments/yearly-summary?year={today.year}", None, {}),
+        ("payment_status", "owner", "GET", "/payments/status/1", None, {}),
+        ("payment_history", "owner", "GET", "/payments/history", None, {}),
+        ("members_mine", "parent", "GET", "/members/mine", None, {}),
+        ("members_all", "owner", "GET", "/members/all", None, whole_members),
+        ("messages_parent", "parent", "GET", "/messages/", None, {}),
+        ("messages_staff", "owner", "GET", "/messages/", None, {}),
+        ("read_schedules", "parent", "GET", "/schedules/", None, {}),
+        ("member_enrollments", "parent", "GET", "/schedules/members/1/enrollments", None, {}),
+        ("dashboard_stats", "owner", "GET", "/dashboard/stats", None,
+         {"members": "counts every active member"}),
+        ("dashboard_today", "owner", "GET", "/dashboard/today-schedules", None, {}),
+    ]
+
+
+# ── Plans ────────────────────────────────────────────────────
+async def explain(conn, statement: str, parameters):
+    """Plan lines and the tables read with a full scan."""
+    if conn.dialect.name == "postgresql":
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        try:
+            rows = (await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)).all()
+        finally:
+            await conn.exec_driver_sql("RESET enable_seqscan")
+        lines = [r[0] for r in rows]
+        scans = [m.group(1) for line in lines for m in [_PG_SCAN_RE.search(line)] if m]
+    else:
+        rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+        lines = [r[-1] for r in rows]
+        scans = [m.group(1) for line in lines for m in [_SQLITE_SCAN_RE.match(line)] if m]
+    return lines, scans
+
+
+async def check(verbose: bool) -> list:
+    import httpx
+    from main import app
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(database.async_engine.sync_engine, "before_cursor_execute", capture)
+
+    tokens = {
+        role: auth.create_access_token({"sub": email, "uid": user_id})
+        for role, email, user_id in [
+            ("owner", dataset.OWNER_EMAIL, dataset.OWNER_ID),
+            ("coach", dataset.COACH_EMAIL, dataset.COACH_ID),
+            ("parent", dataset.PARENT_EMAIL, dataset.PARENT_ID),
+        ]
+    }
+
+    failures = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://plans") as client:
+        for name, role, method, path, body, allowed in cases(date.today()):
+            captured.clear()
+            resp = await client.request(method, path, json=body, headers={"Authorization": f"Bearer {tokens[role]}"})
+            resp.raise_for_status()
+            statements = list(captured)
+
+            case_failures = []
+            async with database.async_engine.connect() as conn:
+                for statement, parameters in statements:
+                    lines, scans = await explain(conn, statement, parameters)
+                    bad = [t for t in scans if t not in SMALL_TABLES and t not in allowed]
+                    if verbose or bad:
+                        print(f"\n[{name}] {' '.join(statement.split())[:160]}")
+                        for line in lines:
+                            print(f"    {line}")
+                    case_failures += [f"{name}: full scan of {table}" for table in bad]
+            print(f"{name:<20}{len(statements):>3} statements  {'FAIL' if case_failures else 'ok'}")
+            failures += case_failures
+
+    await database.async_engine.dispose()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when a hot query falls back to a full table scan.")
+    parser.add_argument("--size", choices=sorted(dataset.SIZES), default="small")
+    parser.add_argument("--verbose", action="store_true", help="Print every plan, not only failing ones")
+    args = parser.parse_args()
+
+    try:
+        with database.engine.begin() as conn:
+            migrations.upgrade(conn)
+        dataset.seed(database.engine, dataset.SIZES[args.size])
+        failures = asyncio.run(check(args.verbose))
+    finally:
+        database.engine.dispose()
+        if _TMP_DIR:
+            shutil.rmtree(_TMP_DIR, ignore_errors=True)
+
+    if failures:
+        print("\nFull table scans:")
+        for line in failures:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nNo full table scans.")
+
+
+if __name__ == "__main__":
+    main()
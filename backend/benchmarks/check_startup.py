@@ -0,0 +1,101 @@
+"""
+Cold-start budget check: import time of `main` and time to the first HTTP response.
+
+Starts the API with uvicorn in a subprocess against a temporary SQLite
+database and polls `GET /` until it answers. The first start runs the
+migrations on an empty database, the second one starts on an already
+migrated database (the usual cold start). Exits with status 1 when the
+`import main` time or the warm start exceeds its budget; CI runs it on
+every push (.github/workflows/backend.yml).
+
+    python benchmarks/check_startup.py
+    python benchmarks/check_startup.py --budget-ms 1500 --import-budget-ms 1200 --runs 5
+"""
+
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(env: dict) -> float:
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1]) * 1000
+
+
+def measure_first_response(env: dict, timeout: float = 30.0) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"Server exited during startup:\n{proc.stderr.read().decode()}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as resp:
+                    if resp.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"No response within {timeout:g}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check API cold-start time against a budget.")
+    parser.add_argument("--budget-ms", type=float, default=2000, help="Budget for time to first response (warm DB)")
+    parser.add_argument("--import-budget-ms", type=float, default=2000, help="Budget for `import main`")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="startup-check-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp_dir, 'startup.db')}",
+               UPLOAD_DIR=os.path.join(tmp_dir, "uploads"))
+    try:
+        fresh_ms = measure_first_response(env)  # Applies all migrations
+        import_ms = statistics.median(measure_import(env) for _ in range(args.runs))
+        warm_ms = statistics.median(measure_first_response(env) for _ in range(args.runs))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"import main:                 {import_ms:8.1f} ms (median of {args.runs}, budget {args.import_budget_ms:g} ms)")
+    print(f"first response, empty DB:    {fresh_ms:8.1f} ms")
+    print(f"first response, migrated DB: {warm_ms:8.1f} ms (median of {args.runs}, budget {args.budget_ms:g} ms)")
+
+    failed = False
+    if import_ms > args.import_budget_ms:
+        print("FAIL: import time exceeds budget")
+        failed = True
+    if warm_ms > args.budget_ms:
+        print("FAIL: startup exceeds budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Seeded benchmark datasets (small / medium / large) inserted with Core bulk inserts.
+
+Every size has the same fixed accounts, so benchmarks can address them
+without lookups: user 1 is the owner, user 2 the coach and user 3 a parent
+whose two children are enrolled in schedule 1.
+"""
+
+import random
+from dataclasses import dataclass
+from datetime import date, datetime, time as dtime, timedelta
+
+from sqlalchemy import insert
+
+import models
+
+DAYS = ["PON", "UTO", "SRE", "CET", "PET", "SUB", "NED"]
+
+OWNER_ID, COACH_ID, PARENT_ID = 1, 2, 3
+OWNER_EMAIL, COACH_EMAIL, PARENT_EMAIL = "owner@bench", "coach@bench", "parent@bench"
+BUSY_SCHEDULE_ID = 1
+
+
+@dataclass(frozen=True)
+class Size:
+    members: int
+    schedules: int
+    attendance_weeks: int
+    payment_months: int
+    messages: int
+
+
+SIZES = {
+    "small": Size(members=60, schedules=10, attendance_weeks=4, payment_months=3, messages=200),
+    "medium": Size(members=1000, schedules=60, attendance_weeks=12, payment_months=6, messages=5000),
+    "large": Size(members=5000, schedules=200, attendance_weeks=20, payment_months=12, messages=30000),
+}
+
+
+def _chunks(rows, size=5000):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _insert(conn, model, rows):
+    for chunk in _chunks(rows):
+        conn.execute(insert(model), chunk)
+
+
+def seed(engine, size: Size, seed: int = 7):
+    rnd = random.Random(seed)
+    today = date.today()
+    n_parents = max(1, size.members // 2)
+
+    with engine.begin() as conn:
+        _insert(conn, models.User, [
+            {"email": OWNER_EMAIL, "full_name": "Owner", "hashed_password": "x", "role": models.Role.OWNER},
+            {"email": COACH_EMAIL, "full_name": "Coach", "hashed_password": "x", "role": models.Role.COACH},
+        ] + [
+            {"email": PARENT_EMAIL if i == 0 else f"parent{i}@bench", "full_name": f"Roditelj {i}",
+             "hashed_password": "x", "role": models.Role.PARENT, "phone_number": f"06{i:08d}"}
+            for i in range(n_parents)
+        ])
+        # Members 2k and 2k+1 belong to parent k (user id 3 + k)
+        _insert(conn, models.Member, [
+            {"parent_id": PARENT_ID + i // 2, "full_name": f"Dete {i}",
+             "date_of_birth": date(2012 + i % 8, 1 + i % 12, 1 + i % 28),
+             "notes": "Alergija" if i % 10 == 0 else None, "active": True}
+            for i in range(size.members)
+        ])
+        # Schedules cover every weekday so the dashboard always has "today" slots
+        _insert(conn, models.Schedule, [
+            {"day_of_week": DAYS[i % 7], "start_time": dtime(8 + i % 12), "end_time": dtime(9 + i % 12),
+             "coach_id": COACH_ID, "capacity": 30, "group_name": f"Grupa {i}", "location": "Bazen",
+             "is_active": True}
+            for i in range(size.schedules)
+        ])
+        enrollments = [
+            {"member_id": 1 + i, "schedule_id": 1 + (i // 2) % size.schedules,
+             "start_date": date(2024, 1, 1), "active": True}
+            for i in range(size.members)
+        ]
+        _insert(conn, models.Enrollment, enrollments)
+
+        _insert(conn, models.Attendance, [
+            {"schedule_id": e["schedule_id"], "member_id": e["member_id"], "coach_id": COACH_ID,
+             "date": today - timedelta(weeks=w), "is_present": rnd.random() < 0.85}
+            for w in range(size.attendance_weeks)
+            for e in enrollments
+        ])
+
+        payments = []
+        for m in range(size.payment_months):
+            month_start = (today.replace(day=1) - timedelta(days=31 * m)).replace(day=1)
+            for member_id in range(1, size.members + 1):
+                if m == 0 and rnd.random() < 0.2:
+                    continue  # Some members haven't paid this month yet (debtors)
+                payments.append({
+                    "member_id": member_id, "amount": 3000.0, "currency": "RSD",
+                    "payment_date": month_start + timedelta(days=4),
+                    "payment_method": models.PaymentMethod.CASH,
+                    "month": month_start.month, "year": month_start.year,
+                    "created_at": datetime.combine(month_start, dtime(12)) + timedelta(seconds=member_id),
+                })
+        _insert(conn, models.Payment, payments)
+
+        scopes = [models.MessageScope.BROADCAST_ALL, models.MessageScope.GROUP_SCHEDULE,
+                  models.MessageScope.INTERNAL_STAFF, models.MessageScope.DIRECT]
+        _insert(conn, models.Message, [
+            {"sender_id": OWNER_ID if i % 3 else COACH_ID, "content": f"Poruka {i}",
+             "scope": scopes[i % 4],
+             "target_schedule_id": 1 + i % size.schedules if i % 4 == 1 else None,
+             "recipient_id": PARENT_ID + i % n_parents if i % 4 == 3 else None,
+             "sent_at": datetime(2025, 1, 1) + timedelta(minutes=i)}
+            for i in range(size.messages)
+        ])
@@ -0,0 +1,196 @@
+"""
+Per-endpoint benchmark suite with a stored baseline.
+
+Runs the hot endpoints in-process through ASGI (httpx + ASGITransport)
+against small, medium and large seeded SQLite databases, and reports the
+median / p95 latency and the number of SQL statements per request. Each
+size runs in its own subprocess with its own database.
+
+    python benchmarks/endpoints.py                      # compare with baseline.json
+    python benchmarks/endpoints.py --sizes small medium
+    python benchmarks/endpoints.py --update-baseline    # store current results
+
+Exits with status 1 on a regression: more SQL statements than the
+baseline, or a median latency above baseline * (1 + --tolerance) (and at
+least --min-delta-ms slower, so sub-millisecond noise is ignored).
+Latencies are machine-specific; regenerate the baseline on the machine
+that runs the comparison.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+
+def cases(today: date):
+    """(name, role, method, path, json body)"""
+    d = today.isoformat()
+    return [
+        ("attendance_sheet", "coach", "GET", f"/attendance/schedule/1/date/{d}", None),
+        ("attendance_batch", "coach", "POST", "/attendance/batch",
+         {"schedule_id": 1, "date": d, "member_ids": [1]}),
+        ("debtors", "owner", "GET", f"/payments/debtors?month={today.month}&year={today.year}", None),
+        ("messages_parent", "parent", "GET", "/messages/", None),
+        ("messages_staff", "owner", "GET", "/messages/", None),
+        ("read_schedules", "parent", "GET", "/schedules/", None),
+        ("dashboard_stats", "owner", "GET", "/dashboard/stats", None),
+        ("dashboard_today", "owner", "GET", "/dashboard/today-schedules", None),
+    ]
+
+
+# ── Worker (one size, runs in a subprocess) ──────────────────
+async def _run_cases(app, tokens, iterations: int, counter) -> dict:
+    import httpx
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, role, method, path, body in cases(date.today()):
+            headers = {"Authorization": f"Bearer {tokens[role]}"}
+            # Warm-up: principal cache, revocation map, statement caches
+            for _ in range(2):
+                resp = await client.request(method, path, json=body, headers=headers)
+                resp.raise_for_status()
+
+            latencies, statements = [], []
+            for _ in range(iterations):
+                before = counter[0]
+                started = time.perf_counter()
+                resp = await client.request(method, path, json=body, headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+                statements.append(counter[0] - before)
+                resp.raise_for_status()
+
+            latencies.sort()
+            results[name] = {
+                "median_ms": round(statistics.median(latencies), 2),
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+                "statements": int(statistics.median(statements)),
+            }
+    return results
+
+
+def worker(size_name: str, iterations: int):
+    sys.path.insert(0, BACKEND_DIR)
+    sys.path.insert(0, BENCH_DIR)
+    from sqlalchemy import event
+
+    import database, migrations
+    import dataset
+    import utils as auth
+    from main import app
+
+    with database.engine.begin() as conn:
+        migrations.upgrade(conn)
+    dataset.seed(database.engine, dataset.SIZES[size_name])
+
+    counter = [0]
+
+    def count_statement(*args):
+        counter[0] += 1
+
+    event.listen(database.async_engine.sync_engine, "before_cursor_execute", count_statement)
+
+    tokens = {
+        role: auth.create_access_token({"sub": email, "uid": user_id})
+        for role, email, user_id in [
+            ("owner", dataset.OWNER_EMAIL, dataset.OWNER_ID),
+            ("coach", dataset.COACH_EMAIL, dataset.COACH_ID),
+            ("parent", dataset.PARENT_EMAIL, dataset.PARENT_ID),
+        ]
+    }
+    results = asyncio.run(_run_cases(app, tokens, iterations, counter))
+    print(json.dumps(results))
+
+
+# ── Driver ───────────────────────────────────────────────────
+def run_size(size_name: str, iterations: int) -> dict:
+    with tempfile.TemporaryDirectory(prefix=f"bench-{size_name}-") as tmp_dir:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}",
+                   UPLOAD_DIR=os.path.join(tmp_dir, "uploads"))
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", size_name, "--iterations", str(iterations)],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+        )
+        if out.returncode != 0:
+            raise RuntimeError(f"Benchmark for {size_name} failed:\n{out.stderr}")
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    regressions = []
+    for size_name, endpoints in results.items():
+        for name, current in endpoints.items():
+            base = baseline.get(size_name, {}).get(name)
+            if base is None:
+                continue
+            if current["statements"] > base["statements"]:
+                regressions.append(f"{size_name}/{name}: {current['statements']} SQL statements "
+                                   f"(baseline {base['statements']})")
+            limit = base["median_ms"] * (1 + tolerance)
+            if current["median_ms"] > limit and current["median_ms"] - base["median_ms"] >= min_delta_ms:
+                regressions.append(f"{size_name}/{name}: median {current['median_ms']:.1f} ms "
+                                   f"(baseline {base['median_ms']:.1f} ms)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hot endpoints against a stored baseline.")
+    parser.add_argument("--sizes", nargs="+", choices=["small", "medium", "large"],
+                        default=["small", "medium", "large"])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed latency increase (0.5 = +50%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.iterations)
+        return
+
+    results = {size_name: run_size(size_name, args.iterations) for size_name in args.sizes}
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{'size':<8}{'endpoint':<20}{'median':>10}{'p95':>10}{'sql':>6}{'baseline':>12}")
+    for size_name, endpoints in results.items():
+        for name, r in endpoints.items():
+            base = baseline.get(size_name, {}).get(name)
+            base_str = f"{base['median_ms']:.1f}/{base['statements']}" if base else "-"
+            print(f"{size_name:<8}{name:<20}{r['median_ms']:>8.1f}ms{r['p95_ms']:>8.1f}ms"
+                  f"{r['statements']:>6}{base_str:>12}")
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {os.path.relpath(args.baseline)}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nNo regressions." if baseline else "\nNo baseline yet; run with --update-baseline.")
+
+
+if __name__ == "__main__":
+    main()
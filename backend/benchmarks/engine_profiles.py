@@ -0,0 +1,194 @@
+"""
+Compares database engine profiles under concurrent attendance and dashboard traffic.
+
+Writers replay `POST /attendance/batch` (delete + re-insert a schedule's
+attendance for today), readers replay the dashboard count queries. Each
+profile runs against its own fresh copy of the seeded database, so the SQLite
+journal mode of one run cannot leak into the next.
+
+    python benchmarks/engine_profiles.py                      # SQLite in a temp dir
+    python benchmarks/engine_profiles.py --writers 8 --readers 32 --seconds 20
+    python benchmarks/engine_profiles.py --url postgresql://.../scratch_db
+
+With --url the tables are created in (and dropped from) the given database,
+so point it at a scratch database only.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, func, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+import database  # noqa: E402
+import models  # noqa: E402
+
+PROFILES = ("default", "tuned")
+
+
+# ── Dataset ──────────────────────────────────────────────────
+def seed(url: str, schedules: int, members_per_schedule: int):
+    engine = database.make_engine(url, profile="default")
+    database.Base.metadata.drop_all(bind=engine)
+    database.Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        coach = models.User(email="coach@bench", full_name="Coach", hashed_password="x", role=models.Role.COACH)
+        db.add(coach)
+        db.flush()
+        for s in range(schedules):
+            schedule = models.Schedule(
+                day_of_week="PON", start_time=dtime(8 + s % 12), end_time=dtime(9 + s % 12),
+                capacity=members_per_schedule, group_name=f"Grupa {s}", coach_id=coach.id,
+            )
+            db.add(schedule)
+            db.flush()
+            for m in range(members_per_schedule):
+                parent = models.User(email=f"p{s}-{m}@bench", full_name=f"Roditelj {s}-{m}", hashed_password="x")
+                db.add(parent)
+                db.flush()
+                member = models.Member(parent_id=parent.id, full_name=f"Dete {s}-{m}", date_of_birth=date(2015, 1, 1))
+                db.add(member)
+                db.flush()
+                db.add(models.Enrollment(member_id=member.id, schedule_id=schedule.id, start_date=date(2024, 1, 1)))
+        db.commit()
+        coach_id = coach.id
+    engine.dispose()
+    return coach_id
+
+
+# ── Workload ─────────────────────────────────────────────────
+async def save_attendance(db: AsyncSession, schedule_id: int, coach_id: int):
+    today = date.today()
+    await db.execute(delete(models.Attendance).where(
+        models.Attendance.schedule_id == schedule_id,
+        models.Attendance.date == today,
+    ))
+    member_ids = (await db.scalars(select(models.Enrollment.member_id).where(
+        models.Enrollment.schedule_id == schedule_id,
+        models.Enrollment.active == True,
+    ))).all()
+    for member_id in member_ids:
+        db.add(models.Attendance(
+            schedule_id=schedule_id, member_id=member_id, date=today,
+            is_present=random.random() < 0.8, coach_id=coach_id,
+        ))
+    await db.commit()
+
+
+async def read_dashboard(db: AsyncSession):
+    today = date.today()
+    await db.scalar(select(func.count(models.Member.id)).where(models.Member.active == True))
+    await db.scalar(select(func.count(models.Attendance.id)).where(
+        models.Attendance.date == today, models.Attendance.is_present == True,
+    ))
+    await db.execute(
+        select(models.Attendance.schedule_id, func.count(models.Attendance.id))
+        .where(models.Attendance.date == today, models.Attendance.is_present == True)
+        .group_by(models.Attendance.schedule_id)
+    )
+
+
+async def worker(sessions, op, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            async with sessions() as db:
+                await op(db)
+        except OperationalError:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def run_profile(url: str, profile: str, args, coach_id: int, schedule_ids) -> dict:
+    engine = database.make_async_engine(url, profile=profile)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    write_lat, read_lat, write_err, read_err = [], [], [], []
+    deadline = time.perf_counter() + args.seconds
+
+    tasks = [
+        worker(sessions, lambda db: save_attendance(db, random.choice(schedule_ids), coach_id),
+               deadline, write_lat, write_err)
+        for _ in range(args.writers)
+    ] + [
+        worker(sessions, read_dashboard, deadline, read_lat, read_err)
+        for _ in range(args.readers)
+    ]
+    await asyncio.gather(*tasks)
+    await engine.dispose()
+
+    return {
+        "profile": profile,
+        "writes_per_s": len(write_lat) / args.seconds,
+        "reads_per_s": len(read_lat) / args.seconds,
+        "write_p95_ms": _p95(write_lat),
+        "read_p95_ms": _p95(read_lat),
+        "errors": len(write_err) + len(read_err),
+    }
+
+
+def _p95(samples) -> float:
+    if len(samples) < 2:
+        return samples[0] * 1000 if samples else 0.0
+    return statistics.quantiles(samples, n=20)[-1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark database engine profiles.")
+    parser.add_argument("--url", default=None, help="Scratch database URL (default: temporary SQLite file)")
+    parser.add_argument("--schedules", type=int, default=20)
+    parser.add_argument("--members", type=int, default=15, help="Enrolled members per schedule")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    if args.url is None:
+        tmp_dir = tempfile.mkdtemp(prefix="engine-bench-")
+        template = os.path.join(tmp_dir, "template.db")
+        coach_id = seed(f"sqlite:///{template}", args.schedules, args.members)
+    else:
+        coach_id = seed(args.url, args.schedules, args.members)
+    schedule_ids = list(range(1, args.schedules + 1))
+
+    results = []
+    try:
+        for profile in PROFILES:
+            if tmp_dir:
+                # Fresh copy per profile: WAL mode persists in the database file
+                path = os.path.join(tmp_dir, f"{profile}.db")
+                shutil.copyfile(template, path)
+                url = f"sqlite:///{path}"
+            else:
+                url = args.url
+            results.append(asyncio.run(run_profile(url, profile, args, coach_id, schedule_ids)))
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        else:
+            engine = database.make_engine(args.url, profile="default")
+            database.Base.metadata.drop_all(bind=engine)
+            engine.dispose()
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:g}s per profile")
+    print(f"{'profile':<10}{'writes/s':>10}{'reads/s':>10}{'write p95':>12}{'read p95':>11}{'errors':>8}")
+    for r in results:
+        print(f"{r['profile']:<10}{r['writes_per_s']:>10.1f}{r['reads_per_s']:>10.1f}"
+              f"{r['write_p95_ms']:>10.1f}ms{r['read_p95_ms']:>9.1f}ms{r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+CPU cost per row of list endpoints: ORM + Pydantic (previous path) vs Core rows + orjson.
+
+The "orm" path reproduces what the handlers did before (load ORM objects,
+build/validate the response model per row, serialize through the stdlib
+JSON encoder the way FastAPI renders a response_model). The "core" path
+calls the current handlers directly. Both run against the same seeded
+SQLite database; CPU time is process time, so it includes driver work.
+
+    python benchmarks/list_serialization.py
+    python benchmarks/list_serialization.py --messages 20000 --repeat 10
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, datetime, time as dtime, timedelta
+from typing import List
+
+_TMP_DIR = tempfile.mkdtemp(prefix="list-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+import database, images, models, schemas  # noqa: E402
+import utils as auth  # noqa: E402
+from routers import members, messages, payments, schedules  # noqa: E402
+
+
+# ── Dataset ──────────────────────────────────────────────────
+def seed(n_members: int, n_payments: int, n_messages: int, n_schedules: int):
+    database.Base.metadata.create_all(bind=database.engine)
+    rnd = random.Random(7)
+    with database.engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"email": "owner@bench", "full_name": "Owner", "hashed_password": "x", "role": models.Role.OWNER},
+        ] + [
+            {"email": f"p{i}@bench", "full_name": f"Roditelj {i}", "hashed_password": "x",
+             "role": models.Role.PARENT, "phone_number": f"06{i:08d}"}
+            for i in range(n_members // 2)
+        ])
+        conn.execute(insert(models.Member), [
+            {"parent_id": 2 + i // 2, "full_name": f"Dete {i}", "date_of_birth": date(2012 + i % 8, 1 + i % 12, 1),
+             "notes": "Alergija" if i % 10 == 0 else None, "active": True}
+            for i in range(n_members)
+        ])
+        conn.execute(insert(models.Schedule), [
+            {"day_of_week": "PON", "start_time": dtime(8 + i % 12), "end_time": dtime(9 + i % 12),
+             "capacity": 20, "group_name": f"Grupa {i}", "location": "Bazen", "is_active": True}
+            for i in range(n_schedules)
+        ])
+        conn.execute(insert(models.Enrollment), [
+            {"member_id": 1 + i, "schedule_id": 1 + i % n_schedules, "start_date": date(2024, 1, 1), "active": True}
+            for i in range(n_members)
+        ])
+        conn.execute(insert(models.Payment), [
+            {"member_id": 1 + rnd.randrange(n_members), "amount": 3000.0, "currency": "RSD",
+             "payment_date": date(2025, 1 + i % 12, 5), "payment_method": models.PaymentMethod.CASH,
+             "month": 1 + i % 12, "year": 2025, "created_at": datetime(2025, 1, 1) + timedelta(minutes=i)}
+            for i in range(n_payments)
+        ])
+        digest = "ab" * 32
+        conn.execute(insert(models.Message), [
+            {"sender_id": 1, "content": f"Obaveštenje broj {i} za roditelje i trenere.",
+             "scope": models.MessageScope.BROADCAST_ALL,
+             "image_url": f"/uploads/{digest}/original" if i % 5 == 0 else None,
+             "sent_at": datetime(2025, 1, 1) + timedelta(minutes=i)}
+            for i in range(n_messages)
+        ])
+
+
+# ── Previous implementation (ORM objects + Pydantic per row) ─
+def _render(schema, items) -> bytes:
+    adapter = TypeAdapter(List[schema])
+    content = adapter.dump_python(adapter.validate_python(items, from_attributes=True), mode="json")
+    return JSONResponse(content).body
+
+
+async def orm_messages(db):
+    rows = (await db.scalars(
+        select(models.Message).options(joinedload(models.Message.sender)).order_by(models.Message.sent_at.desc())
+    )).all()
+    out = []
+    for m in rows:
+        m_out = schemas.MessageOut.model_validate(m)
+        m_out.sender_name = m.sender.full_name
+        m_out.image_variants = images.variants_for_url(m.image_url)
+        out.append(m_out)
+    return _render(schemas.MessageOut, out)
+
+
+async def orm_members(db):
+    rows = (await db.scalars(
+        select(models.Member).options(joinedload(models.Member.parent)).order_by(models.Member.full_name)
+    )).all()
+    content = [{
+        "id": m.id, "full_name": m.full_name,
+        "date_of_birth": str(m.date_of_birth) if m.date_of_birth else None,
+        "parent_name": m.parent.full_name if m.parent else None,
+        "parent_phone": m.parent.phone_number if m.parent else None,
+        "notes": m.notes, "active": m.active,
+    } for m in rows]
+    return JSONResponse(content).body
+
+
+async def orm_payments(db):
+    rows = (await db.scalars(
+        select(models.Payment).options(joinedload(models.Payment.member))
+        .order_by(models.Payment.created_at.desc()).limit(50)
+    )).all()
+    out = [schemas.PaymentOut(
+        id=p.id, member_id=p.member_id, amount=p.amount, currency=p.currency, payment_date=p.payment_date,
+        payment_method=p.payment_method, month=p.month, year=p.year, notes=p.notes,
+        member_name=p.member.full_name if p.member else "",
+    ) for p in rows]
+    return _render(schemas.PaymentOut, out)
+
+
+async def orm_schedules(db):
+    counts = dict((await db.execute(
+        select(models.Enrollment.schedule_id, func.count(models.Enrollment.id))
+        .where(models.Enrollment.active == True)
+        .group_by(models.Enrollment.schedule_id)
+    )).all())
+    rows = (await db.scalars(select(models.Schedule).where(models.Schedule.is_active == True))).all()
+    out = []
+    for s in rows:
+        s_out = schemas.ScheduleOut.model_validate(s)
+        s_out.current_enrollments_count = counts.get(s.id, 0)
+        out.append(s_out)
+    return _render(schemas.ScheduleOut, out)
+
+
+# ── Runner ───────────────────────────────────────────────────
+async def measure(fn, repeat: int) -> float:
+    """Median CPU seconds of one call, each on a fresh session."""
+    samples = []
+    for _ in range(repeat):
+        async with database.AsyncSessionLocal() as db:
+            started = time.process_time()
+            body = await fn(db)
+            samples.append(time.process_time() - started)
+        assert body
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+async def run(args):
+    owner = auth.Principal(id=1, email="owner@bench", full_name="Owner", role=models.Role.OWNER,
+                           is_active=True, phone_number=None, member_ids=frozenset())
+
+    cases = [
+        ("GET /messages/", args.messages,
+         orm_messages, lambda db: messages.get_messages(db=db, current_user=owner)),
+        ("GET /members/all", args.members,
+         orm_members, lambda db: members.get_all_members(db=db, current_user=owner)),
+        ("GET /payments/history", 50,
+         orm_payments, lambda db: payments.payment_history(db=db, current_user=owner)),
+        ("GET /schedules/", args.schedules,
+         orm_schedules,
+         lambda db: schedules.read_schedules(active_only=True, selection=None, db=db, current_user=owner)),
+    ]
+
+    print(f"{'endpoint':<24}{'rows':>7}{'orm µs/row':>12}{'core µs/row':>13}{'speedup':>9}")
+    for name, rows, old, new in cases:
+        async def new_body(db, new=new):
+            return (await new(db)).body
+        await measure(old, 1), await measure(new_body, 1)  # Warm-up
+        old_s = await measure(old, args.repeat)
+        new_s = await measure(new_body, args.repeat)
+        print(f"{name:<24}{rows:>7}{old_s / rows * 1e6:>12.1f}{new_s / rows * 1e6:>13.1f}{old_s / new_s:>8.2f}x")
+    await database.async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark list endpoint serialization.")
+    parser.add_argument("--members", type=int, default=2000)
+    parser.add_argument("--payments", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--schedules", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+    try:
+        seed(args.members, args.payments, args.messages, args.schedules)
+        asyncio.run(run(args))
+    finally:
+        shutil.rmtree(_TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
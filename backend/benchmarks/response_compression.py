@@ -0,0 +1,134 @@
+"""
+Response compression: CPU cost vs bytes saved, per endpoint and encoding.
+
+Fetches the uncompressed body of each list endpoint from a seeded SQLite
+database (in-process, httpx + ASGITransport), then compresses it with every
+encoder the middleware offers, at the configured levels. Reports raw and
+compressed size, ratio and CPU time per response. A "stream" row compresses
+the same body in 4 KB chunks with a flush after each one, the way streaming
+responses are sent.
+
+    python benchmarks/response_compression.py
+    python benchmarks/response_compression.py --size large --repeat 50
+    COMPRESSION_BROTLI_QUALITY=6 python benchmarks/response_compression.py
+
+Rule of thumb when reading the output: at ~100 Mbit/s a saved kilobyte is
+worth ~0.08 ms of transfer time, so an encoding pays off when its CPU cost
+per response stays below that for the bytes it saves.
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+_TMP_DIR = tempfile.mkdtemp(prefix="compression-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'bench.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(_TMP_DIR, "uploads")
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import compression, database, migrations  # noqa: E402
+import dataset  # noqa: E402
+import utils as auth  # noqa: E402
+
+STREAM_CHUNK = 4096
+
+
+def cases(today: date):
+    """(name, role, path)"""
+    return [
+        ("members_all", "owner", "/members/all"),
+        ("messages_staff", "owner", "/messages/"),
+        ("read_schedules", "parent", "/schedules/"),
+        ("attendance_sheet", "coach", f"/attendance/schedule/{dataset.BUSY_SCHEDULE_ID}/date/{today.isoformat()}"),
+        ("debtors", "owner", f"/payments/debtors?month={today.month}&year={today.year}"),
+    ]
+
+
+async def fetch_bodies() -> dict:
+    import httpx
+    from main import app
+
+    tokens = {
+        role: auth.create_access_token({"sub": email, "uid": user_id})
+        for role, email, user_id in [
+            ("owner", dataset.OWNER_EMAIL, dataset.OWNER_ID),
+            ("coach", dataset.COACH_EMAIL, dataset.COACH_ID),
+            ("parent", dataset.PARENT_EMAIL, dataset.PARENT_ID),
+        ]
+    }
+    bodies = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, role, path in cases(date.today()):
+            resp = await client.get(path, headers={"Authorization": f"Bearer {tokens[role]}",
+                                                   "Accept-Encoding": "identity"})
+            resp.raise_for_status()
+            bodies[name] = resp.content
+    await database.async_engine.dispose()
+    return bodies
+
+
+# ── Measurement ──────────────────────────────────────────────
+def compress_whole(encoder_class, body: bytes) -> bytes:
+    return encoder_class().finish(body)
+
+
+def compress_stream(encoder_class, body: bytes) -> bytes:
+    encoder = encoder_class()
+    parts = [encoder.chunk(body[i:i + STREAM_CHUNK]) for i in range(0, len(body), STREAM_CHUNK)]
+    parts.append(encoder.finish())
+    return b"".join(parts)
+
+
+def measure(fn, encoder_class, body: bytes, repeat: int):
+    """(compressed size, CPU ms per response)"""
+    fn(encoder_class, body)  # warm-up
+    started = time.process_time()
+    for _ in range(repeat):
+        out = fn(encoder_class, body)
+    return len(out), (time.process_time() - started) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare compression CPU cost against bytes saved per endpoint.")
+    parser.add_argument("--size", choices=sorted(dataset.SIZES), default="medium")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    try:
+        with database.engine.begin() as conn:
+            migrations.upgrade(conn)
+        dataset.seed(database.engine, dataset.SIZES[args.size])
+        bodies = asyncio.run(fetch_bodies())
+    finally:
+        database.engine.dispose()
+        shutil.rmtree(_TMP_DIR, ignore_errors=True)
+
+    print(f"levels: gzip {compression.GZIP_LEVEL}, br {compression.BROTLI_QUALITY}, zstd {compression.ZSTD_LEVEL}; "
+          f"threshold {compression.COMPRESSION_MIN_SIZE} B; encoders: {', '.join(compression.ENCODERS)}\n")
+    print(f"{'endpoint':<18}{'encoding':<14}{'raw':>10}{'compressed':>12}{'ratio':>8}{'saved':>10}"
+          f"{'cpu ms':>9}{'KB/ms':>8}")
+    for name, body in bodies.items():
+        if len(body) < compression.COMPRESSION_MIN_SIZE:
+            print(f"{name:<18}{'(identity)':<14}{len(body):>10}  below threshold, sent uncompressed")
+            continue
+        for encoding, encoder_class in compression.ENCODERS.items():
+            for label, fn in ((encoding, compress_whole), (f"{encoding} stream", compress_stream)):
+                size, cpu_ms = measure(fn, encoder_class, body, args.repeat)
+                saved_kb = (len(body) - size) / 1024
+                print(f"{name:<18}{label:<14}{len(body):>10}{size:>12}{len(body) / size:>7.1f}x"
+                      f"{saved_kb:>8.1f}KB{cpu_ms:>9.2f}{saved_kb / cpu_ms if cpu_ms else 0:>8.0f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Negotiated response compression (zstd, brotli, gzip) as an ASGI middleware.
+
+The encoding is picked from the client's Accept-Encoding (q-values honoured),
+preferring zstd, then br, then gzip among those the client accepts. Brotli
+and zstd need their optional packages (`brotli`, `zstandard`); without them
+only gzip is offered.
+
+- Complete responses smaller than COMPRESSION_MIN_SIZE bytes are sent as is.
+- Streaming responses (more_body) are compressed chunk by chunk, flushing
+  after every chunk so the client still receives data as it is produced.
+- Server-sent events, already encoded bodies and binary media types are
+  never compressed; SSE frames must reach the client one by one.
+
+Levels favour CPU over ratio: JSON compresses well even at low levels,
+see benchmarks/response_compression.py for the trade-off per endpoint.
+"""
+
+import os
+import zlib
+from typing import Callable, Optional
+
+try:
+    import brotli
+except ImportError:  # Optional: pip install brotli
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: pip install zstandard
+    zstandard = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 5))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3))
+
+EXCLUDED_CONTENT_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip",
+                          "application/gzip", "application/octet-stream")
+
+
+# ── Encoders ─────────────────────────────────────────────────
+class _Gzip:
+    def __init__(self):
+        self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.process(data) + self._obj.finish()
+
+
+class _Zstd:
+    def __init__(self):
+        self._obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+# Server preference order
+ENCODERS = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = _Zstd
+if brotli is not None:
+    ENCODERS["br"] = _Brotli
+ENCODERS["gzip"] = _Gzip
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best encoding we support that the Accept-Encoding header allows (q > 0)."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name] = q
+    for encoding in ENCODERS:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+def _compressible(headers: list) -> bool:
+    for key, value in headers:
+        if key == b"content-encoding":
+            return False
+        if key == b"content-type" and value.decode("latin-1").lower().startswith(EXCLUDED_CONTENT_TYPES):
+            return False
+    return True
+
+
+# ── ASGI middleware ──────────────────────────────────────────
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept) if accept and scope["method"] != "HEAD" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size))
+
+
+class _CompressingSend:
+    """Wraps `send`: holds back the response start until the first body chunk decides the path."""
+
+    def __init__(self, send: Callable, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start = None
+        self.encoder = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            if message["status"] in (204, 304) or not _compressible(message.get("headers", [])):
+                self.passthrough = True
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            if not more_body:
+                # Complete response in one message
+                if len(body) < self.minimum_size:
+                    self.passthrough = True
+                    await self.send(self.start)
+                    await self.send(message)
+                    return
+                data = ENCODERS[self.encoding]().finish(body)
+                await self.send(self._start_headers(str(len(data)).encode()))
+                await self.send({"type": "http.response.body", "body": data})
+                return
+            self.encoder = ENCODERS[self.encoding]()
+            await self.send(self._start_headers(None))
+
+        data = self.encoder.chunk(body) if more_body else self.encoder.finish(body)
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _start_headers(self, content_length: Optional[bytes]) -> dict:
+        headers = [(k, v) for k, v in self.start.get("headers", []) if k != b"content-length"]
+        if content_length is not None:
+            headers.append((b"content-length", content_length))
+        headers.append((b"content-encoding", self.encoding.encode()))
+        if not any(k == b"vary" and b"accept-encoding" in v.lower() for k, v in headers):
+            headers.append((b"vary", b"Accept-Encoding"))
+        return dict(self.start, headers=headers)
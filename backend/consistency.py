@@ -0,0 +1,84 @@
+"""
+Read-your-writes across workers.
+
+After a user's write, database.read_session keeps that user's reads on the
+primary for READ_AFTER_WRITE_SECONDS, so they don't read a replica that
+hasn't caught up yet. The worker that handled the write remembers this
+itself; for the other workers the client carries it:
+
+- a response to a request that committed a write gets an
+  `X-Read-After: <user id>.<unix ms deadline>.<signature>` header
+- the client sends the last value back on its next requests
+  (frontend/lib/core/api_client.dart)
+- the middleware verifies the HMAC (SECRET_KEY, bound to the club) and
+  database.reads_from_primary honours the deadline for that user only
+
+A forged or foreign value is ignored; the worst a client can do with its
+own value is to read from the primary for a few seconds.
+"""
+
+import hashlib
+import hmac
+import time
+from typing import Optional, Tuple
+
+import database
+from utils import SECRET_KEY
+
+HEADER = "X-Read-After"
+_HEADER_KEY = HEADER.lower().encode()
+
+
+def _signature(user_id: int, until_ms: int) -> str:
+    payload = f"{database.current_tenant.get() or ''}|{user_id}.{until_ms}".encode()
+    return hmac.new(SECRET_KEY.encode(), payload, hashlib.sha256).hexdigest()[:32]
+
+
+def issue(user_id: int) -> str:
+    until_ms = int((time.time() + database.READ_AFTER_WRITE_SECONDS) * 1000)
+    return f"{user_id}.{until_ms}.{_signature(user_id, until_ms)}"
+
+
+def verify(value: str) -> Optional[Tuple[int, float]]:
+    """(user id, unix deadline) of a valid, unexpired header value, else None."""
+    try:
+        user_id, until_ms, signature = value.split(".")
+        user_id, until_ms = int(user_id), int(until_ms)
+    except ValueError:
+        return None
+    if not hmac.compare_digest(signature, _signature(user_id, until_ms)):
+        return None
+    until = until_ms / 1000
+    return (user_id, until) if until > time.time() else None
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        claimed = None
+        for key, value in scope["headers"]:
+            if key == _HEADER_KEY:
+                claimed = verify(value.decode("latin-1"))
+                break
+        writes = {}
+        writes_token = database.request_writes.set(writes)
+        claimed_token = database.client_primary_until.set(claimed)
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start" and writes.get("user_id") is not None:
+                headers = list(message.get("headers", []))
+                headers.append((_HEADER_KEY, issue(writes["user_id"]).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            database.client_primary_until.reset(claimed_token)
+            database.request_writes.reset(writes_token)
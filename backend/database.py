@@ -1,5 +1,18 @@
+import asyncio
+import itertools
 import os
-from sqlalchemy import create_engine
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 # 1. Određujemo tačnu putanju za LOKALNU bazu (kao do sada)
@@ -14,23 +27,348 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", LOCAL_DB_URL)
 if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
     SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# 3. Argumenti za konekciju (SQLite traži check_same_thread, Postgres ne traži ništa)
-connect_args = {}
-if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+# ── Engine profiles ──────────────────────────────────────────
+# "tuned" applies the settings below, "default" keeps SQLAlchemy/driver defaults
+DB_ENGINE_PROFILE = os.getenv("DB_ENGINE_PROFILE", "tuned")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args=connect_args
-)
+# SQLite: pragmas are set on every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # Safe with WAL, fsync only at checkpoints
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 20000))  # Page cache per connection
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 128 * 1024 * 1024))
+
+# Postgres: connection pool and server-side statement timeout
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # Seconds; below typical proxy idle limits
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 15000))
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+    finally:
+        cursor.close()
+
+
+def engine_options(url, is_async: bool = False, profile: str = None, schema: str = None) -> dict:
+    """Keyword arguments for create_engine / create_async_engine for the given backend and profile."""
+    profile = profile or DB_ENGINE_PROFILE
+    backend = make_url(url).get_backend_name()
+    options = {"connect_args": {}}
+
+    # SQLite traži check_same_thread (konekcije se dele između threadova)
+    if backend == "sqlite" and not is_async:
+        options["connect_args"]["check_same_thread"] = False
+
+    # Postgres schema per club: unqualified table names resolve in the club's schema
+    if schema and backend == "postgresql":
+        if is_async:
+            options["connect_args"]["server_settings"] = {"search_path": schema}
+        else:
+            options["connect_args"]["options"] = f"-c search_path={schema}"
+
+    if profile != "tuned":
+        return options
+
+    if backend == "postgresql":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+        if DB_STATEMENT_TIMEOUT_MS:
+            if is_async:
+                options["connect_args"].setdefault("server_settings", {})["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+            else:
+                pg_options = options["connect_args"].get("options", "")
+                options["connect_args"]["options"] = f"{pg_options} -c statement_timeout={DB_STATEMENT_TIMEOUT_MS}".strip()
+    return options
+
+
+def configure_engine(engine, profile: str = None):
+    """Registers per-connection setup (SQLite pragmas) on a sync or async engine."""
+    profile = profile or DB_ENGINE_PROFILE
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if profile == "tuned" and sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+# 3. Sinhroni engine: skripte (seed, retention) i create_all
+def make_engine(url: str, profile: str = None, schema: str = None):
+    return configure_engine(create_engine(url, **engine_options(url, profile=profile, schema=schema)), profile)
+
+
+engine = make_engine(SQLALCHEMY_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+# 4. Async engine za API (aiosqlite lokalno, asyncpg na Postgresu)
+def to_async_url(url: str):
+    """Maps a sync database URL to its async driver (sqlite -> aiosqlite, postgresql -> asyncpg)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite"), {}
+    if backend == "postgresql":
+        # asyncpg doesn't understand libpq's sslmode; translate it to the ssl argument
+        args = {}
+        sslmode = parsed.query.get("sslmode")
+        if sslmode:
+            parsed = parsed.difference_update_query(["sslmode"])
+            if sslmode != "disable":
+                args["ssl"] = sslmode
+        return parsed.set(drivername="postgresql+asyncpg"), args
+    return parsed, {}
+
+
+def make_async_engine(url: str, profile: str = None, schema: str = None):
+    async_url, driver_args = to_async_url(url)
+    options = engine_options(async_url, is_async=True, profile=profile, schema=schema)
+    options["connect_args"].update(driver_args)
+    return configure_engine(create_async_engine(async_url, **options), profile)
+
+
+async_engine = make_async_engine(SQLALCHEMY_DATABASE_URL)
+
+# expire_on_commit=False: objects stay readable after commit without an implicit (sync) reload
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 # Funkcija za dependency injection
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with primary_session() as db:
         yield db
+
+
+# 5. Read replicas: GET rute čitaju sa replika, upisi idu na primarnu bazu
+# Comma-separated; empty = every read goes to the primary
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+# After a user's write, their reads stay on the primary this long (covers replica lag)
+READ_AFTER_WRITE_SECONDS = float(os.getenv("READ_AFTER_WRITE_SECONDS", 5))
+
+# Set by the auth dependency; writes committed in this context make the user sticky
+current_user_id: ContextVar[Optional[int]] = ContextVar("current_user_id", default=None)
+
+# Set by tenancy.TenantMiddleware; None = single-club deployment (DATABASE_URL)
+current_tenant: ContextVar[Optional[str]] = ContextVar("current_tenant", default=None)
+
+# (club, user id) -> monotonic deadline; per process, like the principal cache
+_primary_until: Dict[Tuple[Optional[str], int], float] = {}
+
+# Per request (consistency.py): the user whose write this request committed, and
+# the (user id, unix deadline) the client brought back from an earlier write
+request_writes: ContextVar[Optional[dict]] = ContextVar("request_writes", default=None)
+client_primary_until: ContextVar[Optional[Tuple[int, float]]] = ContextVar("client_primary_until", default=None)
+
+
+def _mark_write(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip()[:6].upper() != "SELECT":
+        conn.info["wrote"] = True
+
+
+def _on_commit(conn):
+    user_id = current_user_id.get()
+    if conn.info.pop("wrote", False) and user_id is not None:
+        _primary_until[(current_tenant.get(), user_id)] = time.monotonic() + READ_AFTER_WRITE_SECONDS
+        writes = request_writes.get()
+        if writes is not None:
+            writes["user_id"] = user_id
+
+
+def _on_rollback(conn):
+    conn.info.pop("wrote", None)
+
+
+def _track_writes(engine):
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _mark_write)
+    event.listen(sync_engine, "commit", _on_commit)
+    event.listen(sync_engine, "rollback", _on_rollback)
+
+
+_track_writes(async_engine)
+
+
+def reads_from_primary(user_id: Optional[int]) -> bool:
+    """True while the user's own recent write may not have reached the replicas."""
+    if user_id is None:
+        return False
+    # Written through another worker: the client carries the deadline (consistency.py)
+    claimed = client_primary_until.get()
+    if claimed is not None and claimed[0] == user_id and claimed[1] > time.time():
+        return True
+    key = (current_tenant.get(), user_id)
+    deadline = _primary_until.get(key)
+    if deadline is None:
+        return False
+    if deadline <= time.monotonic():
+        _primary_until.pop(key, None)
+        return False
+    return True
+
+
+def _set_query_only(dbapi_connection, connection_record):
+    # A replica file must never be written through the API (the copy step would overwrite it)
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA query_only = ON")
     finally:
-        db.close()
\ No newline at end of file
+        cursor.close()
+
+
+def make_replica_engine(url: str, profile: str = None):
+    replica = make_async_engine(url, profile)
+    if replica.sync_engine.dialect.name == "sqlite":
+        event.listen(replica.sync_engine, "connect", _set_query_only)
+    return replica
+
+
+replica_engines = [make_replica_engine(url) for url in DATABASE_REPLICA_URLS]
+_replica_sessions = itertools.cycle([
+    async_sessionmaker(e, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    for e in replica_engines
+] or [AsyncSessionLocal])
+
+
+@asynccontextmanager
+async def read_session(user_id: Optional[int] = None):
+    """Session on the next replica (round robin), or on the primary right after the user's write."""
+    if current_tenant.get() is not None:
+        # Replicas belong to the DATABASE_URL database; a club reads from its own database
+        async with primary_session() as db:
+            yield db
+        return
+    session_factory = AsyncSessionLocal if reads_from_primary(user_id) else next(_replica_sessions)
+    async with session_factory() as db:
+        yield db
+
+
+# 6. Više klubova: svaki klub ima svoju bazu (ili Postgres šemu)
+# Comma-separated club ids; empty = one club in DATABASE_URL, as before
+TENANTS = [t.strip() for t in os.getenv("TENANTS", "").split(",") if t.strip()]
+# "{tenant}" is replaced by the club id (sqlite:///clubs/{tenant}.db, postgresql://.../club_{tenant}).
+# Unset: SQLite gets one file per club next to DATABASE_URL (cms_app_v2.<club>.db),
+# Postgres one schema per club inside DATABASE_URL.
+TENANT_DATABASE_URL = os.getenv("TENANT_DATABASE_URL", "")
+# Club databases with an open engine (and connection pool); the least recently used is closed
+TENANT_ENGINE_CACHE_SIZE = int(os.getenv("TENANT_ENGINE_CACHE_SIZE", 16))
+# Same switch as main.py: a club's database is migrated when it is first opened
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "1") == "1"
+
+_TENANT_RE = re.compile(r"^[a-z][a-z0-9_]{0,62}$")  # Safe as a file name and a Postgres schema name
+for _tenant in TENANTS:
+    if not _TENANT_RE.match(_tenant):
+        raise RuntimeError(f"Neispravan naziv kluba u TENANTS: {_tenant!r}")
+
+# Called with every engine opened for a club (main.py hooks in metrics / the query detector)
+engine_hooks: List[Callable] = []
+
+
+def tenant_url(tenant: str) -> Tuple[str, Optional[str]]:
+    """(database URL, Postgres schema or None) of a club."""
+    if "{tenant}" in TENANT_DATABASE_URL:
+        return TENANT_DATABASE_URL.replace("{tenant}", tenant), None
+    url = make_url(TENANT_DATABASE_URL or SQLALCHEMY_DATABASE_URL)
+    if url.get_backend_name() == "postgresql":
+        return url.render_as_string(hide_password=False), tenant
+    if url.get_backend_name() == "sqlite" and url.database and not TENANT_DATABASE_URL:
+        root, ext = os.path.splitext(url.database)
+        return url.set(database=f"{root}.{tenant}{ext or '.db'}").render_as_string(hide_password=False), None
+    raise RuntimeError("TENANT_DATABASE_URL mora da sadrži {tenant}")
+
+
+class TenantDatabase:
+    """Engine and session factory of one club, opened on first use."""
+
+    def __init__(self, tenant: str):
+        self.tenant = tenant
+        self.url, self.schema = tenant_url(tenant)
+        self.engine = make_async_engine(self.url, schema=self.schema)
+        self.sessions = async_sessionmaker(self.engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+        self.ready = False
+        self._lock = asyncio.Lock()
+        _track_writes(self.engine)
+        for hook in engine_hooks:
+            hook(self.engine)
+
+    async def prepare(self):
+        """Creates the club's schema (Postgres) and applies pending migrations, once per engine."""
+        async with self._lock:
+            if self.ready:
+                return
+            if self.schema or MIGRATE_ON_STARTUP:
+                # Separate, uninstrumented sync engine: the migration is not part of the request that opened the club
+                await asyncio.to_thread(self._migrate)
+            self.ready = True
+
+    def _migrate(self):
+        import migrations  # Lazy: migrations import the models, which import this module
+
+        engine = make_engine(self.url, schema=self.schema)
+        try:
+            with engine.begin() as conn:
+                if self.schema:
+                    conn.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS "{self.schema}"')
+                if MIGRATE_ON_STARTUP:
+                    migrations.upgrade(conn)
+        finally:
+            engine.dispose()
+
+
+# club -> open database, least recently used first
+_tenant_databases: "OrderedDict[str, TenantDatabase]" = OrderedDict()
+_closing: Set[asyncio.Task] = set()
+
+
+async def tenant_database(tenant: str) -> TenantDatabase:
+    entry = _tenant_databases.get(tenant)
+    if entry is None:
+        entry = _tenant_databases[tenant] = TenantDatabase(tenant)
+        while len(_tenant_databases) > TENANT_ENGINE_CACHE_SIZE:
+            _, evicted = _tenant_databases.popitem(last=False)
+            # Checked-out connections finish their request and are closed on return
+            task = asyncio.get_running_loop().create_task(evicted.engine.dispose())
+            _closing.add(task)
+            task.add_done_callback(_closing.discard)
+    _tenant_databases.move_to_end(tenant)
+    if not entry.ready:
+        await entry.prepare()
+    return entry
+
+
+@asynccontextmanager
+async def primary_session():
+    """Session on the primary database of the current club (DATABASE_URL without tenancy)."""
+    tenant = current_tenant.get()
+    if tenant is None:
+        if TENANTS:
+            raise HTTPException(status_code=404, detail="Klub nije pronađen")
+        session_factory = AsyncSessionLocal
+    else:
+        session_factory = (await tenant_database(tenant)).sessions
+    async with session_factory() as db:
+        yield db
+
+
+async def dispose_tenants():
+    while _tenant_databases:
+        _, entry = _tenant_databases.popitem()
+        await entry.engine.dispose()
+    if _closing:
+        await asyncio.gather(*_closing, return_exceptions=True)
@@ -0,0 +1,103 @@
+"""
+Version-stamped ETags for slow-changing collections.
+
+Every collection (skills, schedules, members) has a row in
+`collection_versions`. Routers that change a collection call `bump()` in the
+same transaction as the write, so the new version becomes visible exactly
+when the data does. GET handlers build the ETag from the version (plus the
+query string, and the user for per-user lists) and answer a matching
+If-None-Match with 304 before touching the collection's tables:
+
+    etag = await etags.etag_for(db, request, etags.SKILLS, current_user)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag)
+    ...
+    return etags.attach(result, response, etag)
+
+Versions are cached per process for ETAG_VERSION_TTL seconds, so a 304 usually
+costs no query at all. Another worker's write can therefore take up to that
+long to show; a user's own writes are visible at once, because their reads
+skip the cache while they read from the primary (database.reads_from_primary).
+"""
+
+import hashlib
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database, models
+
+SKILLS, SCHEDULES, MEMBERS = "skills", "schedules", "members"
+COLLECTIONS = (SKILLS, SCHEDULES, MEMBERS)
+
+ETAG_VERSION_TTL = float(os.getenv("ETAG_VERSION_TTL", 2))  # seconds; 0 disables the cache
+
+# (club, collection) -> (expires_at, version)
+_versions: Dict[Tuple[Optional[str], str], Tuple[float, int]] = {}
+
+_table = models.CollectionVersion.__table__
+
+
+async def bump(db: AsyncSession, *collections: str):
+    """Marks the collections as changed; call before the write's commit."""
+    for name in collections:
+        result = await db.execute(
+            update(_table).where(_table.c.name == name).values(version=_table.c.version + 1)
+        )
+        if result.rowcount == 0:
+            await db.execute(_table.insert().values(name=name, version=1))
+        _versions.pop((database.current_tenant.get(), name), None)
+
+
+async def version(db: AsyncSession, collection: str, user_id: Optional[int] = None) -> int:
+    key = (database.current_tenant.get(), collection)
+    cached = _versions.get(key)
+    if cached is not None and cached[0] > time.monotonic() and not database.reads_from_primary(user_id):
+        return cached[1]
+    current = await db.scalar(select(_table.c.version).where(_table.c.name == collection)) or 0
+    if ETAG_VERSION_TTL > 0:
+        _versions[key] = (time.monotonic() + ETAG_VERSION_TTL, current)
+    return current
+
+
+async def etag_for(db: AsyncSession, request: Request, collection: str, user, per_user: bool = False) -> str:
+    """Weak ETag: collection version + the request variant (club, query string, user for per-user lists)."""
+    current = await version(db, collection, user.id)
+    # Clubs share the API host when they pick the club by header, so their tags must differ
+    variant = f"{database.current_tenant.get() or ''}|{request.url.query}"
+    if per_user:
+        variant = f"{user.id}|{variant}"
+    digest = hashlib.blake2b(variant.encode(), digest_size=6).hexdigest()
+    return f'W/"{collection}-{current}-{digest}"'
+
+
+def matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in header.split(","))
+
+
+def _cache_headers(headers, etag: str):
+    headers["ETag"] = etag
+    headers["Cache-Control"] = "private, no-cache"  # Clients may keep it, but must revalidate
+
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=304)
+    _cache_headers(response.headers, etag)
+    return response
+
+
+def attach(result, response: Response, etag: str):
+    """Adds the ETag to the handler's result (a Response) or to the injected response."""
+    _cache_headers((result if isinstance(result, Response) else response).headers, etag)
+    return result
@@ -0,0 +1,76 @@
+"""
+In-process event broadcaster used for Server-Sent Events streams.
+
+Writers call publish() after their commit; every connected subscriber gets
+the event on its own bounded queue. A slow client only loses its own oldest
+events, it never blocks the writer. Events are per process, so on a
+multi-worker deployment a client only sees writes handled by its worker.
+Subscribers only receive events published for their own club.
+"""
+
+import asyncio
+import json
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple, Set
+
+import database
+
+QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 15
+DISCONNECT_POLL_SECONDS = 1  # A closed client is noticed within this, even when events keep coming
+
+_subscribers: Set[Tuple[Optional[str], asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+
+
+def publish(event: str, data: Dict[str, Any]):
+    """Fan out an event; safe to call from the event loop or a worker thread."""
+    message = _format(event, data)
+    try:
+        current_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        current_loop = None
+
+    tenant = database.current_tenant.get()
+    for club, loop, queue in list(_subscribers):
+        if club != tenant:
+            continue
+        if loop is current_loop:
+            _offer(queue, message)
+        else:
+            loop.call_soon_threadsafe(_offer, queue, message)
+
+
+@contextmanager
+def subscribe():
+    entry = (database.current_tenant.get(), asyncio.get_running_loop(), asyncio.Queue(maxsize=QUEUE_SIZE))
+    _subscribers.add(entry)
+    try:
+        yield entry[2]
+    finally:
+        _subscribers.discard(entry)
+
+
+def _offer(queue: asyncio.Queue, message: str):
+    if queue.full():
+        queue.get_nowait()  # Drop the oldest event for slow clients
+    queue.put_nowait(message)
+
+
+async def stream(request, queue: asyncio.Queue):
+    """Yields SSE frames from the queue until the client disconnects."""
+    yield "retry: 5000\n\n"
+    loop = asyncio.get_running_loop()
+    last_sent = loop.time()
+    while not await request.is_disconnected():
+        try:
+            message = await asyncio.wait_for(queue.get(), timeout=DISCONNECT_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            if loop.time() - last_sent < HEARTBEAT_SECONDS:
+                continue
+            message = ": keep-alive\n\n"
+        last_sent = loop.time()
+        yield message
+
+
+def _format(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
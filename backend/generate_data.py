@@ -0,0 +1,361 @@
+"""
+Synthetic club data at configurable scale, for load and performance testing.
+
+Unlike seed_db.py (a handful of rows through the ORM) this writes straight
+through the driver: executemany on SQLite, COPY on Postgres, streamed in
+chunks so millions of rows never sit in memory. The output is deterministic
+for a given --seed and scale (dates are relative to today).
+
+    python generate_data.py                          # --scale large: ~50 clubs, 5M attendance rows
+    python generate_data.py --scale small
+    python generate_data.py --members 5000 --attendance 1000000
+    python generate_data.py --reset                  # drop existing tables first
+    DATABASE_URL=postgresql://... python generate_data.py
+
+The target database must be empty (or use --reset); the schema is created
+by the migrations. Every account shares the password given by --password:
+owner@club.test, trener<N>@club.test and roditelj<N>@club.test.
+"""
+
+import argparse
+import csv
+import io
+import random
+import sys
+import time
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from sqlalchemy import func, select, text
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+import database, migrations, models
+from utils import get_password_hash
+
+DAYS = ["PON", "UTO", "SRE", "CET", "PET", "SUB", "NED"]
+GROUPS = ["Škola plivanja", "Mali plivači", "Napredna grupa", "Rekreativci", "Takmičari", "Vaterpolo škola"]
+LOCATIONS = ["Bazen 11. April", "SC Banjica", "Tašmajdan", "SC Voždovac", "Bazen Košutnjak"]
+FIRST_NAMES = ["Marko", "Jovana", "Luka", "Sara", "Stefan", "Ana", "Nikola", "Milica", "Filip", "Teodora",
+               "Vuk", "Mia", "Lazar", "Petra", "Andrej", "Dunja", "Pavle", "Lena", "Vasilije", "Iva"]
+LAST_NAMES = ["Petrović", "Nikolić", "Jovanović", "Marković", "Đorđević", "Stojanović", "Ilić",
+              "Stanković", "Pavlović", "Milošević", "Popović", "Kostić", "Tomić", "Lukić"]
+MESSAGES = [
+    "Podsetnik: trening u {day} počinje u {hour}h.",
+    "Obaveštavamo roditelje da je termin {group} pomeren zbog takmičenja.",
+    "Molimo da članarinu za tekući mesec uplatite do 15.",
+    "Bazen je zatvoren zbog tehničkih radova, trening se nadoknađuje.",
+    "Čestitamo svim plivačima na odličnim rezultatima!",
+    "Ponesite kape i naočare, od sledeće nedelje radimo skokove.",
+]
+
+PARENTS_PER_MEMBER = 0.65   # Siblings share a parent
+SECOND_ENROLLMENT = 0.3     # Share of members in two groups
+PRESENT_CHANCE = 0.85
+PAID_CHANCE = 0.92          # The rest are this month's debtors
+PRICES = [3500.0, 4000.0, 4500.0]
+
+CHUNK_ROWS = 50_000
+
+# Format SQLAlchemy uses for Date/DateTime/Time columns on SQLite; Postgres parses it as well
+DATETIME_FMT = "%Y-%m-%d %H:%M:%S.%f"
+TIME_FMT = "%H:%M:%S.%f"
+
+
+@dataclass(frozen=True)
+class Scale:
+    members: int
+    schedules: int
+    attendance: int
+    payments: int
+    messages: int
+
+
+SCALES = {
+    "small": Scale(members=500, schedules=12, attendance=50_000, payments=6_000, messages=5_000),
+    "medium": Scale(members=4_000, schedules=60, attendance=1_000_000, payments=100_000, messages=100_000),
+    # Roughly 50 clubs' worth
+    "large": Scale(members=20_000, schedules=300, attendance=5_000_000, payments=500_000, messages=500_000),
+}
+
+
+# ── Bulk loading ─────────────────────────────────────────────
+def _chunks(rows, size=CHUNK_ROWS):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _copy_chunk(cursor, table: str, columns, chunk):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in chunk:
+        writer.writerow(["" if v is None else v for v in row])  # Empty unquoted field = NULL
+    buf.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def bulk_load(conn, table: str, columns, rows) -> int:
+    """Streams tuples into the table through the DBAPI cursor; returns the row count."""
+    dialect = conn.dialect.name
+    cursor = conn.connection.cursor()
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    count = 0
+    try:
+        for chunk in _chunks(rows):
+            if dialect == "postgresql":
+                _copy_chunk(cursor, table, columns, chunk)
+            else:
+                cursor.executemany(sql, chunk)
+            count += len(chunk)
+    finally:
+        cursor.close()
+    return count
+
+
+def _reset_sequences(conn, tables):
+    """Explicit ids bypass Postgres sequences; move them past the loaded rows."""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tables:
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        ))
+
+
+# ── Row generators ───────────────────────────────────────────
+class Generator:
+    def __init__(self, scale: Scale, seed: int, password_hash: str):
+        self.scale = scale
+        self.rnd = random.Random(seed)
+        self.password_hash = password_hash
+        self.today = date.today()
+        self.n_coaches = max(1, scale.schedules // 10)
+        self.n_parents = max(1, int(scale.members * PARENTS_PER_MEMBER))
+        # User ids: 1 owner, then coaches, then parents
+        self.first_coach_id = 2
+        self.first_parent_id = 2 + self.n_coaches
+        self.schedule_days = []      # schedule id - 1 -> weekday index (0 = PON)
+        self.schedule_coaches = []
+        self.enrollments = []        # (member_id, schedule_id) of active enrollments
+
+    def _name(self) -> str:
+        return f"{self.rnd.choice(FIRST_NAMES)} {self.rnd.choice(LAST_NAMES)}"
+
+    def users(self):
+        created = datetime.combine(self.today - timedelta(days=3 * 365), datetime.min.time()).strftime(DATETIME_FMT)
+
+        def user(user_id, email, name, role, phone):
+            return (user_id, email, self.password_hash, name, role.name, phone, 1, created,
+                    models.search_key(name), models.search_key(email))
+
+        yield user(1, "owner@club.test", "Vlasnik Kluba", models.Role.OWNER, None)
+        for i in range(self.n_coaches):
+            yield user(self.first_coach_id + i, f"trener{i + 1}@club.test", self._name(), models.Role.COACH,
+                       f"065{i:07d}")
+        for i in range(self.n_parents):
+            yield user(self.first_parent_id + i, f"roditelj{i + 1}@club.test", self._name(), models.Role.PARENT,
+                       f"06{i:08d}")
+
+    def members(self):
+        rnd = self.rnd
+        for i in range(self.scale.members):
+            parent_id = self.first_parent_id + i * self.n_parents // self.scale.members
+            age_days = rnd.randint(4 * 365, 17 * 365)
+            notes = rnd.choice(["Alergija na hlor", "Astma", "Ne sme da skače na glavu"]) if rnd.random() < 0.05 else None
+            yield (i + 1, parent_id, self._name(),
+                   (self.today - timedelta(days=age_days)).isoformat(), notes, 1)
+
+    def schedules(self):
+        rnd = self.rnd
+        for i in range(self.scale.schedules):
+            day = i % 7
+            hour = 8 + (i // 7) % 13
+            minutes = rnd.choice([45, 60, 90])
+            start = datetime(2000, 1, 1, hour)
+            coach_id = self.first_coach_id + i % self.n_coaches
+            self.schedule_days.append(day)
+            self.schedule_coaches.append(coach_id)
+            yield (i + 1, DAYS[day], start.strftime(TIME_FMT), (start + timedelta(minutes=minutes)).strftime(TIME_FMT),
+                   coach_id, rnd.choice([10, 15, 20, 30]), f"{rnd.choice(GROUPS)} {i + 1}",
+                   rnd.choice(LOCATIONS), 1)
+
+    def enrollment_rows(self):
+        rnd = self.rnd
+        weeks = self.attendance_weeks()
+        enrollment_id = 0
+        for member_id in range(1, self.scale.members + 1):
+            n = 2 if rnd.random() < SECOND_ENROLLMENT and self.scale.schedules > 1 else 1
+            for schedule_id in rnd.sample(range(1, self.scale.schedules + 1), n):
+                enrollment_id += 1
+                start = self.today - timedelta(weeks=weeks, days=rnd.randint(0, 60))
+                self.enrollments.append((member_id, schedule_id))
+                yield (enrollment_id, member_id, schedule_id, start.isoformat(), None, 1)
+
+    def attendance_weeks(self) -> int:
+        expected_enrollments = max(1, int(self.scale.members * (1 + SECOND_ENROLLMENT)))
+        return -(-self.scale.attendance // expected_enrollments)  # ceil
+
+    def attendance(self):
+        """Week by week back from today, one row per active enrollment, until the target count."""
+        if not self.enrollments:
+            return
+        rnd = self.rnd
+        # Most recent past occurrence of each weekday
+        last_day = [(self.today - timedelta(days=(self.today.weekday() - d) % 7)) for d in range(7)]
+        coaches = self.schedule_coaches
+        days = self.schedule_days
+
+        def rows():
+            week = 0
+            while True:
+                dates = [(last_day[d] - timedelta(weeks=week)).isoformat() for d in range(7)]
+                for member_id, schedule_id in self.enrollments:
+                    yield (schedule_id, member_id, coaches[schedule_id - 1], dates[days[schedule_id - 1]],
+                           1 if rnd.random() < PRESENT_CHANCE else 0)
+                week += 1
+
+        yield from islice(rows(), self.scale.attendance)
+
+    def payments(self):
+        """Month by month back from the current month, until the target count."""
+        rnd = self.rnd
+
+        def rows():
+            month_start = self.today.replace(day=1)
+            while True:
+                last_day = min(15, (self.today - month_start).days + 1)
+                for member_id in range(1, self.scale.members + 1):
+                    if rnd.random() >= PAID_CHANCE:
+                        continue
+                    paid_on = month_start + timedelta(days=rnd.randint(0, last_day - 1))
+                    created = datetime.combine(paid_on, datetime.min.time()) + timedelta(seconds=rnd.randint(28800, 72000))
+                    method = models.PaymentMethod.CASH if rnd.random() < 0.7 else models.PaymentMethod.BANK_TRANSFER
+                    yield (member_id, rnd.choice(PRICES), "RSD", paid_on.isoformat(), method.name,
+                           month_start.month, month_start.year, None, created.strftime(DATETIME_FMT))
+                month_start = (month_start - timedelta(days=1)).replace(day=1)
+
+        yield from islice(rows(), self.scale.payments)
+
+    def messages(self):
+        """Spread evenly over the last two years, oldest first."""
+        rnd = self.rnd
+        total = self.scale.messages
+        if not total:
+            return
+        newest = datetime.combine(self.today, datetime.min.time())
+        step = timedelta(days=730) / total
+        staff_ids = [1] + [self.first_coach_id + i for i in range(self.n_coaches)]
+        scopes = models.MessageScope
+        for i in range(total):
+            sent_at = newest - step * (total - i)
+            roll = rnd.random()
+            target_schedule_id = recipient_id = None
+            if roll < 0.3:
+                scope = scopes.BROADCAST_ALL
+            elif roll < 0.7:
+                scope = scopes.GROUP_SCHEDULE
+                target_schedule_id = rnd.randint(1, self.scale.schedules)
+            elif roll < 0.8:
+                scope = scopes.INTERNAL_STAFF
+            else:
+                scope = scopes.DIRECT
+                recipient_id = self.first_parent_id + rnd.randrange(self.n_parents)
+            schedule_no = rnd.randrange(self.scale.schedules)
+            content = rnd.choice(MESSAGES).format(day=DAYS[schedule_no % 7], hour=8 + (schedule_no // 7) % 13,
+                                                  group=f"Grupa {schedule_no + 1}")
+            yield (rnd.choice(staff_ids), content, None, sent_at.strftime(DATETIME_FMT), scope.name,
+                   target_schedule_id, recipient_id)
+
+
+# ── Runner ───────────────────────────────────────────────────
+TABLES = [
+    ("users", ["id", "email", "hashed_password", "full_name", "role", "phone_number", "is_active", "created_at",
+               "full_name_search", "email_search"],
+     Generator.users),
+    ("members", ["id", "parent_id", "full_name", "date_of_birth", "notes", "active"], Generator.members),
+    ("schedules", ["id", "day_of_week", "start_time", "end_time", "coach_id", "capacity", "group_name",
+                   "location", "is_active"], Generator.schedules),
+    ("enrollments", ["id", "member_id", "schedule_id", "start_date", "end_date", "active"],
+     Generator.enrollment_rows),
+    ("attendance", ["schedule_id", "member_id", "coach_id", "date", "is_present"], Generator.attendance),
+    ("payments", ["member_id", "amount", "currency", "payment_date", "payment_method", "month", "year", "notes",
+                  "created_at"], Generator.payments),
+    ("messages", ["sender_id", "content", "image_url", "sent_at", "scope", "target_schedule_id", "recipient_id"],
+     Generator.messages),
+]
+ID_TABLES = ["users", "members", "schedules", "enrollments"]
+
+
+def prepare_schema(engine, reset: bool):
+    if reset:
+        database.Base.metadata.drop_all(bind=engine)
+        migrations.schema_version.drop(bind=engine, checkfirst=True)
+        print("Obrisane postojeće tabele.")
+    with engine.begin() as conn:
+        migrations.upgrade(conn)
+        if conn.execute(select(func.count()).select_from(models.User.__table__)).scalar():
+            sys.exit("Baza nije prazna; pokreni sa --reset da bi se obrisala.")
+
+
+def generate(engine, scale: Scale, seed: int, password: str):
+    if engine.dialect.name not in ("sqlite", "postgresql"):
+        sys.exit(f"Nepodržana baza: {engine.dialect.name}")
+    gen = Generator(scale, seed, get_password_hash(password))
+    started = time.perf_counter()
+
+    with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            # Throwaway data: no need to fsync every commit of the load
+            conn.exec_driver_sql("PRAGMA synchronous = OFF")
+        # Building secondary indexes once at the end is much cheaper than maintaining them per row
+        indexes = [index for table, _, _ in TABLES for index in database.Base.metadata.tables[table].indexes]
+        for index in indexes:
+            conn.execute(DropIndex(index, if_exists=True))
+        for table, columns, rows in TABLES:
+            table_started = time.perf_counter()
+            count = bulk_load(conn, table, columns, rows(gen))
+            print(f"  {table:<12}{count:>10,} redova  {time.perf_counter() - table_started:6.1f}s")
+        index_started = time.perf_counter()
+        for index in indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+        print(f"  {'indeksi':<12}{len(indexes):>10}        {time.perf_counter() - index_started:6.1f}s")
+        _reset_sequences(conn, ID_TABLES)
+
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE"))
+    else:
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+    print(f"Gotovo za {time.perf_counter() - started:.1f}s ({engine.url.render_as_string(hide_password=True)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic club data for load testing.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="large")
+    for field in ("members", "schedules", "attendance", "payments", "messages"):
+        parser.add_argument(f"--{field}", type=int, help=f"Override the scale's {field} count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default="test1234", help="Password of every generated account")
+    parser.add_argument("--database-url", default=database.SQLALCHEMY_DATABASE_URL)
+    parser.add_argument("--reset", action="store_true", help="Drop all existing tables first")
+    args = parser.parse_args()
+
+    overrides = {f: getattr(args, f) for f in ("members", "schedules", "attendance", "payments", "messages")
+                 if getattr(args, f) is not None}
+    scale = replace(SCALES[args.scale], **overrides)
+    if scale.members < 1 or scale.schedules < 1:
+        parser.error("--members and --schedules must be at least 1")
+
+    engine = database.make_engine(args.database_url)
+    prepare_schema(engine, args.reset)
+    print(f"Generišem: {scale}")
+    generate(engine, scale, args.seed, args.password)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Image storage for message attachments.
+
+Uploads are stored content-addressed on local disk (sha256 of the original
+bytes), so the same photo uploaded twice is written only once. Thumbnail and
+preview variants are rendered with Pillow in a process pool so resizing never
+runs on the event loop.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+# ── Configuration ────────────────────────────────────────────
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(BASE_DIR, "uploads"))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))  # 10 MB
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+
+URL_PREFIX = "/uploads"
+ORIGINAL = "original"
+
+# Variant name -> longest edge in pixels
+VARIANTS = {
+    "thumb": 160,
+    "preview": 960,
+}
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_URL_RE = re.compile(r"^/uploads/([0-9a-f]{64})/original$")
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# ── Paths & URLs ─────────────────────────────────────────────
+def is_valid_digest(digest: str) -> bool:
+    return bool(_DIGEST_RE.match(digest))
+
+
+def image_dir(digest: str) -> str:
+    return os.path.join(UPLOAD_DIR, digest[:2], digest)
+
+
+def variant_path(digest: str, variant: str) -> str:
+    return os.path.join(image_dir(digest), f"{variant}.jpg")
+
+
+def variant_urls(digest: str) -> Dict[str, str]:
+    urls = {name: f"{URL_PREFIX}/{digest}/{name}" for name in VARIANTS}
+    urls[ORIGINAL] = f"{URL_PREFIX}/{digest}/{ORIGINAL}"
+    return urls
+
+
+def variants_for_url(image_url: Optional[str]) -> Optional[Dict[str, str]]:
+    """Returns variant URLs for an image hosted by us, None for external URLs."""
+    if not image_url:
+        return None
+    match = _URL_RE.match(image_url)
+    if not match:
+        return None
+    return variant_urls(match.group(1))
+
+
+# ── Processing (runs in worker processes) ────────────────────
+def _render_variants(data: bytes, dest_dir: str) -> None:
+    from io import BytesIO
+    from PIL import Image, ImageOps
+
+    try:
+        img = Image.open(BytesIO(data))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+    except (OSError, SyntaxError, Image.DecompressionBombError) as exc:
+        raise ValueError("Invalid image") from exc
+
+    os.makedirs(dest_dir, exist_ok=True)
+    _atomic_save(img, os.path.join(dest_dir, f"{ORIGINAL}.jpg"), quality=90)
+    for name, edge in VARIANTS.items():
+        variant = img.copy()
+        variant.thumbnail((edge, edge))
+        _atomic_save(variant, os.path.join(dest_dir, f"{name}.jpg"), quality=80)
+
+
+def _atomic_save(img, path: str, quality: int) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    img.save(tmp_path, "JPEG", quality=quality, optimize=True, progressive=True)
+    os.replace(tmp_path, path)
+
+
+def _is_stored(digest: str) -> bool:
+    return all(
+        os.path.exists(variant_path(digest, name))
+        for name in (ORIGINAL, *VARIANTS)
+    )
+
+
+# ── Public API ───────────────────────────────────────────────
+async def store_image(data: bytes) -> str:
+    """
+    Stores an uploaded image and its variants, returns the content digest.
+    The original is re-encoded as JPEG, which also strips EXIF metadata.
+    Raises ValueError if the bytes are not a readable image.
+    """
+    digest = await asyncio.to_thread(lambda: hashlib.sha256(data).hexdigest())
+    if _is_stored(digest):
+        return digest
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_get_executor(), _render_variants, data, image_dir(digest))
+    return digest
@@ -0,0 +1,346 @@
+"""
+In-process periodic jobs with cron schedules.
+
+Every API worker runs the scheduler loop (started from the app lifespan).
+Each JOB_POLL_SECONDS it reads `job_locks`, and for every due job tries to
+claim it with one conditional UPDATE:
+
+    UPDATE job_locks SET locked_by = <me>, locked_until = now + JOB_LOCK_TTL,
+                         next_run_at = <next cron slot>
+    WHERE name = <job> AND next_run_at <= now AND (locked_until IS NULL OR locked_until < now)
+
+Only one worker's UPDATE matches, so each slot runs once across all
+workers; moving next_run_at in the same statement keeps a worker that polls
+just after the run from starting it again. A worker that dies mid-run
+leaves a lock that simply expires after JOB_LOCK_TTL. Every run is recorded
+in `job_runs`; /admin/jobs lists jobs and history and can trigger a run.
+
+With TENANTS, jobs run once per club, in the club's own database.
+
+Schedules use five cron fields in UTC (minute hour day-of-month month
+day-of-week; `*`, `a-b`, `a,b`, `*/n`), or @hourly / @daily / @weekly /
+@monthly. Jobs are registered with the decorator:
+
+    @job("purge_tokens", "@hourly", "Delete expired refresh tokens")
+    async def purge_tokens(db: AsyncSession) -> str: ...
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import socket
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import delete, exists, insert, literal, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+import audit, database, etags, models, retention, tokens
+
+# ── Configuration ────────────────────────────────────────────
+JOB_SCHEDULER_ENABLED = os.getenv("JOB_SCHEDULER", "1") == "1"
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 30))
+JOB_LOCK_TTL_SECONDS = int(os.getenv("JOB_LOCK_TTL_SECONDS", 900))  # Longest a run may take
+ENROLLMENT_RETENTION_DAYS = int(os.getenv("ENROLLMENT_RETENTION_DAYS", 365))
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+logger = logging.getLogger("jobs")
+
+
+# ── Cron ─────────────────────────────────────────────────────
+_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+
+
+def _parse_field(field: str, low: int, high: int) -> List[int]:
+    values = set()
+    for part in field.split(","):
+        base, _, step = part.partition("/")
+        if base == "*":
+            start, end = low, high
+        elif "-" in base:
+            start, end = (int(v) for v in base.split("-", 1))
+        else:
+            start = end = int(base)
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field {field!r} is outside {low}-{high}")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return sorted(values)
+
+
+class Cron:
+    def __init__(self, expression: str):
+        self.expression = expression
+        fields = _ALIASES.get(expression, expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = set(_parse_field(fields[2], 1, 31))
+        self.months = set(_parse_field(fields[3], 1, 12))
+        self.weekdays = {d % 7 for d in _parse_field(fields[4], 0, 7)}  # 0 and 7 are Sunday
+        # Like cron: when both day fields are restricted, either one may match
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, day: date) -> bool:
+        if day.month not in self.months:
+            return False
+        in_days = day.day in self.days
+        in_weekdays = day.isoweekday() % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First slot strictly after `moment`."""
+        start = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.date()
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        slot = datetime(day.year, day.month, day.day, hour, minute)
+                        if slot >= start:
+                            return slot
+            day += timedelta(days=1)
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+
+# ── Registry ─────────────────────────────────────────────────
+@dataclass
+class Job:
+    name: str
+    schedule: Cron
+    description: str
+    func: Callable[[AsyncSession], Awaitable[Optional[str]]]
+
+
+JOBS: Dict[str, Job] = {}
+
+
+def job(name: str, schedule: str, description: str = ""):
+    """Registers an async function(db) -> optional summary string as a periodic job."""
+    def decorator(func):
+        JOBS[name] = Job(name=name, schedule=Cron(schedule), description=description, func=func)
+        return func
+    return decorator
+
+
+# ── Jobs ─────────────────────────────────────────────────────
+@job("archive_messages", "30 2 * * *", "Move messages past MESSAGE_RETENTION_DAYS to the archive")
+async def archive_messages(db: AsyncSession) -> str:
+    # retention.py works on a sync Session; run_sync hands it one on this connection
+    moved = await db.run_sync(lambda session: retention.archive_messages(session))
+    return f"archived {moved} messages"
+
+
+@job("purge_tokens", "15 * * * *", "Delete expired refresh tokens and stale revocations")
+async def purge_tokens(db: AsyncSession) -> str:
+    return f"removed {await tokens.purge_expired(db)} rows"
+
+
+@job("cleanup_enrollments", "0 3 * * *", "Delete enrollments that ended more than ENROLLMENT_RETENTION_DAYS ago")
+async def cleanup_enrollments(db: AsyncSession) -> str:
+    cutoff = date.today() - timedelta(days=ENROLLMENT_RETENTION_DAYS)
+    result = await db.execute(
+        delete(models.Enrollment)
+        .where(models.Enrollment.active == False, models.Enrollment.end_date < cutoff)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        await etags.bump(db, etags.MEMBERS)  # /members/mine lists ended enrollments too
+    await db.commit()
+    return f"deleted {result.rowcount} enrollments"
+
+
+@job("debtor_snapshot", "0 5 1 * *", "Snapshot last month's debtors into debtor_snapshots")
+async def debtor_snapshot(db: AsyncSession) -> str:
+    last_month = date.today().replace(day=1) - timedelta(days=1)
+    year, month = last_month.year, last_month.month
+    parent = aliased(models.User)
+    paid = exists().where(
+        models.Payment.member_id == models.Member.id,
+        models.Payment.year == year,
+        models.Payment.month == month,
+    )
+    # Re-running replaces the month's snapshot
+    await db.execute(delete(models.DebtorSnapshot).where(
+        models.DebtorSnapshot.year == year, models.DebtorSnapshot.month == month,
+    ))
+    result = await db.execute(
+        insert(models.DebtorSnapshot).from_select(
+            ["year", "month", "member_id", "full_name", "parent_name", "parent_phone"],
+            select(
+                literal(year), literal(month), models.Member.id, models.Member.full_name,
+                parent.full_name, parent.phone_number,
+            )
+            .select_from(models.Member)
+            .outerjoin(parent, parent.id == models.Member.parent_id)
+            .where(models.Member.active == True, ~paid),
+        )
+    )
+    await db.commit()
+    return f"{result.rowcount} debtors for {month:02d}/{year}"
+
+
+# ── Claiming and running ─────────────────────────────────────
+class JobLocked(Exception):
+    """The job is already running (here or on another worker)."""
+
+
+def _clubs() -> List[Optional[str]]:
+    return database.TENANTS or [None]
+
+
+def _free(now: datetime):
+    return or_(models.JobLock.locked_until.is_(None), models.JobLock.locked_until < now)
+
+
+async def _claim(db: AsyncSession, job: Job, now: datetime, scheduled: bool) -> Optional[models.JobRun]:
+    """Takes the job's lock and records a running JobRun; None if another worker holds it."""
+    conditions = [models.JobLock.name == job.name, _free(now)]
+    values = {"locked_by": WORKER_ID, "locked_until": now + timedelta(seconds=JOB_LOCK_TTL_SECONDS)}
+    if scheduled:
+        conditions.append(models.JobLock.next_run_at <= now)
+        values["next_run_at"] = job.schedule.next_after(now)
+    result = await db.execute(update(models.JobLock).where(*conditions).values(**values))
+    if result.rowcount != 1:
+        await db.rollback()
+        return None
+    run = models.JobRun(
+        job_name=job.name,
+        trigger="schedule" if scheduled else "manual",
+        worker=WORKER_ID,
+        status="running",
+        started_at=now,
+    )
+    db.add(run)
+    await db.commit()
+    return run
+
+
+async def _execute(job: Job, run_id: int):
+    status, summary, error = "succeeded", None, None
+    source = audit.current_source.set(f"job:{job.name}")
+    try:
+        async with database.primary_session() as db:
+            summary = await job.func(db)
+    except Exception as exc:
+        logger.exception("Job %s failed", job.name)
+        status, error = "failed", f"{type(exc).__name__}: {exc}"
+    finally:
+        audit.current_source.reset(source)
+
+    async with database.primary_session() as db:
+        await db.execute(
+            update(models.JobRun).where(models.JobRun.id == run_id)
+            .values(status=status, finished_at=datetime.utcnow(), result=summary, error=error)
+        )
+        await db.execute(
+            update(models.JobLock).where(models.JobLock.name == job.name, models.JobLock.locked_by == WORKER_ID)
+            .values(locked_by=None, locked_until=None)
+        )
+        await db.commit()
+
+
+async def ensure_locks(db: AsyncSession, now: datetime) -> Dict[str, models.JobLock]:
+    """Lock rows of all registered jobs, creating missing ones with their first slot."""
+    locks = {row.name: row for row in (await db.scalars(select(models.JobLock))).all()}
+    missing = [j for j in JOBS.values() if j.name not in locks]
+    if missing:
+        for j in missing:
+            db.add(models.JobLock(name=j.name, next_run_at=j.schedule.next_after(now)))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()  # Another worker created them first
+        locks = {row.name: row for row in (await db.scalars(select(models.JobLock))).all()}
+    return locks
+
+
+async def run_due_jobs(now: Optional[datetime] = None) -> List[asyncio.Task]:
+    """One scheduler tick for the current club: claims due jobs and starts them."""
+    now = now or datetime.utcnow()
+    started = []
+    async with database.primary_session() as db:
+        locks = await ensure_locks(db, now)
+        due = [
+            JOBS[name] for name, lock in locks.items()
+            if name in JOBS and lock.next_run_at is not None and lock.next_run_at <= now
+            and (lock.locked_until is None or lock.locked_until < now)
+        ]
+        for job_ in due:
+            run = await _claim(db, job_, now, scheduled=True)
+            if run is not None:
+                started.append(_spawn(job_, run.id))
+    return started
+
+
+async def trigger(db: AsyncSession, name: str) -> models.JobRun:
+    """Starts a job now, outside its schedule; raises KeyError / JobLocked."""
+    job_ = JOBS[name]
+    now = datetime.utcnow()
+    await ensure_locks(db, now)
+    run = await _claim(db, job_, now, scheduled=False)
+    if run is None:
+        raise JobLocked(name)
+    _spawn(job_, run.id)
+    return run
+
+
+# ── Scheduler loop ───────────────────────────────────────────
+_loop_task: Optional[asyncio.Task] = None
+_running: Set[asyncio.Task] = set()
+
+
+def _spawn(job_: Job, run_id: int) -> asyncio.Task:
+    # A fresh context with only the club set: a manual run must not carry the
+    # triggering request's user, read-your-writes state or audit source
+    context = contextvars.Context()
+    context.run(database.current_tenant.set, database.current_tenant.get())
+    task = asyncio.get_running_loop().create_task(_execute(job_, run_id), context=context)
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return task
+
+
+async def _scheduler():
+    while True:
+        for club in _clubs():
+            token = database.current_tenant.set(club)
+            try:
+                await run_due_jobs()
+            except Exception:
+                logger.exception("Job scheduler tick failed for club %s", club)
+            finally:
+                database.current_tenant.reset(token)
+        await asyncio.sleep(JOB_POLL_SECONDS)
+
+
+def start():
+    global _loop_task
+    if JOB_SCHEDULER_ENABLED and _loop_task is None:
+        _loop_task = asyncio.get_running_loop().create_task(_scheduler())
+
+
+async def stop():
+    """Stops polling and cancels runs in progress; their locks expire after JOB_LOCK_TTL_SECONDS."""
+    global _loop_task
+    if _loop_task is not None:
+        _loop_task.cancel()
+        await asyncio.gather(_loop_task, return_exceptions=True)
+        _loop_task = None
+    for task in list(_running):
+        task.cancel()
+    if _running:
+        await asyncio.gather(*_running, return_exceptions=True)
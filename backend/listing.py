@@ -0,0 +1,29 @@
+"""
+Fast serialization path for list endpoints.
+
+List handlers select only the columns their response needs as Core rows and
+return them through orjson, instead of loading ORM objects and validating a
+Pydantic model per row. The endpoint's response_model still documents the
+shape in OpenAPI, so the row keys must match its field names.
+"""
+
+from typing import Any, Iterable, List, Type
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def columns_for(model: Any, schema: Type[BaseModel]) -> list:
+    """Table columns of `model` that appear as fields on `schema` (enriched fields are left out)."""
+    table_columns = model.__table__.c
+    return [getattr(model, name) for name in schema.model_fields if name in table_columns]
+
+
+def row_dicts(result) -> List[dict]:
+    """Result of a Core select -> list of plain dicts keyed by column label."""
+    return [dict(row) for row in result.mappings()]
+
+
+def respond(items: Iterable[dict]) -> ORJSONResponse:
+    # orjson serializes date/time/datetime and Enum values natively
+    return ORJSONResponse(items if isinstance(items, list) else list(items))
@@ -1,20 +1,43 @@
-from fastapi import FastAPI, Request
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.exc import IntegrityError
-from database import engine, Base
+import audit, compression, consistency, database, images, jobs, metrics, migrations, querycheck, tenancy
 # [FIX] Dodao sam 'attendance' u listu importa
-from routers import auth, users, schedules, messages, skills, members, attendance, dashboard, payments
+from routers import auth, users, schedules, messages, skills, members, attendance, dashboard, payments, uploads, admin
+
+# Set to 0 when migrations run as a separate deploy step (`python -m migrations`)
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "1") == "1"
+# If set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
 
 
-# Create tables on startup
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema changes go through versioned migrations; when the schema is
+    # current this is a single query. Seeding is explicit: `python seed_skills.py`.
+    # With TENANTS, each club's database is migrated when it is first opened.
+    if MIGRATE_ON_STARTUP and not database.TENANTS:
+        async with database.async_engine.begin() as conn:
+            await conn.run_sync(migrations.upgrade)
+    # Periodic jobs (JOB_SCHEDULER=0 turns the loop off on this worker)
+    jobs.start()
+    # Audit log: pozadinski upis u audit_log u serijama
+    audit.start()
+    yield
+    await jobs.stop()
+    await audit.stop()
+    images.shutdown()
+    await database.dispose_tenants()
+    await database.async_engine.dispose()
+    for replica in database.replica_engines:
+        await replica.dispose()
 
-# Auto-seed skills if empty
-from seed_skills import seed_skills
-seed_skills()
 
-app = FastAPI(title="PK Ušće CMS")
+app = FastAPI(title="PK Ušće CMS", lifespan=lifespan)
 
 # Global IntegrityError handler — catches FK violations and returns
 # a clean 400 instead of a CORS-breaking 500.
@@ -33,8 +56,39 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[consistency.HEADER],
 )
 
+# Kompresija odgovora (zstd/br/gzip po Accept-Encoding), SSE se ne kompresuje
+app.add_middleware(compression.CompressionMiddleware)
+
+# Audit log: izvor izmene ("DELETE /members/5") za svaki zahtev koji menja podatke
+app.add_middleware(audit.AuditSourceMiddleware)
+
+# Read-your-writes i preko drugih workera: potpisani X-Read-After rok ide sa klijentom
+app.add_middleware(consistency.ReadYourWritesMiddleware)
+
+# Prometheus: per-route latency, status codes and SQL statements per request
+metrics.instrument_engine(database.async_engine)
+metrics.instrument_engine(database.engine)
+for replica in database.replica_engines:
+    metrics.instrument_engine(replica)
+database.engine_hooks.append(metrics.instrument_engine)
+app.add_middleware(metrics.PrometheusMiddleware)
+
+# Development/test: N+1 detection and query budgets (QUERY_DETECTOR=log|raise)
+if querycheck.enabled():
+    querycheck.instrument_engine(database.async_engine)
+    querycheck.instrument_engine(database.engine)
+    for replica in database.replica_engines:
+        querycheck.instrument_engine(replica)
+    database.engine_hooks.append(querycheck.instrument_engine)
+    app.add_middleware(querycheck.QueryDetectorMiddleware)
+
+# Više klubova (TENANTS): klub iz Host-a, X-Club zaglavlja ili tokena bira bazu
+if database.TENANTS:
+    app.add_middleware(tenancy.TenantMiddleware)
+
 # Include Routers
 app.include_router(auth.router)
 app.include_router(users.router)
@@ -46,6 +100,14 @@ app.include_router(skills.router)
 app.include_router(attendance.router)
 app.include_router(dashboard.router)
 app.include_router(payments.router)
+app.include_router(uploads.router)
+app.include_router(admin.router)
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics(request: Request):
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 def read_root():
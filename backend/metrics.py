@@ -0,0 +1,209 @@
+"""
+Prometheus metrics without a client library.
+
+An ASGI middleware records per-route request counts, latency histograms and
+in-flight requests. SQLAlchemy engine events add the number and total time
+of SQL statements to the request that issued them (tracked through a
+contextvar). Everything is rendered at /metrics in the Prometheus text
+exposition format.
+
+Hot-path cost is a few dict lookups per request and per statement: all
+updates happen on the event loop thread (or under the GIL from the thread
+pool), so no locks are taken. Routes are labelled by their path template
+(`/members/{member_id}`), never by the raw URL.
+"""
+
+import bisect
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+
+import utils
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+# ── Metric types ─────────────────────────────────────────────
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, label_values: tuple = (), amount: float = 1.0):
+        self.values[label_values] = self.values.get(label_values, 0.0) + amount
+
+    def samples(self):
+        for label_values, value in self.values.items():
+            yield self.name, _labels(self.labels, label_values), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, label_values: tuple, value: float):
+        self.values[label_values] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...], buckets: tuple):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        # label values -> [bucket counts..., sum, count]
+        self.values: Dict[tuple, list] = {}
+
+    def observe(self, label_values: tuple, value: float):
+        state = self.values.get(label_values)
+        if state is None:
+            state = self.values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            state[index] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def samples(self):
+        for label_values, state in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield f"{self.name}_bucket", _labels(self.labels + ("le",), label_values + (str(bound),)), cumulative
+            yield f"{self.name}_bucket", _labels(self.labels + ("le",), label_values + ("+Inf",)), state[-1]
+            yield f"{self.name}_sum", _labels(self.labels, label_values), state[-2]
+            yield f"{self.name}_count", _labels(self.labels, label_values), state[-1]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)) + "}"
+
+
+# ── Registry ─────────────────────────────────────────────────
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+LATENCY = Histogram("http_request_duration_seconds", "Time until the response body was sent.",
+                    ("method", "route"), LATENCY_BUCKETS)
+IN_FLIGHT = Gauge("http_requests_in_progress", "Requests currently being served.")
+SQL_STATEMENTS = Counter("db_statements_total", "SQL statements executed, by route.", ("route",))
+SQL_SECONDS = Counter("db_statement_seconds_total", "Time spent in SQL statements, by route.", ("route",))
+SQL_PER_REQUEST = Histogram("db_statements_per_request", "SQL statements per request.",
+                            ("route",), STATEMENT_BUCKETS)
+
+REGISTRY = [REQUESTS, LATENCY, IN_FLIGHT, SQL_STATEMENTS, SQL_SECONDS, SQL_PER_REQUEST]
+
+_in_flight = 0
+
+
+class RequestStats:
+    __slots__ = ("statements", "sql_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_sql_stats", default=None)
+
+
+# ── SQL instrumentation ──────────────────────────────────────
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["_metrics_started"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += time.perf_counter() - started
+
+
+def _handle_error(exception_context):
+    # Keep the start-time stack balanced when a statement fails
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("_metrics_started"):
+        conn.info["_metrics_started"].pop()
+
+
+def instrument_engine(engine):
+    """Attributes SQL statements on this (sync or async) engine to the current request."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+# ── ASGI middleware ──────────────────────────────────────────
+class PrometheusMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global _in_flight
+        started = time.perf_counter()
+        stats = RequestStats()
+        token = _current.set(stats)
+        status_code = 500
+        finished_at = None
+
+        async def send_wrapper(message):
+            nonlocal status_code, finished_at
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished_at = time.perf_counter()  # Background tasks run after this
+            await send(message)
+
+        _in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _in_flight -= 1
+            _current.reset(token)
+            route = scope.get("route")
+            route_label = getattr(route, "path_format", None) or getattr(route, "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+            REQUESTS.inc((method, route_label, str(status_code)))
+            LATENCY.observe((method, route_label), (finished_at or time.perf_counter()) - started)
+            SQL_STATEMENTS.inc((route_label,), stats.statements)
+            SQL_SECONDS.inc((route_label,), stats.sql_seconds)
+            SQL_PER_REQUEST.observe((route_label,), stats.statements)
+
+
+# ── Exposition ───────────────────────────────────────────────
+def _password_samples():
+    m = utils.password_metrics
+    yield "counter", "password_hash_calls_total", "bcrypt operations started.", m["calls"]
+    yield "counter", "password_hash_rejected_total", "bcrypt operations rejected with 503 (queue full).", m["rejected"]
+    yield "counter", "password_hash_queue_seconds_total", "Time spent waiting for a bcrypt worker.", m["queue_seconds_total"]
+    yield "gauge", "password_hash_queue_seconds_max", "Longest wait for a bcrypt worker.", m["queue_seconds_max"]
+
+
+def render() -> str:
+    IN_FLIGHT.set((), _in_flight)
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {value}")
+    for kind, name, help_text, value in _password_samples():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
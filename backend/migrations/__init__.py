@@ -0,0 +1,80 @@
+"""
+Versioned schema migrations.
+
+Each migration is a module `mNNNN_<description>.py` in this package with an
+`upgrade(conn)` function that receives a sync SQLAlchemy Connection. Applied
+versions are recorded in the `schema_version` table, and pending migrations
+run in version order inside the caller's transaction.
+
+Databases created by the old `create_all` startup have no `schema_version`
+table; the baseline migration uses `checkfirst`, so it only creates what is
+missing and then stamps version 1.
+
+Migrations are frozen: each one spells out the tables, columns and indexes
+it creates (its own MetaData or plain SQL) and never reads models.py, so a
+fresh database is built step by step exactly like an existing one is
+upgraded. m0002-m0006 also use IF NOT EXISTS / checkfirst, because databases
+adopted from create_all may already have their objects; migrations added
+from now on can assume the previous version's schema.
+
+    python -m migrations            # apply pending migrations
+    python -m migrations current    # print the current version
+"""
+
+import importlib
+import pkgutil
+import re
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, select, text
+
+VERSION_TABLE = "schema_version"
+
+# Arbitrary key for the Postgres advisory lock that serializes concurrent upgrades
+_LOCK_KEY = 0x706B7573  # "pkus"
+
+_MODULE_RE = re.compile(r"^m(\d{4})_(\w+)$")
+
+_metadata = MetaData()
+schema_version = Table(
+    VERSION_TABLE, _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def available() -> List[Tuple[int, str]]:
+    """(version, module name) of every migration in the package, in order."""
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        match = _MODULE_RE.match(info.name)
+        if match:
+            found.append((int(match.group(1)), info.name))
+    return sorted(found)
+
+
+def current_version(conn) -> int:
+    schema_version.create(conn, checkfirst=True)
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def upgrade(conn) -> List[int]:
+    """Applies pending migrations on the connection; returns the applied versions."""
+    if conn.dialect.name == "postgresql":
+        # Several workers may start at once; only one of them migrates
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+
+    current = current_version(conn)
+    applied = []
+    for version, name in available():
+        if version <= current:
+            continue
+        module = importlib.import_module(f"{__name__}.{name}")
+        module.upgrade(conn)
+        conn.execute(schema_version.insert().values(
+            version=version, name=name, applied_at=datetime.utcnow(),
+        ))
+        applied.append(version)
+    return applied
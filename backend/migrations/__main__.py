@@ -0,0 +1,43 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations  # noqa: E402
+import database  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+parser = argparse.ArgumentParser(prog="python -m migrations", description="Apply database schema migrations.")
+parser.add_argument("command", nargs="?", choices=["upgrade", "current"], default="upgrade")
+parser.add_argument("--tenant", help="Club id from TENANTS, or 'all'; default is the DATABASE_URL database")
+args = parser.parse_args()
+
+
+def run(engine, label: str, schema: str = None):
+    with engine.begin() as conn:
+        if schema and args.command == "upgrade":
+            conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+        if args.command == "current":
+            print(f"{label}Schema version: {migrations.current_version(conn)} (latest {migrations.available()[-1][0]})")
+        else:
+            applied = migrations.upgrade(conn)
+            if applied:
+                print(f"{label}Applied migrations: {', '.join(str(v) for v in applied)}")
+            else:
+                print(f"{label}Schema is up to date.")
+
+
+if args.tenant is None:
+    run(database.engine, "")
+else:
+    clubs = database.TENANTS if args.tenant == "all" else [args.tenant]
+    for club in clubs:
+        if club not in database.TENANTS:
+            sys.exit(f"Unknown club {club!r}; TENANTS={','.join(database.TENANTS)}")
+        url, schema = database.tenant_url(club)
+        engine = database.make_engine(url, schema=schema)
+        try:
+            run(engine, f"[{club}] ", schema)
+        finally:
+            engine.dispose()
@@ -0,0 +1,177 @@
+"""
+Baseline: the schema as it was when migrations were introduced.
+
+Frozen on purpose: this file must not follow models.py. Everything added
+later (indexes, tables, columns) belongs to its own migration, so a fresh
+database goes through the same steps as an existing one. Databases created
+by the old create_all startup already have these tables; checkfirst skips
+them and the version is stamped.
+"""
+
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, Enum, Float, ForeignKey, Integer, MetaData, String, Table, Text, Time, func,
+)
+
+metadata = MetaData()
+
+_role = Enum("OWNER", "COACH", "PARENT", name="role")
+_message_scope = Enum("DIRECT", "GROUP_SCHEDULE", "BROADCAST_ALL", "INTERNAL_STAFF", name="messagescope")
+_payment_method = Enum("CASH", "BANK_TRANSFER", name="paymentmethod")
+_request_status = Enum("NEW", "HANDLED", "DECLINED", name="schedulerequeststatus")
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True, nullable=False),
+    Column("hashed_password", String, nullable=False),
+    Column("full_name", String, nullable=False),
+    Column("role", _role, nullable=False),
+    Column("phone_number", String, nullable=True),
+    Column("telegram_chat_id", String, nullable=True),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "members", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("parent_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("full_name", String, nullable=False),
+    Column("date_of_birth", Date, nullable=False),
+    Column("notes", Text, nullable=True),
+    Column("active", Boolean),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "schedules", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("day_of_week", String, nullable=False),
+    Column("start_time", Time, nullable=False),
+    Column("end_time", Time, nullable=False),
+    Column("coach_id", Integer, ForeignKey("users.id"), nullable=True),
+    Column("capacity", Integer),
+    Column("group_name", String, nullable=True),
+    Column("location", String, nullable=True),
+    Column("is_active", Boolean),
+)
+
+Table(
+    "enrollments", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("member_id", Integer, ForeignKey("members.id"), nullable=False),
+    Column("schedule_id", Integer, ForeignKey("schedules.id"), nullable=False),
+    Column("start_date", Date, nullable=False),
+    Column("end_date", Date, nullable=True),
+    Column("active", Boolean),
+)
+
+Table(
+    "schedule_cancellations", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("schedule_id", Integer, ForeignKey("schedules.id"), nullable=False),
+    Column("cancel_date", Date, nullable=False),
+    Column("reason", String, nullable=True),
+)
+
+Table(
+    "attendance", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("schedule_id", Integer, ForeignKey("schedules.id"), nullable=False),
+    Column("member_id", Integer, ForeignKey("members.id"), nullable=False),
+    Column("coach_id", Integer, ForeignKey("users.id"), nullable=True),
+    Column("date", Date, nullable=False),
+    Column("is_present", Boolean),
+)
+
+Table(
+    "messages", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("sender_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("content", Text, nullable=False),
+    Column("image_url", String, nullable=True),
+    Column("sent_at", DateTime(timezone=True), server_default=func.now()),
+    Column("scope", _message_scope, nullable=False),
+    Column("target_schedule_id", Integer, ForeignKey("schedules.id"), nullable=True),
+    Column("recipient_id", Integer, ForeignKey("users.id"), nullable=True),
+)
+
+Table(
+    "message_archive", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("sender_id", Integer, nullable=False, index=True),
+    Column("sender_name", String, nullable=True),
+    Column("content", Text, nullable=False),
+    Column("image_url", String, nullable=True),
+    Column("sent_at", DateTime(timezone=True), nullable=True, index=True),
+    Column("scope", _message_scope, nullable=False),
+    Column("target_schedule_id", Integer, nullable=True),
+    Column("recipient_id", Integer, nullable=True),
+    Column("archived_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "skills", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, unique=True, index=True, nullable=False),
+    Column("description", String, nullable=True),
+    Column("category_label", String, nullable=True),
+    Column("display_order", Integer),
+)
+
+Table(
+    "member_skills", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("member_id", Integer, ForeignKey("members.id"), nullable=False),
+    Column("skill_id", Integer, ForeignKey("skills.id"), nullable=False),
+    Column("acquired_at", Date, nullable=False),
+    Column("coach_id", Integer, ForeignKey("users.id"), nullable=True),
+)
+
+Table(
+    "payments", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("member_id", Integer, ForeignKey("members.id"), nullable=False),
+    Column("amount", Float, nullable=False),
+    Column("currency", String),
+    Column("payment_date", Date, nullable=False),
+    Column("payment_method", _payment_method, nullable=False),
+    Column("month", Integer, nullable=False),
+    Column("year", Integer, nullable=False),
+    Column("notes", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "schedule_requests", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("parent_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+    Column("message", Text, nullable=False),
+    Column("status", _request_status, nullable=False, index=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("handled_at", DateTime(timezone=True), nullable=True),
+    Column("handled_by_id", Integer, ForeignKey("users.id"), nullable=True),
+)
+
+Table(
+    "refresh_tokens", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+    Column("token_hash", String, unique=True, index=True, nullable=False),
+    Column("family_id", String, index=True, nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("revoked_at", DateTime, nullable=True),
+    Column("replaced_by_id", Integer, nullable=True),
+)
+
+Table(
+    "token_revocations", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, nullable=False, index=True),
+    Column("revoked_at", DateTime, nullable=False, index=True),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(bind=conn, checkfirst=True)
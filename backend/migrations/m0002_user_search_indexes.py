@@ -0,0 +1,20 @@
+"""
+Indexes for /users search (case-insensitive prefix on name and email, phone lookup).
+
+create_all never adds indexes to a table that already exists, so databases
+created before these were declared on the model don't have them yet.
+"""
+
+from sqlalchemy import text
+
+# IF NOT EXISTS: databases adopted from create_all may already have them
+STATEMENTS = (
+    "CREATE INDEX IF NOT EXISTS ix_users_full_name_lower ON users (lower(full_name))",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_lower ON users (lower(email))",
+    "CREATE INDEX IF NOT EXISTS ix_users_phone_number ON users (phone_number)",
+)
+
+
+def upgrade(conn):
+    for statement in STATEMENTS:
+        conn.execute(text(statement))
@@ -0,0 +1,28 @@
+"""
+Composite indexes for the hot filters (attendance sheet, debtors, message feed, dashboard).
+
+On a large attendance table the CREATE INDEX takes a while and blocks
+writes to that table until it's done.
+"""
+
+from sqlalchemy import text
+
+# IF NOT EXISTS: databases adopted from create_all may already have them
+STATEMENTS = (
+    "CREATE INDEX IF NOT EXISTS ix_members_parent_id ON members (parent_id)",
+    "CREATE INDEX IF NOT EXISTS ix_enrollments_schedule_active ON enrollments (schedule_id, active)",
+    "CREATE INDEX IF NOT EXISTS ix_enrollments_member_active ON enrollments (member_id, active)",
+    "CREATE INDEX IF NOT EXISTS ix_attendance_schedule_date ON attendance (schedule_id, date)",
+    "CREATE INDEX IF NOT EXISTS ix_attendance_member_date ON attendance (member_id, date)",
+    "CREATE INDEX IF NOT EXISTS ix_attendance_date ON attendance (date)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_scope_sent_at ON messages (scope, sent_at)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_sender_sent_at ON messages (sender_id, sent_at)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_recipient_sent_at ON messages (recipient_id, sent_at)",
+    "CREATE INDEX IF NOT EXISTS ix_payments_period_member ON payments (year, month, member_id)",
+    "CREATE INDEX IF NOT EXISTS ix_payments_created_at ON payments (created_at)",
+)
+
+
+def upgrade(conn):
+    for statement in STATEMENTS:
+        conn.execute(text(statement))
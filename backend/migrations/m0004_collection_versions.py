@@ -0,0 +1,22 @@
+"""Version stamps behind the ETags of /skills/, /schedules/ and /members/mine."""
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, select
+
+metadata = MetaData()
+
+collection_versions = Table(
+    "collection_versions", metadata,
+    Column("name", String, primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+# Collections at the time of this migration; later ones get a row on first bump
+COLLECTIONS = ("skills", "schedules", "members")
+
+
+def upgrade(conn):
+    collection_versions.create(conn, checkfirst=True)
+    existing = set(conn.execute(select(collection_versions.c.name)).scalars())
+    missing = [{"name": name, "version": 1} for name in COLLECTIONS if name not in existing]
+    if missing:
+        conn.execute(collection_versions.insert(), missing)
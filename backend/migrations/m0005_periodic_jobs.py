@@ -0,0 +1,45 @@
+"""Tables of the periodic job scheduler (jobs.py) and the month-end debtor snapshots."""
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text, func
+
+metadata = MetaData()
+
+Table(
+    "job_locks", metadata,
+    Column("name", String, primary_key=True),
+    Column("next_run_at", DateTime, nullable=True),
+    Column("locked_by", String, nullable=True),
+    Column("locked_until", DateTime, nullable=True),
+)
+
+job_runs = Table(
+    "job_runs", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("job_name", String, nullable=False),
+    Column("trigger", String, nullable=False),
+    Column("worker", String, nullable=False),
+    Column("status", String, nullable=False),
+    Column("started_at", DateTime, nullable=False),
+    Column("finished_at", DateTime, nullable=True),
+    Column("result", Text, nullable=True),
+    Column("error", Text, nullable=True),
+)
+Index("ix_job_runs_name_id", job_runs.c.job_name, job_runs.c.id)
+
+debtor_snapshots = Table(
+    "debtor_snapshots", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("year", Integer, nullable=False),
+    Column("month", Integer, nullable=False),
+    Column("member_id", Integer, nullable=False),
+    Column("full_name", String, nullable=False),
+    Column("parent_name", String, nullable=True),
+    Column("parent_phone", String, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+Index("ix_debtor_snapshots_period", debtor_snapshots.c.year, debtor_snapshots.c.month)
+
+
+def upgrade(conn):
+    # checkfirst also creates the tables' indexes
+    metadata.create_all(bind=conn, checkfirst=True)
@@ -0,0 +1,24 @@
+"""Audit log of data changes (audit.py)."""
+
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+audit_log = Table(
+    "audit_log", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("created_at", DateTime, nullable=False),
+    Column("actor_id", Integer, nullable=True),
+    Column("source", String, nullable=True),
+    Column("action", String, nullable=False),
+    Column("entity", String, nullable=False),
+    Column("entity_id", String, nullable=True),
+    Column("changes", JSON, nullable=False),
+)
+Index("ix_audit_log_entity", audit_log.c.entity, audit_log.c.entity_id, audit_log.c.id)
+Index("ix_audit_log_actor", audit_log.c.actor_id, audit_log.c.id)
+
+
+def upgrade(conn):
+    # checkfirst also creates the table's indexes
+    metadata.create_all(bind=conn, checkfirst=True)
@@ -0,0 +1,8 @@
+"""Transaction id on audit_log entries, to find the cascade of a change (audit.py)."""
+
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text("ALTER TABLE audit_log ADD COLUMN txn_id VARCHAR"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_audit_log_txn ON audit_log (txn_id)"))
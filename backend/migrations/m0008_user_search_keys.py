@@ -0,0 +1,33 @@
+"""
+Casefolded search columns for /users/?q=.
+
+m0002's lower(full_name) / lower(email) indexes don't find non-ASCII names
+(SQLite's lower() only folds A-Z), so the folded value is stored instead:
+str.casefold() of the stripped value, the same as models.search_key. On
+Postgres the columns use the "C" collation so the prefix range compares
+bytes, like SQLite does.
+"""
+
+from sqlalchemy import text
+
+
+def _key(value):
+    return value.strip().casefold() if value is not None else None
+
+
+def upgrade(conn):
+    collate = ' COLLATE "C"' if conn.dialect.name == "postgresql" else ""
+    conn.execute(text(f"ALTER TABLE users ADD COLUMN full_name_search VARCHAR{collate}"))
+    conn.execute(text(f"ALTER TABLE users ADD COLUMN email_search VARCHAR{collate}"))
+
+    rows = conn.execute(text("SELECT id, full_name, email FROM users")).all()
+    if rows:
+        conn.execute(
+            text("UPDATE users SET full_name_search = :name, email_search = :email WHERE id = :id"),
+            [{"id": row.id, "name": _key(row.full_name), "email": _key(row.email)} for row in rows],
+        )
+
+    conn.execute(text("CREATE INDEX ix_users_full_name_search ON users (full_name_search)"))
+    conn.execute(text("CREATE INDEX ix_users_email_search ON users (email_search)"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_users_full_name_lower"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_users_email_lower"))
@@ -0,0 +1,59 @@
+"""
+message_archive gets its own id; the original message id moves to `message_id`.
+
+The archive used the message id as its primary key, but SQLite hands a
+deleted max rowid out again (messages has no AUTOINCREMENT), so a newer
+message could carry the id of one already archived and the next archive run
+failed on the duplicate key. SQLite can't change a primary key in place, so
+the table is rebuilt; existing rows keep their id, so archive cursors
+(?before_id=) stay valid.
+"""
+
+from sqlalchemy import Column, DateTime, Enum, Index, Integer, MetaData, String, Table, Text, func, text
+
+metadata = MetaData()
+
+_message_scope = Enum("DIRECT", "GROUP_SCHEDULE", "BROADCAST_ALL", "INTERNAL_STAFF", name="messagescope")
+
+message_archive = Table(
+    "message_archive_new", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("message_id", Integer, nullable=False),
+    Column("sender_id", Integer, nullable=False),
+    Column("sender_name", String, nullable=True),
+    Column("content", Text, nullable=False),
+    Column("image_url", String, nullable=True),
+    Column("sent_at", DateTime(timezone=True), nullable=True),
+    Column("scope", _message_scope, nullable=False),
+    Column("target_schedule_id", Integer, nullable=True),
+    Column("recipient_id", Integer, nullable=True),
+    Column("archived_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+COLUMNS = "sender_id, sender_name, content, image_url, sent_at, scope, target_schedule_id, recipient_id, archived_at"
+
+INDEXES = (
+    "CREATE INDEX ix_message_archive_message_id ON message_archive (message_id)",
+    "CREATE INDEX ix_message_archive_sender_id ON message_archive (sender_id)",
+    "CREATE INDEX ix_message_archive_sent_at ON message_archive (sent_at)",
+)
+
+
+def upgrade(conn):
+    # checkfirst: the messagescope type already exists on Postgres
+    message_archive.create(bind=conn, checkfirst=True)
+    conn.execute(text(
+        f"INSERT INTO message_archive_new (id, message_id, {COLUMNS}) "
+        f"SELECT id, id, {COLUMNS} FROM message_archive"
+    ))
+    conn.execute(text("DROP TABLE message_archive"))
+    conn.execute(text("ALTER TABLE message_archive_new RENAME TO message_archive"))
+    for statement in INDEXES:
+        conn.execute(text(statement))
+
+    if conn.dialect.name == "postgresql":
+        # Copied ids bypassed the sequence
+        conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('message_archive', 'id'), "
+            "(SELECT COALESCE(MAX(id), 1) FROM message_archive))"
+        ))
@@ -1,6 +1,6 @@
 import enum
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Date, Time, DateTime, Text, Enum, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Date, Time, DateTime, Text, Enum, Float, Index, JSON
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from database import Base
 
@@ -25,8 +25,20 @@ class PaymentMethod(str, enum.Enum):
     CASH = "CASH"
     BANK_TRANSFER = "BANK_TRANSFER"
 
+class ScheduleRequestStatus(str, enum.Enum):
+    NEW = "NEW"
+    HANDLED = "HANDLED"
+    DECLINED = "DECLINED"
+
 # Models
 
+def search_key(value):
+    """Casefolded form used by /users/?q= (SQL lower() only folds ASCII, e.g. not Š/Č/Ž)."""
+    return value.strip().casefold() if value is not None else None
+
+# Byte-order comparison, so a prefix range means the same on every database/locale
+_SearchKey = String().with_variant(String(collation="C"), "postgresql")
+
 class User(Base):
     __tablename__ = "users"
 
@@ -35,10 +47,12 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     full_name = Column(String, nullable=False)
     role = Column(Enum(Role), default=Role.PARENT, nullable=False)
-    phone_number = Column(String, nullable=True)
+    phone_number = Column(String, nullable=True, index=True)
     telegram_chat_id = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    full_name_search = Column(_SearchKey, nullable=True, index=True)
+    email_search = Column(_SearchKey, nullable=True, index=True)
 
     # Relationships
     members = relationship("Member", back_populates="parent")
@@ -49,6 +63,12 @@ class User(Base):
     # Progress tracking (User as coach validation)
     validated_skills = relationship("MemberSkill", back_populates="coach")
 
+    # Search columns follow the ORM writes; scripts inserting with Core fill them themselves
+    @validates("full_name", "email")
+    def _fill_search(self, key, value):
+        setattr(self, f"{key}_search", search_key(value))
+        return value
+
 
 class Member(Base):
     __tablename__ = "members"
@@ -68,6 +88,9 @@ class Member(Base):
     acquired_skills = relationship("MemberSkill", back_populates="member")
     payments = relationship("Payment", back_populates="member")
 
+# Roditelj vidi svoju decu (members, visibility index)
+Index("ix_members_parent_id", Member.parent_id)
+
 
 class Schedule(Base):
     __tablename__ = "schedules"
@@ -104,6 +127,10 @@ class Enrollment(Base):
     member = relationship("Member", back_populates="enrollments")
     schedule = relationship("Schedule", back_populates="enrollments")
 
+# Spisak upisanih po terminu (attendance sheet, counts) i termini po detetu
+Index("ix_enrollments_schedule_active", Enrollment.schedule_id, Enrollment.active)
+Index("ix_enrollments_member_active", Enrollment.member_id, Enrollment.active)
+
 
 class ScheduleCancellation(Base):
     __tablename__ = "schedule_cancellations"
@@ -132,6 +159,11 @@ class Attendance(Base):
     member = relationship("Member", back_populates="attendance_records")
     coach = relationship("User")
 
+# Sheet/batch po terminu i datumu, istorija po detetu, dashboard za danas
+Index("ix_attendance_schedule_date", Attendance.schedule_id, Attendance.date)
+Index("ix_attendance_member_date", Attendance.member_id, Attendance.date)
+Index("ix_attendance_date", Attendance.date)
+
 
 class Message(Base):
     __tablename__ = "messages"
@@ -151,6 +183,29 @@ class Message(Base):
     recipient = relationship("User", back_populates="received_messages", foreign_keys=[recipient_id])
     target_schedule = relationship("Schedule", back_populates="targeted_messages")
 
+# Feed: scope filter + newest first; poruke od/za korisnika
+Index("ix_messages_scope_sent_at", Message.scope, Message.sent_at)
+Index("ix_messages_sender_sent_at", Message.sender_id, Message.sent_at)
+Index("ix_messages_recipient_sent_at", Message.recipient_id, Message.sent_at)
+
+
+class MessageArchive(Base):
+    """Cold storage for old messages, filled in batches by retention.py."""
+    __tablename__ = "message_archive"
+
+    # Own id: SQLite can hand out a deleted message id again. No FKs so users/schedules can be deleted freely
+    id = Column(Integer, primary_key=True)
+    message_id = Column(Integer, nullable=False, index=True)  # Id the message had in `messages`
+    sender_id = Column(Integer, nullable=False, index=True)
+    sender_name = Column(String, nullable=True)  # Snapshot at archive time
+    content = Column(Text, nullable=False)
+    image_url = Column(String, nullable=True)
+    sent_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    scope = Column(Enum(MessageScope), nullable=False)
+    target_schedule_id = Column(Integer, nullable=True)
+    recipient_id = Column(Integer, nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
 
 class Skill(Base):
     __tablename__ = "skills"
@@ -196,3 +251,120 @@ class Payment(Base):
 
     # Relationships
     member = relationship("Member", back_populates="payments")
+
+# Debtors / monthly stats po periodu, istorija najnovijih uplata
+Index("ix_payments_period_member", Payment.year, Payment.month, Payment.member_id)
+Index("ix_payments_created_at", Payment.created_at)
+
+
+class ScheduleRequest(Base):
+    __tablename__ = "schedule_requests"
+
+    id = Column(Integer, primary_key=True, index=True)
+    parent_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    message = Column(Text, nullable=False)
+    status = Column(Enum(ScheduleRequestStatus), default=ScheduleRequestStatus.NEW, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    handled_at = Column(DateTime(timezone=True), nullable=True)
+    handled_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    # Relationships
+    parent = relationship("User", foreign_keys=[parent_id])
+    handled_by = relationship("User", foreign_keys=[handled_by_id])
+
+
+class RefreshToken(Base):
+    """Rotating refresh tokens; only the sha256 of the token is stored."""
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String, unique=True, index=True, nullable=False)
+    family_id = Column(String, index=True, nullable=False)  # Shared by all rotations of one login
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    revoked_at = Column(DateTime, nullable=True)
+    replaced_by_id = Column(Integer, nullable=True)
+
+
+class TokenRevocation(Base):
+    """Access tokens of user_id issued before revoked_at are no longer accepted."""
+    __tablename__ = "token_revocations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True)  # No FK: outlives deleted users
+    revoked_at = Column(DateTime, nullable=False, index=True)
+
+
+class CollectionVersion(Base):
+    """Version stamp of a slow-changing collection, bumped in the same transaction as the write (etags.py)."""
+    __tablename__ = "collection_versions"
+
+    name = Column(String, primary_key=True)  # "skills", "schedules", "members"
+    version = Column(Integer, nullable=False, default=0)
+
+
+class JobLock(Base):
+    """One row per periodic job: its next due slot and the worker running it, if any (jobs.py)."""
+    __tablename__ = "job_locks"
+
+    name = Column(String, primary_key=True)
+    next_run_at = Column(DateTime, nullable=True)  # Naive UTC, like locked_until
+    locked_by = Column(String, nullable=True)  # "host:pid" of the worker holding the lock
+    locked_until = Column(DateTime, nullable=True)  # Lock expires here even if the worker died
+
+
+class JobRun(Base):
+    """Run history of periodic jobs."""
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_name = Column(String, nullable=False)
+    trigger = Column(String, nullable=False)  # "schedule" or "manual"
+    worker = Column(String, nullable=False)
+    status = Column(String, nullable=False)  # "running", "succeeded", "failed"
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+
+# Istorija pokretanja po poslu, najnovija prva
+Index("ix_job_runs_name_id", JobRun.job_name, JobRun.id)
+
+
+class DebtorSnapshot(Base):
+    """Members without a payment for a month, as of the month-end snapshot."""
+    __tablename__ = "debtor_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    member_id = Column(Integer, nullable=False)  # No FK: the snapshot outlives deleted members
+    full_name = Column(String, nullable=False)
+    parent_name = Column(String, nullable=True)
+    parent_phone = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Dužnici za izabrani mesec
+Index("ix_debtor_snapshots_period", DebtorSnapshot.year, DebtorSnapshot.month)
+
+
+class AuditLog(Base):
+    """Who changed what: one row per written entity or bulk statement (see audit.py)."""
+    __tablename__ = "audit_log"
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_at = Column(DateTime, nullable=False)
+    actor_id = Column(Integer, nullable=True)  # No FK: the log outlives deleted users
+    source = Column(String, nullable=True)  # "DELETE /members/5", "job:archive_messages"
+    action = Column(String, nullable=False)  # "create", "update", "delete"
+    entity = Column(String, nullable=False)  # Table name
+    entity_id = Column(String, nullable=True)  # None for bulk statements
+    changes = Column(JSON, nullable=False)
+    txn_id = Column(String, nullable=True)  # Shared by all entries of one transaction
+
+# Istorija jednog zapisa i istorija jednog korisnika, najnovija prva
+Index("ix_audit_log_entity", AuditLog.entity, AuditLog.entity_id, AuditLog.id)
+Index("ix_audit_log_actor", AuditLog.actor_id, AuditLog.id)
+# Ostale izmene iz iste transakcije (kaskadna brisanja)
+Index("ix_audit_log_txn", AuditLog.txn_id)
@@ -0,0 +1,178 @@
+"""
+Sparse fieldsets (?fields=) and relation expansion (?expand=) for list endpoints.
+
+    /users/?fields=id,full_name,members.full_name
+    /members/mine?expand=enrollments.schedule&fields=enrollments.schedule.group_name
+
+Dotted names address nested relations; naming a nested field implies
+expanding its relation. A level without explicitly listed fields returns all
+of its columns, and `id` is always included. Computed fields (such as
+current_enrollments_count) are only available on the endpoint's own resource. The selection is turned into
+`load_only` / `selectinload` options, so only the requested columns and
+relations are read from the database, and into a matching dict payload.
+
+Endpoints keep their regular response model when neither parameter is given.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import load_only, selectinload
+
+import models
+
+
+@dataclass(frozen=True)
+class Resource:
+    model: Any
+    columns: Tuple[str, ...]
+    relations: Dict[str, str] = field(default_factory=dict)  # relation attr -> resource name
+    computed: Tuple[str, ...] = ()  # Filled in by the endpoint, not loaded from the table
+
+
+RESOURCES: Dict[str, Resource] = {
+    "user": Resource(
+        models.User,
+        columns=("id", "email", "full_name", "phone_number", "role", "is_active"),
+        relations={"members": "member"},
+    ),
+    "member": Resource(
+        models.Member,
+        columns=("id", "full_name", "date_of_birth", "notes", "active", "parent_id"),
+        relations={"enrollments": "enrollment", "parent": "user"},
+    ),
+    "enrollment": Resource(
+        models.Enrollment,
+        columns=("id", "member_id", "schedule_id", "start_date", "end_date", "active"),
+        relations={"schedule": "schedule", "member": "member"},
+    ),
+    "schedule": Resource(
+        models.Schedule,
+        columns=("id", "day_of_week", "start_time", "end_time", "coach_id", "capacity",
+                 "group_name", "location", "is_active"),
+        computed=("current_enrollments_count",),
+    ),
+}
+
+
+@dataclass
+class Selection:
+    resource: Resource
+    fields: List[str] = field(default_factory=list)
+    relations: Dict[str, "Selection"] = field(default_factory=dict)
+
+    def wants(self, name: str) -> bool:
+        return name in self.fields
+
+
+# ── Parsing ──────────────────────────────────────────────────
+def parse(resource_name: str, fields: Optional[str], expand: Optional[str]) -> Optional[Selection]:
+    if not fields and not expand:
+        return None
+
+    root = Selection(RESOURCES[resource_name])
+    for path in _split(expand):
+        _walk(root, path.split("."), expand_only=True)
+    for path in _split(fields):
+        _walk(root, path.split("."), expand_only=False)
+    _fill_defaults(root)
+    return root
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+def _walk(node: Selection, parts: List[str], expand_only: bool):
+    for depth, name in enumerate(parts):
+        is_last = depth == len(parts) - 1
+        resource = node.resource
+        if name in resource.relations:
+            child = node.relations.get(name)
+            if child is None:
+                child = node.relations[name] = Selection(RESOURCES[resource.relations[name]])
+            node = child
+        elif is_last and not expand_only and (name in resource.columns or (depth == 0 and name in resource.computed)):
+            if name not in node.fields:
+                node.fields.append(name)
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown field: {'.'.join(parts[:depth + 1])}")
+
+
+def _fill_defaults(node: Selection, is_root: bool = True):
+    # Computed fields are only supplied for the endpoint's own resource
+    if not node.fields:
+        node.fields = list(node.resource.columns + (node.resource.computed if is_root else ()))
+    elif "id" not in node.fields:
+        node.fields.insert(0, "id")
+    for child in node.relations.values():
+        _fill_defaults(child, is_root=False)
+
+
+def selector(resource_name: str) -> Callable[..., Optional[Selection]]:
+    """FastAPI dependency reading ?fields= and ?expand= for the given resource."""
+    def dependency(
+        fields: Optional[str] = Query(None, description="Comma-separated fields, dotted for relations"),
+        expand: Optional[str] = Query(None, description="Comma-separated relations to include"),
+    ) -> Optional[Selection]:
+        return parse(resource_name, fields, expand)
+    return dependency
+
+
+# ── Query shaping ────────────────────────────────────────────
+def _column_attrs(node: Selection) -> list:
+    model = node.resource.model
+    mapper = model.__mapper__
+    names = {name for name in node.fields if name in node.resource.columns}
+    names.update(col.key for col in mapper.primary_key)
+    # Keep the columns the relationship loaders need (FKs for many-to-one)
+    for rel_name in node.relations:
+        for col in mapper.relationships[rel_name].local_columns:
+            names.add(mapper.get_property_by_column(col).key)
+    return [getattr(model, name) for name in sorted(names)]
+
+
+def _relation_options(node: Selection, parent_loader=None) -> list:
+    options = []
+    model = node.resource.model
+    for rel_name, child in node.relations.items():
+        attr = getattr(model, rel_name)
+        loader = parent_loader.selectinload(attr) if parent_loader is not None else selectinload(attr)
+        loader = loader.load_only(*_column_attrs(child))
+        nested = _relation_options(child, loader)
+        options.extend(nested or [loader])
+    return options
+
+
+def query_options(selection: Selection) -> list:
+    """Loader options for query.options(*...) matching the selection."""
+    return [load_only(*_column_attrs(selection))] + _relation_options(selection)
+
+
+# ── Serialization ────────────────────────────────────────────
+def serialize(obj: Any, selection: Selection, computed: Optional[Dict[str, Callable[[Any], Any]]] = None) -> dict:
+    data = {}
+    for name in selection.fields:
+        if name in selection.resource.computed:
+            getter = (computed or {}).get(name)
+            data[name] = getter(obj) if getter else None
+        else:
+            data[name] = getattr(obj, name)
+    for rel_name, child in selection.relations.items():
+        value = getattr(obj, rel_name)
+        if isinstance(value, list):
+            data[rel_name] = [serialize(item, child, computed) for item in value]
+        else:
+            data[rel_name] = serialize(value, child, computed) if value is not None else None
+    return data
+
+
+def respond(objs: Any, selection: Selection, computed: Optional[Dict[str, Callable[[Any], Any]]] = None) -> JSONResponse:
+    if isinstance(objs, list):
+        payload = [serialize(obj, selection, computed) for obj in objs]
+    else:
+        payload = serialize(objs, selection, computed)
+    return JSONResponse(jsonable_encoder(payload))
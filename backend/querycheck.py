@@ -0,0 +1,187 @@
+"""
+N+1 query detection and per-endpoint query budgets (development / test mode).
+
+Enable with QUERY_DETECTOR=log or QUERY_DETECTOR=raise. Every statement
+executed during a request is reduced to its shape (parameters and IN-lists
+collapsed). When one shape repeats QUERY_DETECTOR_THRESHOLD times within a
+request, the detector reports it once, naming the application line that
+issued it. In "raise" mode it raises NPlusOneError, failing the request.
+
+    @router.get("/")
+    @querycheck.query_budget(3)
+    async def read_schedules(...): ...
+
+`query_budget` records the limit on the endpoint (`__query_budget__`) and,
+while the detector is enabled, reports calls that execute more statements.
+`track()` counts statements in any block, for scripts and tests:
+
+    with querycheck.track() as tracker:
+        await handler(db=db, current_user=owner)
+    assert tracker.statements <= handler.__query_budget__
+
+With QUERY_DETECTOR unset nothing is installed and decorators only record
+the budget.
+"""
+
+import functools
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+try:
+    import greenlet
+except ImportError:  # pragma: no cover - greenlet ships with SQLAlchemy's asyncio extra
+    greenlet = None
+
+MODE = os.getenv("QUERY_DETECTOR", "").lower()  # "", "log" or "raise"
+THRESHOLD = int(os.getenv("QUERY_DETECTOR_THRESHOLD", 3))
+
+logger = logging.getLogger("querycheck")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+_THIS_FILE = os.path.abspath(__file__)
+
+_PARAM_RE = re.compile(r"\$\d+|%\(\w+\)s|:\w+|\?")
+_IN_LIST_RE = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+class NPlusOneError(RuntimeError):
+    pass
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class Tracker:
+    def __init__(self):
+        self.statements = 0
+        self.shapes: Counter = Counter()
+        self.reported = set()
+
+
+_current: ContextVar[Optional[Tracker]] = ContextVar("querycheck_tracker", default=None)
+
+
+def enabled() -> bool:
+    return MODE in ("log", "raise")
+
+
+def shape(statement: str) -> str:
+    normalized = _PARAM_RE.sub("?", statement)
+    normalized = _IN_LIST_RE.sub("(?)", normalized)
+    return _SPACE_RE.sub(" ", normalized).strip()
+
+
+def _report(error_class, message: str):
+    if MODE == "raise":
+        raise error_class(message)
+    logger.warning(message)
+
+
+# ── Locating the originating line ────────────────────────────
+def _app_frame():
+    """First frame in our own code (not SQLAlchemy, not this module) that led to the statement."""
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    # AsyncSession runs statements in a greenlet whose stack ends inside
+    # SQLAlchemy; the awaiting coroutines hang off the parent greenlet.
+    if greenlet is not None:
+        parent = greenlet.getcurrent().parent
+        frame = parent.gr_frame if parent is not None else None
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+
+    for frame in frames:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(BACKEND_DIR) and filename != _THIS_FILE and "site-packages" not in filename:
+            return f"{os.path.relpath(filename, BACKEND_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+    return "unknown location"
+
+
+# ── Engine hook ──────────────────────────────────────────────
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tracker = _current.get()
+    if tracker is None:
+        return
+    tracker.statements += 1
+    if executemany:
+        return  # One batched statement, not a loop
+    key = shape(statement)
+    tracker.shapes[key] += 1
+    if tracker.shapes[key] >= THRESHOLD and key not in tracker.reported:
+        tracker.reported.add(key)
+        _report(NPlusOneError, f"Possible N+1: statement repeated {tracker.shapes[key]}x "
+                               f"at {_app_frame()}: {key[:200]}")
+
+
+def instrument_engine(engine):
+    """Hooks the detector into a (sync or async) engine; main.py does this when QUERY_DETECTOR is set."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+
+
+@contextmanager
+def track():
+    """Counts statements executed in the block (requires instrument_engine to have run)."""
+    tracker = Tracker()
+    token = _current.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current.reset(token)
+
+
+# ── Request scope ────────────────────────────────────────────
+class QueryDetectorMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with track():
+            await self.app(scope, receive, send)
+
+
+# ── Budgets ──────────────────────────────────────────────────
+def query_budget(max_statements: int):
+    """Declares the most SQL statements one call of the endpoint may execute."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not enabled():
+                return await func(*args, **kwargs)
+            tracker = _current.get()
+            if tracker is None:
+                with track():
+                    return await _run_with_budget(func, max_statements, args, kwargs)
+            return await _run_with_budget(func, max_statements, args, kwargs)
+
+        wrapper.__query_budget__ = max_statements
+        return wrapper
+    return decorator
+
+
+async def _run_with_budget(func, max_statements, args, kwargs):
+    tracker = _current.get()
+    before = tracker.statements
+    result = await func(*args, **kwargs)
+    used = tracker.statements - before
+    if used > max_statements:
+        _report(QueryBudgetExceeded, f"{func.__module__}.{func.__qualname__} executed {used} SQL statements "
+                                     f"(budget {max_statements})")
+    return result
@@ -0,0 +1,95 @@
+"""
+Message retention: moves old messages from `messages` into `message_archive`.
+
+Keeps the hot table small for get_messages. Runs in chunked batches, each
+committed on its own, so a large backlog never holds one long transaction.
+The rows only move, so the audit log gets one "archive" entry per batch
+(count and id range) instead of a copy of every message.
+Run with: python retention.py [--days N] [--batch-size N]
+"""
+
+import argparse
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, joinedload
+
+import audit, models
+from database import SessionLocal
+
+# ── Configuration ────────────────────────────────────────────
+MESSAGE_RETENTION_DAYS = int(os.getenv("MESSAGE_RETENTION_DAYS", 180))
+MESSAGE_ARCHIVE_BATCH = int(os.getenv("MESSAGE_ARCHIVE_BATCH", 500))
+
+
+def archive_messages(
+    db: Session,
+    older_than_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> int:
+    """Archives messages older than the retention age, returns how many were moved."""
+    days = MESSAGE_RETENTION_DAYS if older_than_days is None else older_than_days
+    batch_size = batch_size or MESSAGE_ARCHIVE_BATCH
+    cutoff = datetime.utcnow() - timedelta(days=days)
+
+    moved = 0
+    while True:
+        batch = (
+            db.query(models.Message)
+            .options(joinedload(models.Message.sender))
+            .filter(models.Message.sent_at < cutoff)
+            .order_by(models.Message.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+
+        with audit.skipped(db):
+            db.execute(insert(models.MessageArchive), [
+                {
+                    "message_id": m.id,
+                    "sender_id": m.sender_id,
+                    "sender_name": m.sender.full_name if m.sender else None,
+                    "content": m.content,
+                    "image_url": m.image_url,
+                    "sent_at": m.sent_at,
+                    "scope": m.scope,
+                    "target_schedule_id": m.target_schedule_id,
+                    "recipient_id": m.recipient_id,
+                }
+                for m in batch
+            ])
+            db.query(models.Message).filter(
+                models.Message.id.in_([m.id for m in batch])
+            ).delete(synchronize_session=False)
+        audit.record(db, "archive", "messages", {
+            "count": len(batch),
+            "first_id": batch[0].id,
+            "last_id": batch[-1].id,
+            "older_than": cutoff,
+        })
+        db.commit()
+        db.expunge_all()
+
+        moved += len(batch)
+        if len(batch) < batch_size:
+            break
+
+    return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old messages to the archive table.")
+    parser.add_argument("--days", type=int, default=None, help=f"Retention age (default {MESSAGE_RETENTION_DAYS})")
+    parser.add_argument("--batch-size", type=int, default=None, help=f"Rows per batch (default {MESSAGE_ARCHIVE_BATCH})")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        count = archive_messages(db, older_than_days=args.days, batch_size=args.batch_size)
+        print(f"Archived {count} messages.")
+    finally:
+        db.close()
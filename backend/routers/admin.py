@@ -0,0 +1,140 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models, schemas, database, jobs
+import utils as auth
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+)
+
+
+def _require_owner(current_user: auth.Principal, detail: str = "Only Owner can manage jobs"):
+    if current_user.role != models.Role.OWNER:
+        raise HTTPException(status_code=403, detail=detail)
+
+
+# --- Periodic jobs (jobs.py) ---
+@router.get("/jobs", response_model=List[schemas.JobOut])
+async def list_jobs(
+    db: AsyncSession = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
+):
+    """Registered jobs with their next slot, current lock and last run."""
+    _require_owner(current_user)
+
+    # Primary, not a replica: locks change every few seconds
+    locks = await jobs.ensure_locks(db, datetime.utcnow())
+    last_ids = select(func.max(models.JobRun.id)).group_by(models.JobRun.job_name)
+    last_runs = {
+        run.job_name: run
+        for run in (await db.scalars(select(models.JobRun).where(models.JobRun.id.in_(last_ids)))).all()
+    }
+
+    now = datetime.utcnow()
+    result = []
+    for job in jobs.JOBS.values():
+        lock = locks.get(job.name)
+        running = lock is not None and lock.locked_until is not None and lock.locked_until >= now
+        last_run = last_runs.get(job.name)
+        result.append(schemas.JobOut(
+            name=job.name,
+            schedule=job.schedule.expression,
+            description=job.description,
+            next_run_at=lock.next_run_at if lock else None,
+            running=running,
+            locked_by=lock.locked_by if running else None,
+            last_run=schemas.JobRunOut.model_validate(last_run) if last_run else None,
+        ))
+    return result
+
+
+@router.post("/jobs/{name}/run", response_model=schemas.JobRunOut, status_code=status.HTTP_202_ACCEPTED)
+async def run_job(
+    name: str,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
+):
+    """Starts the job now; poll /admin/jobs/{name}/runs for the outcome."""
+    _require_owner(current_user)
+    if name not in jobs.JOBS:
+        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        run = await jobs.trigger(db, name)
+    except jobs.JobLocked:
+        raise HTTPException(status_code=409, detail="Job is already running")
+    return run
+
+
+@router.get("/jobs/{name}/runs", response_model=List[schemas.JobRunOut])
+async def list_job_runs(
+    name: str,
+    before_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
+):
+    """Run history, newest first. Page with ?before_id=<last id>."""
+    _require_owner(current_user)
+    if name not in jobs.JOBS:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    query = select(models.JobRun).where(models.JobRun.job_name == name)
+    if before_id:
+        query = query.where(models.JobRun.id < before_id)
+    return (await db.scalars(query.order_by(models.JobRun.id.desc()).limit(limit))).all()
+
+
+# --- Audit log (audit.py) ---
+@router.get("/audit", response_model=List[schemas.AuditOut])
+async def list_audit(
+    actor_id: Optional[int] = None,
+    entity: Optional[str] = None,
+    entity_id: Optional[str] = None,
+    action: Optional[str] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
+):
+    """
+    Data changes, newest first. Page with ?before_id=<last id>.
+    With entity_id, the other entries of the same transactions are included,
+    e.g. entity=members&entity_id=5 also lists the attendance, enrollments
+    and payments deleted with member 5.
+    Entries are written in the background, about a second after the change.
+    """
+    _require_owner(current_user, "Only Owner can view the audit log")
+
+    query = (
+        select(models.AuditLog, models.User.full_name)
+        .outerjoin(models.User, models.User.id == models.AuditLog.actor_id)
+    )
+    if actor_id is not None:
+        query = query.where(models.AuditLog.actor_id == actor_id)
+    if entity_id is not None:
+        touched = select(models.AuditLog.txn_id).where(models.AuditLog.entity_id == entity_id)
+        if entity:
+            touched = touched.where(models.AuditLog.entity == entity)
+        query = query.where(models.AuditLog.txn_id.in_(touched))
+    elif entity:
+        query = query.where(models.AuditLog.entity == entity)
+    if action:
+        query = query.where(models.AuditLog.action == action)
+    if before_id:
+        query = query.where(models.AuditLog.id < before_id)
+
+    rows = (await db.execute(query.order_by(models.AuditLog.id.desc()).limit(limit))).all()
+    return [
+        schemas.AuditOut(
+            id=row.id, created_at=row.created_at, actor_id=row.actor_id, actor_name=full_name,
+            source=row.source, action=row.action, entity=row.entity, entity_id=row.entity_id,
+            changes=row.changes, txn_id=row.txn_id,
+        )
+        for row, full_name in rows
+    ]
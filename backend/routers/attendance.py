@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+import calendar
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Optional
 from datetime import date
-import models, schemas, database
+import models, schemas, database, events, querycheck
 import utils as auth
 
 router = APIRouter(
@@ -12,28 +15,35 @@ router = APIRouter(
 
 # 1. Get Attendance Sheet (List of members in a schedule for a specific date)
 @router.get("/schedule/{schedule_id}/date/{date_str}", response_model=List[schemas.AttendanceOut])
+@querycheck.query_budget(3)
 async def get_attendance_sheet(
     schedule_id: int,
     date_str: date,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     # Provera: Da li schedule postoji?
-    schedule = db.query(models.Schedule).filter(models.Schedule.id == schedule_id).first()
+    schedule = await db.get(models.Schedule, schedule_id)
     if not schedule:
         raise HTTPException(status_code=404, detail="Schedule not found")
 
     # 1. Nađi svu decu koja su UPISANA (Enrolled) u ovaj termin
-    enrollments = db.query(models.Enrollment).filter(
-        models.Enrollment.schedule_id == schedule_id,
-        models.Enrollment.active == True
-    ).all()
+    enrollments = (await db.scalars(
+        select(models.Enrollment)
+        .options(joinedload(models.Enrollment.member).joinedload(models.Member.parent))
+        .where(
+            models.Enrollment.schedule_id == schedule_id,
+            models.Enrollment.active == True
+        )
+    )).all()
 
     # 2. Nađi postojeće zapise o prisustvu za ovaj datum (ako ih ima)
-    existing_attendance = db.query(models.Attendance).filter(
-        models.Attendance.schedule_id == schedule_id,
-        models.Attendance.date == date_str
-    ).all()
+    existing_attendance = (await db.scalars(
+        select(models.Attendance).where(
+            models.Attendance.schedule_id == schedule_id,
+            models.Attendance.date == date_str
+        )
+    )).all()
     
     # Pretvaramo u mapu radi brže pretrage: {member_id: AttendanceRecord}
     attendance_map = {att.member_id: att for att in existing_attendance}
@@ -73,42 +83,65 @@ async def get_attendance_sheet(
 
 # 2. Save Batch Attendance
 @router.post("/batch", status_code=status.HTTP_200_OK)
+@querycheck.query_budget(4)
 async def save_batch_attendance(
     data: schemas.BatchAttendanceCreate,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     if current_user.role not in [models.Role.COACH, models.Role.OWNER]:
         raise HTTPException(status_code=403, detail="Only Coaches/Owners can take attendance")
 
+    # 0. Koliko je bilo prisutnih pre ove izmene (za live dashboard delta)
+    previous_present = await db.scalar(
+        select(func.count(models.Attendance.id)).where(
+            models.Attendance.schedule_id == data.schedule_id,
+            models.Attendance.date == data.date,
+            models.Attendance.is_present == True
+        )
+    )
+
     # 1. Prvo brišemo stare zapise za taj dan i termin (da ne bi duplirali)
-    db.query(models.Attendance).filter(
+    await db.execute(delete(models.Attendance).where(
         models.Attendance.schedule_id == data.schedule_id,
         models.Attendance.date == data.date
-    ).delete()
+    ))
     
     # 2. [FIX] Dohvatamo SVE upisane članove za ovaj termin
-    enrollments = db.query(models.Enrollment).filter(
-        models.Enrollment.schedule_id == data.schedule_id,
-        models.Enrollment.active == True
-    ).all()
+    enrolled_ids = (await db.scalars(
+        select(models.Enrollment.member_id).where(
+            models.Enrollment.schedule_id == data.schedule_id,
+            models.Enrollment.active == True
+        )
+    )).all()
     
     present_set = set(data.member_ids)  # Set za brzu pretragu
     
-    # 3. [FIX] Upisujemo zapis za SVAKOG upisanog člana (Present ili Absent)
-    for enrollment in enrollments:
-        is_present = enrollment.member_id in present_set
-        
-        new_record = models.Attendance(
-            schedule_id=data.schedule_id,
-            member_id=enrollment.member_id,
-            date=data.date,
-            is_present=is_present,
-            coach_id=current_user.id
-        )
-        db.add(new_record)
+    # 3. [FIX] Upisujemo zapis za SVAKOG upisanog člana (Present ili Absent),
+    # jednim executemany umesto INSERT-a po članu
+    records = [
+        {
+            "schedule_id": data.schedule_id,
+            "member_id": member_id,
+            "date": data.date,
+            "is_present": member_id in present_set,
+            "coach_id": current_user.id,
+        }
+        for member_id in enrolled_ids
+    ]
+    present_count = sum(r["is_present"] for r in records)
+    if records:
+        await db.execute(insert(models.Attendance), records)
     
-    db.commit()
+    await db.commit()
+
+    events.publish("attendance", {
+        "schedule_id": data.schedule_id,
+        "date": data.date.isoformat(),
+        "present_count": present_count,
+        "enrolled_count": len(enrolled_ids),
+        "present_delta": present_count - previous_present,
+    })
     return {"message": "Attendance saved successfully"}
 
 
@@ -116,31 +149,33 @@ async def save_batch_attendance(
 @router.get("/stats/{member_id}")
 async def get_member_stats(
     member_id: int,
-    month: int = None,
-    year: int = None,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = Query(None, ge=1, le=9999),
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     if current_user.role != models.Role.OWNER:
         raise HTTPException(status_code=403, detail="Only Owner can view stats")
 
-    member = db.query(models.Member).filter(models.Member.id == member_id).first()
+    if month is not None and year is None:
+        raise HTTPException(status_code=422, detail="month requires year")
+
+    member = await db.get(models.Member, member_id)
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
 
-    query = db.query(models.Attendance).filter(models.Attendance.member_id == member_id)
+    query = select(models.Attendance).where(models.Attendance.member_id == member_id)
 
-    if month and year:
-        from sqlalchemy import extract
-        query = query.filter(
-            extract('month', models.Attendance.date) == month,
-            extract('year', models.Attendance.date) == year,
-        )
-    elif year:
-        from sqlalchemy import extract
-        query = query.filter(extract('year', models.Attendance.date) == year)
+    # Opseg datuma umesto extract(), da bi upit koristio (member_id, date) indeks.
+    # Gornja granica je poslednji dan (<=), jer date(10000, 1, 1) ne postoji.
+    if month is not None:
+        start = date(year, month, 1)
+        end = date(year, month, calendar.monthrange(year, month)[1])
+        query = query.where(models.Attendance.date >= start, models.Attendance.date <= end)
+    elif year is not None:
+        query = query.where(models.Attendance.date >= date(year, 1, 1), models.Attendance.date <= date(year, 12, 31))
 
-    records = query.order_by(models.Attendance.date.desc()).all()
+    records = (await db.scalars(query.order_by(models.Attendance.date.desc()))).all()
 
     total = len(records)
     present = sum(1 for r in records if r.is_present)
@@ -1,8 +1,9 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-import models, schemas, database
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import models, schemas, database, tokens
 import utils as auth
 
 router = APIRouter(
@@ -10,9 +11,21 @@ router = APIRouter(
     tags=["Authentication"]
 )
 
+def _token_response(user: models.User, refresh_token: str) -> dict:
+    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = auth.create_access_token(
+        data={"sub": user.email, "uid": user.id, "role": user.role}, expires_delta=access_token_expires
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": int(access_token_expires.total_seconds()),
+    }
+
 @router.post("/token", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(auth.get_db)):
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(auth.get_db)):
+    user = await db.scalar(select(models.User).where(models.User.email == form_data.username))
     if not user:
         # Note: In production, use same generic error for user not found vs bad password to prevent enumeration
         raise HTTPException(
@@ -21,15 +34,44 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not auth.verify_password(form_data.password, user.hashed_password):
+    is_valid, new_hash = await auth.verify_and_update_password(form_data.password, user.hashed_password)
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-        
-    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(
-        data={"sub": user.email, "role": user.role}, expires_delta=access_token_expires
+
+    # Rehash when BCRYPT_ROUNDS changed since the password was stored
+    if new_hash:
+        user.hashed_password = new_hash
+
+    refresh_token, _ = await tokens.issue_refresh_token(db, user.id)
+    await db.commit()
+    return _token_response(user, refresh_token)
+
+@router.post("/refresh", response_model=schemas.Token)
+async def refresh_access_token(payload: schemas.RefreshRequest, db: AsyncSession = Depends(auth.get_db)):
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+
+    rotated = await tokens.rotate_refresh_token(db, payload.refresh_token)
+    if rotated is None:
+        raise invalid
+
+    new_refresh_token, row = rotated
+    user = await db.get(models.User, row.user_id)
+    if user is None or not user.is_active:
+        await db.rollback()
+        raise invalid
+    await db.commit()
+    return _token_response(user, new_refresh_token)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(payload: schemas.RefreshRequest, db: AsyncSession = Depends(auth.get_db)):
+    await tokens.revoke_refresh_token(db, payload.refresh_token)
+    await db.commit()
+    return None
@@ -3,13 +3,13 @@ Dashboard router — provides high-level stats and today's schedule overview for
 """
 
 from datetime import date
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-import models, schemas
-from database import get_db
-from utils import get_current_active_user
+import models, schemas, events, querycheck
+from utils import Principal, get_current_active_user, get_read_db, get_stream_user
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
@@ -20,26 +20,27 @@ _DAY_MAP = {
 
 
 @router.get("/stats")
-def get_dashboard_stats(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+@querycheck.query_budget(3)
+async def get_dashboard_stats(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
     """Returns high-level club stats."""
     today = date.today()
 
-    active_members = db.query(func.count(models.Member.id)).filter(
+    active_members = await db.scalar(select(func.count(models.Member.id)).where(
         models.Member.active == True
-    ).scalar() or 0
+    )) or 0
 
-    attendance_today = db.query(func.count(models.Attendance.id)).filter(
+    attendance_today = await db.scalar(select(func.count(models.Attendance.id)).where(
         models.Attendance.date == today,
         models.Attendance.is_present == True,
-    ).scalar() or 0
+    )) or 0
 
-    revenue_month = db.query(func.sum(models.Payment.amount)).filter(
+    revenue_month = await db.scalar(select(func.sum(models.Payment.amount)).where(
         models.Payment.month == today.month,
         models.Payment.year == today.year,
-    ).scalar() or 0
+    )) or 0
 
     return {
         "active_members": active_members,
@@ -49,31 +50,46 @@ def get_dashboard_stats(
 
 
 @router.get("/today-schedules")
-def get_today_schedules(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+@querycheck.query_budget(3)
+async def get_today_schedules(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
     """Returns today's schedules with enrolled/present counts."""
     today = date.today()
     today_day_code = _DAY_MAP.get(today.isoweekday(), '')
 
-    schedules = db.query(models.Schedule).filter(
+    schedules = (await db.scalars(select(models.Schedule).where(
         models.Schedule.is_active == True,
         models.Schedule.day_of_week == today_day_code,
-    ).all()
+    ))).all()
+
+    # Counts for all of today's schedules in two grouped queries (not two per schedule)
+    schedule_ids = [sched.id for sched in schedules]
+    enrolled_counts, present_counts = {}, {}
+    if schedule_ids:
+        enrolled_counts = dict((await db.execute(
+            select(models.Enrollment.schedule_id, func.count(models.Enrollment.id))
+            .where(
+                models.Enrollment.schedule_id.in_(schedule_ids),
+                models.Enrollment.active == True,
+            )
+            .group_by(models.Enrollment.schedule_id)
+        )).all())
+        present_counts = dict((await db.execute(
+            select(models.Attendance.schedule_id, func.count(models.Attendance.id))
+            .where(
+                models.Attendance.schedule_id.in_(schedule_ids),
+                models.Attendance.date == today,
+                models.Attendance.is_present == True,
+            )
+            .group_by(models.Attendance.schedule_id)
+        )).all())
 
     result = []
     for sched in schedules:
-        enrolled_count = db.query(func.count(models.Enrollment.id)).filter(
-            models.Enrollment.schedule_id == sched.id,
-            models.Enrollment.active == True,
-        ).scalar() or 0
-
-        present_count = db.query(func.count(models.Attendance.id)).filter(
-            models.Attendance.schedule_id == sched.id,
-            models.Attendance.date == today,
-            models.Attendance.is_present == True,
-        ).scalar() or 0
+        enrolled_count = enrolled_counts.get(sched.id, 0)
+        present_count = present_counts.get(sched.id, 0)
 
         time_str = ""
         if sched.start_time:
@@ -91,3 +107,29 @@ def get_today_schedules(
         })
 
     return result
+
+
+@router.get("/live")
+async def live_attendance(
+    request: Request,
+    current_user: Principal = Depends(get_stream_user),  # No DB session held while streaming
+):
+    """
+    Server-Sent Events stream of attendance changes. Each `attendance` event
+    carries schedule_id, date, present_count, enrolled_count and present_delta,
+    so today's schedule cards can be updated in place. `schedule_request`
+    events (id, parent_id, parent_name, message) announce new requests from parents.
+    """
+    if current_user.role not in [models.Role.OWNER, models.Role.COACH]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    async def event_source():
+        with events.subscribe() as queue:
+            async for frame in events.stream(request, queue):
+                yield frame
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
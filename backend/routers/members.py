@@ -1,7 +1,9 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-import models, schemas, database
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+import models, schemas, database, etags, listing, projection, querycheck, tokens, visibility
 import utils as auth
 
 router = APIRouter(
@@ -9,21 +11,41 @@ router = APIRouter(
     tags=["members"]
 )
 
+# MemberOut nests enrollments -> schedule
+_WITH_ENROLLMENTS = selectinload(models.Member.enrollments).selectinload(models.Enrollment.schedule)
+
+async def _get_member_out(db: AsyncSession, member_id: int) -> models.Member:
+    return await db.scalar(
+        select(models.Member).options(_WITH_ENROLLMENTS).where(models.Member.id == member_id)
+    )
+
 # 1. DOHVATI MOJU DECU (GET)
 @router.get("/mine", response_model=List[schemas.MemberOut])
-def get_my_members(
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+async def get_my_members(
+    request: Request,
+    response: Response,
+    selection: Optional[projection.Selection] = Depends(projection.selector("member")),
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
+    etag = await etags.etag_for(db, request, etags.MEMBERS, current_user, per_user=True)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag)
+
     # Vraća samo decu gde je parent_id jednak ID-u ulogovanog korisnika
-    return db.query(models.Member).options(joinedload(models.Member.enrollments)).filter(models.Member.parent_id == current_user.id).all()
+    query = select(models.Member).where(models.Member.parent_id == current_user.id)
+    if selection:
+        members = await db.scalars(query.options(*projection.query_options(selection)))
+        return etags.attach(projection.respond(members.all(), selection), response, etag)
+    members = (await db.scalars(query.options(_WITH_ENROLLMENTS))).all()
+    return etags.attach(members, response, etag)
 
 # 2. DODAJ NOVO DETE (POST)
 @router.post("/", response_model=schemas.MemberOut, status_code=status.HTTP_201_CREATED)
-def create_member(
+async def create_member(
     member: schemas.MemberCreate,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    db: AsyncSession = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     # Provera prava pristupa
     if current_user.role != models.Role.PARENT and current_user.role != models.Role.OWNER:
@@ -36,24 +58,25 @@ def create_member(
         active=True
     )
     db.add(new_member)
-    db.commit()
-    db.refresh(new_member)
-    return new_member
+    await etags.bump(db, etags.MEMBERS)
+    await db.commit()
+    auth.invalidate_user(new_member.parent_id)
+    return await _get_member_out(db, new_member.id)
 
 # 2b. ADMIN DODAJ DETE (POST) — Owner specifies parent_id
 class AdminMemberCreate(schemas.MemberBase):
     parent_id: int
 
 @router.post("/admin-create", response_model=schemas.MemberOut, status_code=status.HTTP_201_CREATED)
-def admin_create_member(
+async def admin_create_member(
     member: AdminMemberCreate,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user),
+    db: AsyncSession = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
 ):
     if current_user.role != models.Role.OWNER:
         raise HTTPException(status_code=403, detail="Only Owner can use admin create")
 
-    parent = db.query(models.User).filter(models.User.id == member.parent_id).first()
+    parent = await db.get(models.User, member.parent_id)
     if not parent:
         raise HTTPException(status_code=404, detail="Parent not found")
 
@@ -65,20 +88,21 @@ def admin_create_member(
         active=True,
     )
     db.add(new_member)
-    db.commit()
-    db.refresh(new_member)
-    return new_member
+    await etags.bump(db, etags.MEMBERS)
+    await db.commit()
+    auth.invalidate_user(new_member.parent_id)
+    return await _get_member_out(db, new_member.id)
 
 # 3. AZURIRAJ DETE (PUT)
 @router.put("/{member_id}", response_model=schemas.MemberOut)
-def update_member(
+async def update_member(
     member_id: int,
     member_update: schemas.MemberCreate, # Reusing Create schema for simplicity, or create specific Update schema
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    db: AsyncSession = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     # 1. Fetch member
-    db_member = db.query(models.Member).filter(models.Member.id == member_id).first()
+    db_member = await db.get(models.Member, member_id)
     if not db_member:
         raise HTTPException(status_code=404, detail="Member not found")
         
@@ -91,76 +115,82 @@ def update_member(
     db_member.date_of_birth = member_update.date_of_birth
     db_member.notes = member_update.notes
     
-    db.commit()
-    db.refresh(db_member)
-    return db_member
+    await etags.bump(db, etags.MEMBERS)
+    await db.commit()
+    return await _get_member_out(db, member_id)
 
 # 4. DOHVATI SVE ČLANOVE (Owner/Coach only)
-@router.get("/all")
-def get_all_members(
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user),
+@router.get("/all", response_class=listing.ORJSONResponse)
+@querycheck.query_budget(1)
+async def get_all_members(
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
 ):
     if current_user.role not in [models.Role.OWNER, models.Role.COACH]:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    members = (
-        db.query(models.Member)
-        .options(joinedload(models.Member.parent))
+    result = await db.execute(
+        select(
+            models.Member.id,
+            models.Member.full_name,
+            models.Member.date_of_birth,
+            models.User.full_name.label("parent_name"),
+            models.User.phone_number.label("parent_phone"),
+            models.Member.notes,
+            models.Member.active,
+        )
+        .outerjoin(models.User, models.User.id == models.Member.parent_id)
         .order_by(models.Member.full_name)
-        .all()
     )
-
-    return [
-        {
-            "id": m.id,
-            "full_name": m.full_name,
-            "date_of_birth": str(m.date_of_birth) if m.date_of_birth else None,
-            "parent_name": m.parent.full_name if m.parent else None,
-            "parent_phone": m.parent.phone_number if m.parent else None,
-            "notes": m.notes,
-            "active": m.active,
-        }
-        for m in members
-    ]
+    return listing.respond(listing.row_dicts(result))
 
 # 5. OBRIŠI ČLANA — Smart Deletion with Orphan Parent Cleanup
 @router.delete("/{member_id}")
-def delete_member(
+async def delete_member(
     member_id: int,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user),
+    db: AsyncSession = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
 ):
     if current_user.role != models.Role.OWNER:
         raise HTTPException(status_code=403, detail="Only Owner can delete members")
 
-    member = db.query(models.Member).filter(models.Member.id == member_id).first()
+    member = await db.get(models.Member, member_id)
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
 
     parent_id = member.parent_id
 
     # 1. Delete related records first
-    db.query(models.Attendance).filter(models.Attendance.member_id == member_id).delete()
-    db.query(models.Enrollment).filter(models.Enrollment.member_id == member_id).delete()
-    db.query(models.MemberSkill).filter(models.MemberSkill.member_id == member_id).delete()
-    db.query(models.Payment).filter(models.Payment.member_id == member_id).delete()
+    await db.execute(delete(models.Attendance).where(models.Attendance.member_id == member_id))
+    await db.execute(delete(models.Enrollment).where(models.Enrollment.member_id == member_id))
+    await db.execute(delete(models.MemberSkill).where(models.MemberSkill.member_id == member_id))
+    await db.execute(delete(models.Payment).where(models.Payment.member_id == member_id))
 
     # 2. Delete the member
-    db.delete(member)
-    db.flush()
+    await db.delete(member)
+    await db.flush()
 
     # 3. Orphan check — does this parent have any other children?
-    remaining = db.query(models.Member).filter(
-        models.Member.parent_id == parent_id
-    ).count()
+    remaining = await db.scalar(
+        select(func.count(models.Member.id)).where(models.Member.parent_id == parent_id)
+    )
 
     parent_deleted = False
     if remaining == 0 and parent_id:
-        parent = db.query(models.User).filter(models.User.id == parent_id).first()
+        parent = await db.get(models.User, parent_id)
         if parent and parent.role == models.Role.PARENT:
-            db.delete(parent)
+            await db.execute(delete(models.ScheduleRequest).where(
+                models.ScheduleRequest.parent_id == parent_id
+            ))
+            await tokens.revoke_user(db, parent_id)
+            await db.execute(delete(models.RefreshToken).where(
+                models.RefreshToken.user_id == parent_id
+            ))
+            await db.delete(parent)
             parent_deleted = True
 
-    db.commit()
+    await etags.bump(db, etags.MEMBERS, etags.SCHEDULES)  # Enrollment counts change too
+    await db.commit()
+    auth.invalidate_user(parent_id)
+    visibility.invalidate_parent(parent_id)
     return {"detail": "Member deleted", "parent_deleted": parent_deleted}
\ No newline at end of file
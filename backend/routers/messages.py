@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_ 
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, and_, select
+from typing import List, Optional
 import models, schemas, database
+import images, listing, querycheck, visibility
 import utils as auth
 
 router = APIRouter(
@@ -10,18 +11,30 @@ router = APIRouter(
     tags=["Messaging"]
 )
 
+# Staff see every message except other people's DIRECT conversations
+STAFF_SCOPES = (
+    models.MessageScope.INTERNAL_STAFF,
+    models.MessageScope.BROADCAST_ALL,
+    models.MessageScope.GROUP_SCHEDULE,  # All of them? Or just ones they coach? Let's say ALL for transparency in this MVP
+)
+
+
+def staff_filter(model, user_id: int):
+    """Messages (live or archived) a coach/owner may read."""
+    return or_(model.sender_id == user_id, model.recipient_id == user_id, model.scope.in_(STAFF_SCOPES))
+
 @router.post("/", response_model=schemas.MessageOut, status_code=status.HTTP_201_CREATED)
 async def send_message(
     msg: schemas.MessageCreate,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     # 1. Scope Validation Logic
     if msg.scope == models.MessageScope.DIRECT:
         if not msg.recipient_id:
             raise HTTPException(status_code=400, detail="Recipient ID is required for Direct messages")
         # Check if recipient exists
-        recipient = db.query(models.User).filter(models.User.id == msg.recipient_id).first()
+        recipient = await db.get(models.User, msg.recipient_id)
         if not recipient:
             raise HTTPException(status_code=404, detail="Recipient not found")
 
@@ -29,7 +42,7 @@ async def send_message(
         if not msg.target_schedule_id:
             raise HTTPException(status_code=400, detail="Target Schedule ID is required for Group messages")
         # Validate schedule exists
-        schedule = db.query(models.Schedule).filter(models.Schedule.id == msg.target_schedule_id).first()
+        schedule = await db.get(models.Schedule, msg.target_schedule_id)
         if not schedule:
             raise HTTPException(status_code=404, detail="Schedule not found")
 
@@ -52,18 +65,20 @@ async def send_message(
         image_url=msg.image_url
     )
     db.add(new_message)
-    db.commit()
-    db.refresh(new_message)
+    await db.commit()
+    await db.refresh(new_message)
     
     # Enrich for response
     response = schemas.MessageOut.model_validate(new_message)
     response.sender_name = current_user.full_name
+    response.image_variants = images.variants_for_url(new_message.image_url)
     return response
 
-@router.get("/", response_model=List[schemas.MessageOut])
+@router.get("/", response_model=List[schemas.MessageOut], response_class=listing.ORJSONResponse)
+@querycheck.query_budget(2)  # Parent, cold: visibility load + feed
 async def get_messages(
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     # Logic to fetch relevant messages
     
@@ -79,14 +94,9 @@ async def get_messages(
         # 1. BROADCAST_ALL
         # 2. GROUP_SCHEDULE messages for schedules their children are enrolled in
         
-        # Get list of schedule IDs where parent's children are enrolled (active)
-        # Join User -> Member -> Enrollment
-        enrolled_schedule_ids = [
-            enrollment.schedule_id 
-            for member in current_user.members 
-            for enrollment in member.enrollments 
-            if enrollment.active
-        ]
+        # Schedule IDs where parent's children are enrolled (active),
+        # served from the per-process visibility index
+        enrolled_schedule_ids = await visibility.schedule_ids_for_parent(db, current_user.id)
         
         relevant_groups = and_(
             models.Message.scope == models.MessageScope.GROUP_SCHEDULE,
@@ -98,27 +108,60 @@ async def get_messages(
         final_filter = or_(base_filter, relevant_groups, broadcasts)
 
     elif current_user.role in [models.Role.COACH, models.Role.OWNER]:
-        # Staff see:
-        # 1. INTERNAL_STAFF
-        # 2. BROADCAST_ALL
-        # 3. GROUP_SCHEDULE (All of them? Or just ones they coach? Let's say ALL for transparency in this MVP)
-        
-        internal = (models.Message.scope == models.MessageScope.INTERNAL_STAFF)
-        broadcasts = (models.Message.scope == models.MessageScope.BROADCAST_ALL)
-        groups = (models.Message.scope == models.MessageScope.GROUP_SCHEDULE)
-        
-        final_filter = or_(base_filter, internal, broadcasts, groups)
+        # Staff see their own messages plus INTERNAL_STAFF, BROADCAST_ALL and GROUP_SCHEDULE
+        final_filter = staff_filter(models.Message, current_user.id)
     
     else:
         final_filter = base_filter
 
-    messages = db.query(models.Message).filter(final_filter).order_by(models.Message.sent_at.desc()).all()
-    
-    # Enrich sender names manually (simple way)
-    results = []
+    result = await db.execute(
+        select(
+            *listing.columns_for(models.Message, schemas.MessageOut),
+            models.User.full_name.label("sender_name"),
+        )
+        .join(models.User, models.User.id == models.Message.sender_id)
+        .where(final_filter)
+        .order_by(models.Message.sent_at.desc())
+    )
+
+    messages = listing.row_dicts(result)
     for m in messages:
-        m_out = schemas.MessageOut.model_validate(m)
-        m_out.sender_name = m.sender.full_name
+        m["image_variants"] = images.variants_for_url(m["image_url"])
+    return listing.respond(messages)
+
+
+@router.get("/archive", response_model=List[schemas.MessageArchiveOut])
+async def get_archived_messages(
+    scope: Optional[models.MessageScope] = None,
+    target_schedule_id: Optional[int] = None,
+    sender_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    """Browse archived messages, newest first. Page with ?before_id=<last id>."""
+    if current_user.role not in [models.Role.COACH, models.Role.OWNER]:
+        raise HTTPException(status_code=403, detail="Only staff can browse the archive")
+
+    # Same visibility as the live feed: other people's DIRECT messages stay private
+    query = select(models.MessageArchive).where(staff_filter(models.MessageArchive, current_user.id))
+    if scope:
+        query = query.where(models.MessageArchive.scope == scope)
+    if target_schedule_id:
+        query = query.where(models.MessageArchive.target_schedule_id == target_schedule_id)
+    if sender_id:
+        query = query.where(models.MessageArchive.sender_id == sender_id)
+    if before_id:
+        query = query.where(models.MessageArchive.id < before_id)
+
+    archived = (await db.scalars(query.order_by(models.MessageArchive.id.desc()).limit(limit))).all()
+
+    results = []
+    for m in archived:
+        m_out = schemas.MessageArchiveOut.model_validate(m)
+        m_out.sender_name = m.sender_name or ""
+        m_out.image_variants = images.variants_for_url(m.image_url)
         results.append(m_out)
-        
+
     return results
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func as sa_func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import select, func as sa_func
 from typing import List
 from datetime import date
-import models, schemas, database
+import models, schemas, database, listing, querycheck
 import utils as auth
 
 router = APIRouter(
@@ -14,24 +15,23 @@ router = APIRouter(
 
 # --- A. Yearly Summary (Revenue per month) ---
 @router.get("/yearly-summary")
-def yearly_summary(
+async def yearly_summary(
     year: int,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user),
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
 ):
     if current_user.role != models.Role.OWNER:
         raise HTTPException(status_code=403, detail="Only Owner can view")
 
-    rows = (
-        db.query(
+    rows = (await db.execute(
+        select(
             models.Payment.month,
             sa_func.sum(models.Payment.amount).label("total_revenue"),
             sa_func.count(models.Payment.id).label("payment_count"),
         )
-        .filter(models.Payment.year == year)
+        .where(models.Payment.year == year)
         .group_by(models.Payment.month)
-        .all()
-    )
+    )).all()
 
     lookup = {r.month: {"total_revenue": r.total_revenue or 0, "payment_count": r.payment_count} for r in rows}
 
@@ -45,22 +45,27 @@ def yearly_summary(
 
 # --- B. Debtors (Members who haven't paid for a month) ---
 @router.get("/debtors")
-def debtors(
+@querycheck.query_budget(2)
+async def debtors(
     month: int,
     year: int,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user),
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
 ):
     if current_user.role != models.Role.OWNER:
         raise HTTPException(status_code=403, detail="Only Owner can view")
 
-    active_members = db.query(models.Member).filter(models.Member.active == True).all()
+    active_members = (await db.scalars(
+        select(models.Member)
+        .options(joinedload(models.Member.parent))
+        .where(models.Member.active == True)
+    )).all()
 
     paid_member_ids = set(
-        r[0]
-        for r in db.query(models.Payment.member_id)
-        .filter(models.Payment.month == month, models.Payment.year == year)
-        .all()
+        (await db.scalars(
+            select(models.Payment.member_id)
+            .where(models.Payment.month == month, models.Payment.year == year)
+        )).all()
     )
 
     result = []
@@ -78,15 +83,15 @@ def debtors(
 
 # --- C. Create Payment ---
 @router.post("/", response_model=schemas.PaymentOut, status_code=status.HTTP_201_CREATED)
-def create_payment(
+async def create_payment(
     payment: schemas.PaymentCreate,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user),
+    db: AsyncSession = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
 ):
     if current_user.role != models.Role.OWNER:
         raise HTTPException(status_code=403, detail="Only Owner can record payments")
 
-    member = db.query(models.Member).filter(models.Member.id == payment.member_id).first()
+    member = await db.get(models.Member, payment.member_id)
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
 
@@ -100,8 +105,8 @@ def create_payment(
         notes=payment.notes,
     )
     db.add(db_payment)
-    db.commit()
-    db.refresh(db_payment)
+    await db.commit()
+    await db.refresh(db_payment)
 
     return schemas.PaymentOut(
         id=db_payment.id,
@@ -118,65 +123,53 @@ def create_payment(
 
 
 # --- D. Payment History (Latest 50) ---
-@router.get("/history", response_model=List[schemas.PaymentOut])
-def payment_history(
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user),
+@router.get("/history", response_model=List[schemas.PaymentOut], response_class=listing.ORJSONResponse)
+@querycheck.query_budget(1)
+async def payment_history(
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
 ):
     if current_user.role != models.Role.OWNER:
         raise HTTPException(status_code=403, detail="Only Owner can view")
 
-    payments = (
-        db.query(models.Payment)
+    result = await db.execute(
+        select(
+            *listing.columns_for(models.Payment, schemas.PaymentOut),
+            sa_func.coalesce(models.Member.full_name, "").label("member_name"),
+        )
+        .outerjoin(models.Member, models.Member.id == models.Payment.member_id)
         .order_by(models.Payment.created_at.desc())
         .limit(50)
-        .all()
     )
-
-    result = []
-    for p in payments:
-        result.append(schemas.PaymentOut(
-            id=p.id,
-            member_id=p.member_id,
-            amount=p.amount,
-            currency=p.currency,
-            payment_date=p.payment_date,
-            payment_method=p.payment_method,
-            month=p.month,
-            year=p.year,
-            notes=p.notes,
-            member_name=p.member.full_name if p.member else "",
-        ))
-
-    return result
+    return listing.respond(listing.row_dicts(result))
 
 
 # --- E. Payment Status (For Parents) ---
 @router.get("/status/{member_id}")
-def get_payment_status(
+async def get_payment_status(
     member_id: int,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user),
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
 ):
-    # Allow Owner or the Parent of the member
-    member = db.query(models.Member).filter(models.Member.id == member_id).first()
-    if not member:
-        raise HTTPException(status_code=404, detail="Member not found")
-
-    if current_user.role != models.Role.OWNER:
-        if member.parent_id != current_user.id:
-             raise HTTPException(status_code=403, detail="Not authorized")
+    # Allow Owner or the Parent of the member (ownership comes from the cached principal,
+    # so own children need no lookup; anything else is 404 or 403 as before)
+    is_owner = current_user.role == models.Role.OWNER
+    if is_owner or not current_user.owns_member(member_id):
+        if not await db.scalar(select(models.Member.id).where(models.Member.id == member_id)):
+            raise HTTPException(status_code=404, detail="Member not found")
+        if not is_owner:
+            raise HTTPException(status_code=403, detail="Not authorized")
 
     today = date.today()
     # Serbian month names (0-index placeholder)
     month_names = ["", "Januar", "Februar", "Mart", "April", "Maj", "Jun", 
                    "Jul", "Avgust", "Septembar", "Oktobar", "Novembar", "Decembar"]
     
-    payment = db.query(models.Payment).filter(
+    payment = await db.scalar(select(models.Payment).where(
         models.Payment.member_id == member_id,
         models.Payment.month == today.month,
         models.Payment.year == today.year
-    ).first()
+    ).limit(1))
 
     return {
         "is_paid": payment is not None,
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from pydantic import BaseModel
-from typing import List
-import models, schemas, database
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import delete, func, select, update
+from typing import List, Optional
+from datetime import date, datetime
+import models, schemas, database, etags, events, listing, projection, querycheck, visibility
 import utils as auth
 
 router = APIRouter(
@@ -11,56 +12,72 @@ router = APIRouter(
     tags=["Schedules & Enrollments"]
 )
 
-@router.get("/", response_model=List[schemas.ScheduleOut])
+# EnrollmentOut nests the schedule
+_WITH_SCHEDULE = joinedload(models.Enrollment.schedule)
+
+@router.get("/", response_model=List[schemas.ScheduleOut], response_class=listing.ORJSONResponse)
+@querycheck.query_budget(3)
 async def read_schedules(
+    request: Request,
+    response: Response,
     active_only: bool = True, 
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    selection: Optional[projection.Selection] = Depends(projection.selector("schedule")),
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
-    query = db.query(models.Schedule)
+    etag = await etags.etag_for(db, request, etags.SCHEDULES, current_user)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag)
+
+    # Current enrollments for all schedules in one grouped query
+    counts = {}
+    if selection is None or selection.wants("current_enrollments_count"):
+        counts = dict((await db.execute(
+            select(models.Enrollment.schedule_id, func.count(models.Enrollment.id))
+            .where(models.Enrollment.active == True)
+            .group_by(models.Enrollment.schedule_id)
+        )).all())
+
+    if selection:
+        query = select(models.Schedule).options(*projection.query_options(selection))
+        if active_only:
+            query = query.where(models.Schedule.is_active == True)
+        schedules = (await db.scalars(query)).all()
+        return etags.attach(projection.respond(
+            schedules, selection, {"current_enrollments_count": lambda sched: counts.get(sched.id, 0)}
+        ), response, etag)
+
+    query = select(*listing.columns_for(models.Schedule, schemas.ScheduleOut))
     if active_only:
-        query = query.filter(models.Schedule.is_active == True)
-    
-    schedules = query.all()
-    
-    # Calculate current enrollments for each schedule
-    # Note: Optimize this with a JOIN in production
-    results = []
+        query = query.where(models.Schedule.is_active == True)
+
+    schedules = listing.row_dicts(await db.execute(query))
     for schedule in schedules:
-        count = db.query(models.Enrollment).filter(
-            models.Enrollment.schedule_id == schedule.id,
-            models.Enrollment.active == True
-        ).count()
-        
-        # Create Pydantic model manually to include the calculated field
-        schedule_out = schemas.ScheduleOut.model_validate(schedule)
-        schedule_out.current_enrollments_count = count
-        results.append(schedule_out)
-        
-    return results
+        schedule["current_enrollments_count"] = counts.get(schedule["id"], 0)
+    return etags.attach(listing.respond(schedules), response, etag)
 
 @router.post("/", response_model=schemas.ScheduleOut, status_code=status.HTTP_201_CREATED)
 async def create_schedule(
     schedule: schemas.ScheduleCreate,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     if current_user.role != models.Role.OWNER:
         raise HTTPException(status_code=403, detail="Only Owners can create schedules")
     
     new_schedule = models.Schedule(**schedule.model_dump())
     db.add(new_schedule)
-    db.commit()
-    db.refresh(new_schedule)
-    db.refresh(new_schedule)
+    await etags.bump(db, etags.SCHEDULES, etags.MEMBERS)
+    await db.commit()
+    await db.refresh(new_schedule)
     return new_schedule
 
 @router.put("/{schedule_id}", response_model=schemas.ScheduleOut)
 async def update_schedule(
     schedule_id: int,
     schedule_update: schemas.ScheduleCreate,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     """
     Update an existing schedule. Only for OWNERS.
@@ -68,7 +85,7 @@ async def update_schedule(
     if current_user.role != models.Role.OWNER:
         raise HTTPException(status_code=403, detail="Only Owners can update schedules")
 
-    db_schedule = db.query(models.Schedule).filter(models.Schedule.id == schedule_id).first()
+    db_schedule = await db.get(models.Schedule, schedule_id)
     if not db_schedule:
         raise HTTPException(status_code=404, detail="Schedule not found")
 
@@ -78,15 +95,16 @@ async def update_schedule(
     for key, value in update_data.items():
         setattr(db_schedule, key, value)
 
-    db.commit()
-    db.refresh(db_schedule)
+    await etags.bump(db, etags.SCHEDULES, etags.MEMBERS)
+    await db.commit()
+    await db.refresh(db_schedule)
     return db_schedule
 
 @router.delete("/{schedule_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_schedule(
     schedule_id: int,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     """
     Delete a schedule and cascade-remove all related records.
@@ -94,31 +112,35 @@ async def delete_schedule(
     if current_user.role != models.Role.OWNER:
         raise HTTPException(status_code=403, detail="Only Owners can delete schedules")
 
-    db_schedule = db.query(models.Schedule).filter(models.Schedule.id == schedule_id).first()
+    db_schedule = await db.get(models.Schedule, schedule_id)
     if not db_schedule:
         raise HTTPException(status_code=404, detail="Schedule not found")
 
     # TODO: Send push notification to enrolled parents about schedule cancellation (Next Release)
 
     # Cascade delete related records
-    db.query(models.Attendance).filter(models.Attendance.schedule_id == schedule_id).delete()
-    db.query(models.Enrollment).filter(models.Enrollment.schedule_id == schedule_id).delete()
-    db.query(models.ScheduleCancellation).filter(models.ScheduleCancellation.schedule_id == schedule_id).delete()
-    db.query(models.Message).filter(models.Message.target_schedule_id == schedule_id).update({"target_schedule_id": None})
+    await db.execute(delete(models.Attendance).where(models.Attendance.schedule_id == schedule_id))
+    await db.execute(delete(models.Enrollment).where(models.Enrollment.schedule_id == schedule_id))
+    await db.execute(delete(models.ScheduleCancellation).where(models.ScheduleCancellation.schedule_id == schedule_id))
+    await db.execute(
+        update(models.Message).where(models.Message.target_schedule_id == schedule_id).values(target_schedule_id=None)
+    )
 
-    db.delete(db_schedule)
-    db.commit()
+    await db.delete(db_schedule)
+    await etags.bump(db, etags.SCHEDULES, etags.MEMBERS)
+    await db.commit()
+    visibility.schedule_removed(schedule_id)
     return None
 
 @router.post("/enrollments", response_model=schemas.EnrollmentOut, status_code=status.HTTP_201_CREATED)
 async def create_enrollment(
     enrollment_data: schemas.EnrollmentCreate,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     # 1. Security Logic
     # Allow if Admin/Owner OR if Parent of the member
-    member = db.query(models.Member).filter(models.Member.id == enrollment_data.member_id).first()
+    member = await db.get(models.Member, enrollment_data.member_id)
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
         
@@ -126,7 +148,7 @@ async def create_enrollment(
         raise HTTPException(status_code=403, detail="Not authorized to enroll this member")
 
     # 2. Schedule Validation
-    schedule = db.query(models.Schedule).filter(models.Schedule.id == enrollment_data.schedule_id).first()
+    schedule = await db.get(models.Schedule, enrollment_data.schedule_id)
     if not schedule:
         raise HTTPException(status_code=404, detail="Schedule not found")
     
@@ -134,29 +156,29 @@ async def create_enrollment(
         raise HTTPException(status_code=400, detail="This schedule is currently closed")
 
     # 3. Business Rule: Capacity Check
-    current_count = db.query(models.Enrollment).filter(
+    current_count = await db.scalar(select(func.count(models.Enrollment.id)).where(
         models.Enrollment.schedule_id == schedule.id,
         models.Enrollment.active == True
-    ).count()
+    ))
     
     if current_count >= schedule.capacity:
         raise HTTPException(status_code=400, detail="Schedule is full")
 
     # 4. Business Rule: Max 2 slots per member
-    member_active_enrollments = db.query(models.Enrollment).filter(
+    member_active_enrollments = await db.scalar(select(func.count(models.Enrollment.id)).where(
         models.Enrollment.member_id == member.id,
         models.Enrollment.active == True
-    ).count()
+    ))
     
     if member_active_enrollments >= 2:
         raise HTTPException(status_code=400, detail="Member has reached the maximum of 2 weekly slots")
     
     # 5. Check if already enrolled in this specific slot
-    existing_enrollment = db.query(models.Enrollment).filter(
+    existing_enrollment = await db.scalar(select(models.Enrollment.id).where(
         models.Enrollment.member_id == member.id,
         models.Enrollment.schedule_id == schedule.id,
         models.Enrollment.active == True
-    ).first()
+    ).limit(1))
     
     if existing_enrollment:
         raise HTTPException(status_code=400, detail="Member is already enrolled in this slot")
@@ -169,45 +191,155 @@ async def create_enrollment(
         active=True
     )
     db.add(new_enrollment)
-    db.commit()
-    db.refresh(new_enrollment)
+    await etags.bump(db, etags.SCHEDULES, etags.MEMBERS)
+    await db.commit()
+    visibility.invalidate_parent(member.parent_id)
     
-    # Enrich response with schedule data (for schema compatibility)
-    # The Pydantic model expects a nested schedule object, so we manually attach it or let ORM handle it if lazy loading works
-    # We are returning the ORM object, Pydantic's from_attributes should handle the relationship if loaded
+    # The Pydantic model expects a nested schedule object; load it explicitly (no lazy loading in async)
+    await db.refresh(new_enrollment, ["schedule"])
     return new_enrollment
 
+@router.put("/enrollments/{enrollment_id}/deactivate", response_model=schemas.EnrollmentOut)
+async def deactivate_enrollment(
+    enrollment_id: int,
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    enrollment = await db.scalar(
+        select(models.Enrollment)
+        .options(joinedload(models.Enrollment.member), _WITH_SCHEDULE)
+        .where(models.Enrollment.id == enrollment_id)
+    )
+    if not enrollment:
+        raise HTTPException(status_code=404, detail="Enrollment not found")
+
+    parent_id = enrollment.member.parent_id
+    if current_user.role != models.Role.OWNER and parent_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to change this enrollment")
+
+    if enrollment.active:
+        enrollment.active = False
+        enrollment.end_date = date.today()
+        await etags.bump(db, etags.SCHEDULES, etags.MEMBERS)
+        await db.commit()
+        visibility.invalidate_parent(parent_id)
+
+    return enrollment
+
 @router.get("/members/{member_id}/enrollments", response_model=List[schemas.EnrollmentOut])
 async def get_member_enrollments(
     member_id: int,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    selection: Optional[projection.Selection] = Depends(projection.selector("enrollment")),
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
-    member = db.query(models.Member).filter(models.Member.id == member_id).first()
-    if not member:
-        raise HTTPException(status_code=404, detail="Member not found")
+    # Security Check (parents: ownership comes from the cached principal, so
+    # their own children need no lookup; anything else is 404 or 403 as before)
+    is_staff = current_user.role in [models.Role.OWNER, models.Role.COACH]
+    if is_staff or not current_user.owns_member(member_id):
+        if not await db.scalar(select(models.Member.id).where(models.Member.id == member_id)):
+            raise HTTPException(status_code=404, detail="Member not found")
+        if not is_staff:
+            raise HTTPException(status_code=403, detail="Not authorized to view enrollments for this member")
     
-    # Security Check
-    if current_user.role not in [models.Role.OWNER, models.Role.COACH] and member.parent_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to view enrollments for this member")
-    
-    enrollments = db.query(models.Enrollment).filter(
+    query = select(models.Enrollment).where(
         models.Enrollment.member_id == member_id,
         models.Enrollment.active == True
-    ).all()
+    )
+    if selection:
+        enrollments = (await db.scalars(query.options(*projection.query_options(selection)))).all()
+        return projection.respond(enrollments, selection)
     
-    return enrollments
+    return (await db.scalars(query.options(_WITH_SCHEDULE))).all()
+
+# --- Schedule Requests (parent asks for a new slot) ---
+def _notify_staff(request_id: int, parent_id: int, parent_name: str, text: str):
+    """
+    Runs after the response is sent: a live event for staff dashboards
+    (/dashboard/live is staff-only). The request itself stays in the NEW
+    queue of GET /schedules/requests; no message is posted in the parent's name.
+    """
+    events.publish("schedule_request", {
+        "id": request_id, "parent_id": parent_id, "parent_name": parent_name, "message": text,
+    })
+
+
+def _request_out(req: models.ScheduleRequest) -> schemas.ScheduleRequestOut:
+    out = schemas.ScheduleRequestOut.model_validate(req)
+    if req.parent:
+        out.parent_name = req.parent.full_name
+        out.parent_email = req.parent.email
+    return out
 
-class ScheduleRequest(BaseModel):
-    message: str
 
-@router.post("/requests")
+@router.post("/requests", status_code=status.HTTP_201_CREATED)
 async def create_schedule_request(
-    request: ScheduleRequest,
-    current_user: models.User = Depends(auth.get_current_active_user)
+    request: schemas.ScheduleRequestCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    schedule_request = models.ScheduleRequest(
+        parent_id=current_user.id,
+        message=request.message,
+        status=models.ScheduleRequestStatus.NEW,
+    )
+    db.add(schedule_request)
+    await db.commit()
+
+    background_tasks.add_task(
+        _notify_staff, schedule_request.id, current_user.id, current_user.full_name, request.message
+    )
+    return {"message": "Request sent successfully", "id": schedule_request.id}
+
+@router.get("/requests", response_model=List[schemas.ScheduleRequestOut])
+async def list_schedule_requests(
+    status_filter: Optional[models.ScheduleRequestStatus] = Query(None, alias="status"),
+    parent_id: Optional[int] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
-    print(f"--- NEW SCHEDULE REQUEST ---")
-    print(f"From: {current_user.email} ({current_user.full_name})")
-    print(f"Message: {request.message}")
-    print("----------------------------")
-    return {"message": "Request sent successfully"}
+    if current_user.role != models.Role.OWNER:
+        raise HTTPException(status_code=403, detail="Only Owners can view schedule requests")
+
+    query = select(models.ScheduleRequest).options(joinedload(models.ScheduleRequest.parent))
+    if status_filter:
+        query = query.where(models.ScheduleRequest.status == status_filter)
+    if parent_id:
+        query = query.where(models.ScheduleRequest.parent_id == parent_id)
+
+    requests = (await db.scalars(
+        query.order_by(models.ScheduleRequest.id.desc()).offset(skip).limit(limit)
+    )).all()
+    return [_request_out(r) for r in requests]
+
+@router.put("/requests/{request_id}", response_model=schemas.ScheduleRequestOut)
+async def update_schedule_request(
+    request_id: int,
+    update: schemas.ScheduleRequestUpdate,
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    if current_user.role != models.Role.OWNER:
+        raise HTTPException(status_code=403, detail="Only Owners can update schedule requests")
+
+    schedule_request = await db.scalar(
+        select(models.ScheduleRequest)
+        .options(joinedload(models.ScheduleRequest.parent))
+        .where(models.ScheduleRequest.id == request_id)
+    )
+    if not schedule_request:
+        raise HTTPException(status_code=404, detail="Request not found")
+
+    schedule_request.status = update.status
+    if update.status == models.ScheduleRequestStatus.NEW:
+        schedule_request.handled_at = None
+        schedule_request.handled_by_id = None
+    else:
+        schedule_request.handled_at = datetime.utcnow()
+        schedule_request.handled_by_id = current_user.id
+
+    await db.commit()
+    return _request_out(schedule_request)
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from typing import List
 from datetime import date
-import models, schemas, database
+import models, schemas, database, etags
 import utils as auth
 
+# MemberSkillOut nests the skill
+_WITH_SKILL = joinedload(models.MemberSkill.skill)
+
 router = APIRouter(
     prefix="/skills",
     tags=["Skills & Progress"]
@@ -13,29 +18,36 @@ router = APIRouter(
 # 1. Get All Skills (Public/Authenticated)
 @router.get("/", response_model=List[schemas.SkillOut])
 async def read_skills(
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
-    return db.query(models.Skill).order_by(models.Skill.display_order).all()
+    etag = await etags.etag_for(db, request, etags.SKILLS, current_user)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag)
+    skills = (await db.scalars(select(models.Skill).order_by(models.Skill.display_order))).all()
+    return etags.attach(skills, response, etag)
 
 @router.post("/", response_model=schemas.SkillOut, status_code=status.HTTP_201_CREATED)
 async def create_skill(
     skill: schemas.SkillCreate,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     if current_user.role != models.Role.OWNER:
         raise HTTPException(status_code=403, detail="Only Owners can create skills")
     
     # Check for duplicate
-    existing = db.query(models.Skill).filter(models.Skill.name == skill.name).first()
+    existing = await db.scalar(select(models.Skill).where(models.Skill.name == skill.name))
     if existing:
         raise HTTPException(status_code=400, detail="Skill with this name already exists")
 
     new_skill = models.Skill(**skill.model_dump())
     db.add(new_skill)
-    db.commit()
-    db.refresh(new_skill)
+    await etags.bump(db, etags.SKILLS)
+    await db.commit()
+    await db.refresh(new_skill)
     return new_skill
 
 # 2. Award Skill (Coach/Owner Only)
@@ -43,28 +55,28 @@ async def create_skill(
 async def award_skill(
     member_id: int,
     skill_data: schemas.MemberSkillBase,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     # RBAC
     if current_user.role not in [models.Role.COACH, models.Role.OWNER]:
         raise HTTPException(status_code=403, detail="Only Coaches can award skills")
     
     # Check Member
-    member = db.query(models.Member).filter(models.Member.id == member_id).first()
+    member = await db.get(models.Member, member_id)
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
 
     # Check Skill
-    skill = db.query(models.Skill).filter(models.Skill.id == skill_data.skill_id).first()
+    skill = await db.get(models.Skill, skill_data.skill_id)
     if not skill:
         raise HTTPException(status_code=404, detail="Skill not found")
 
     # Check if already acquired
-    existing = db.query(models.MemberSkill).filter(
+    existing = await db.scalar(select(models.MemberSkill).options(_WITH_SKILL).where(
         models.MemberSkill.member_id == member_id,
         models.MemberSkill.skill_id == skill_data.skill_id
-    ).first()
+    ).limit(1))
     
     if existing:
         return existing
@@ -77,8 +89,8 @@ async def award_skill(
         coach_id=current_user.id
     )
     db.add(new_achievement)
-    db.commit()
-    db.refresh(new_achievement)
+    await db.commit()
+    await db.refresh(new_achievement, ["skill"])
     return new_achievement
 
 # 3. Revoke Skill (Coach/Owner Only)
@@ -86,20 +98,20 @@ async def award_skill(
 async def revoke_skill(
     member_id: int,
     skill_id: int,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     if current_user.role not in [models.Role.COACH, models.Role.OWNER]:
         raise HTTPException(status_code=403, detail="Only Coaches can revoke skills")
 
-    achievement = db.query(models.MemberSkill).filter(
+    achievement = await db.scalar(select(models.MemberSkill).where(
         models.MemberSkill.member_id == member_id,
         models.MemberSkill.skill_id == skill_id
-    ).first()
+    ).limit(1))
     
     if achievement:
-        db.delete(achievement)
-        db.commit()
+        await db.delete(achievement)
+        await db.commit()
     
     return None
 
@@ -107,40 +119,41 @@ async def revoke_skill(
 @router.get("/members/{member_id}", response_model=List[schemas.MemberSkillOut])
 async def get_member_skills(
     member_id: int,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
-    # Check Member
-    member = db.query(models.Member).filter(models.Member.id == member_id).first()
-    if not member:
-        raise HTTPException(status_code=404, detail="Member not found")
-
-    # Security: Parent can only view own child
-    if current_user.role == models.Role.PARENT and member.parent_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to view this member's skills")
-
-    return db.query(models.MemberSkill).filter(models.MemberSkill.member_id == member_id).all()
+    # Security: Parent can only view own child (no lookup needed for own children;
+    # anything else is 404 or 403 as before)
+    is_parent = current_user.role == models.Role.PARENT
+    if not is_parent or not current_user.owns_member(member_id):
+        if not await db.scalar(select(models.Member.id).where(models.Member.id == member_id)):
+            raise HTTPException(status_code=404, detail="Member not found")
+        if is_parent:
+            raise HTTPException(status_code=403, detail="Not authorized to view this member's skills")
+
+    return (await db.scalars(
+        select(models.MemberSkill).options(_WITH_SKILL).where(models.MemberSkill.member_id == member_id)
+    )).all()
 
 # 5. Get Full Skills Status for a Member (Coach Dialog)
 @router.get("/members/{member_id}/status", response_model=List[schemas.MemberSkillStatus])
 async def get_member_skills_status(
     member_id: int,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     """Returns ALL skills with is_mastered flag for the Coach dialog."""
-    member = db.query(models.Member).filter(models.Member.id == member_id).first()
+    member = await db.get(models.Member, member_id)
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
 
     # Get all base skills
-    all_skills = db.query(models.Skill).order_by(models.Skill.display_order).all()
+    all_skills = (await db.scalars(select(models.Skill).order_by(models.Skill.display_order))).all()
 
     # Get this member's acquired skill IDs
-    acquired = db.query(models.MemberSkill.skill_id).filter(
-        models.MemberSkill.member_id == member_id
-    ).all()
-    acquired_ids = {row[0] for row in acquired}
+    acquired_ids = set((await db.scalars(
+        select(models.MemberSkill.skill_id).where(models.MemberSkill.member_id == member_id)
+    )).all())
 
     return [
         schemas.MemberSkillStatus(
@@ -156,21 +169,21 @@ async def get_member_skills_status(
 async def batch_update_member_skills(
     member_id: int,
     data: schemas.MemberSkillBatchUpdate,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     """Replaces all member skills with the provided list of mastered skill IDs."""
     if current_user.role not in [models.Role.COACH, models.Role.OWNER]:
         raise HTTPException(status_code=403, detail="Only Coaches/Owners can update skills")
 
-    member = db.query(models.Member).filter(models.Member.id == member_id).first()
+    member = await db.get(models.Member, member_id)
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
 
     # Delete all existing records for this member
-    db.query(models.MemberSkill).filter(
+    await db.execute(delete(models.MemberSkill).where(
         models.MemberSkill.member_id == member_id
-    ).delete()
+    ))
 
     # Insert new records for mastered skills
     for skill_id in data.mastered_skill_ids:
@@ -182,5 +195,5 @@ async def batch_update_member_skills(
         )
         db.add(new_record)
 
-    db.commit()
+    await db.commit()
     return {"message": "Skills updated successfully"}
@@ -0,0 +1,46 @@
+import os
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.responses import FileResponse
+import models, schemas
+import images
+import utils as auth
+
+router = APIRouter(
+    prefix="/uploads",
+    tags=["Uploads"]
+)
+
+# Content-addressed files never change, so clients may cache them forever
+_CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+
+@router.post("/images", response_model=schemas.ImageUploadOut, status_code=status.HTTP_201_CREATED)
+async def upload_image(
+    file: UploadFile = File(...),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    data = await file.read(images.MAX_UPLOAD_BYTES + 1)
+    if len(data) > images.MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image is too large")
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty file")
+
+    try:
+        digest = await images.store_image(data)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="File is not a valid image")
+
+    urls = images.variant_urls(digest)
+    return schemas.ImageUploadOut(id=digest, url=urls[images.ORIGINAL], variants=urls)
+
+
+@router.get("/{digest}/{variant}")
+async def get_image(digest: str, variant: str):
+    if not images.is_valid_digest(digest) or variant not in (images.ORIGINAL, *images.VARIANTS):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    path = images.variant_path(digest, variant)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    return FileResponse(path, media_type="image/jpeg", headers=_CACHE_HEADERS)
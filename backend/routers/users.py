@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional # [NOVO] Bitno za listu korisnika
-import models, schemas, database
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import and_, delete, or_, select, update
+from typing import List, Optional, Union # [NOVO] Bitno za listu korisnika
+import models, schemas, database, etags, projection, tokens, visibility
 import utils as auth
 
 router = APIRouter(
@@ -9,35 +11,60 @@ router = APIRouter(
     tags=["Users"]
 )
 
+# UserOut nests members -> enrollments -> schedule; load them up front (no lazy loads in async)
+_WITH_MEMBERS = (
+    selectinload(models.User.members)
+    .selectinload(models.Member.enrollments)
+    .selectinload(models.Enrollment.schedule)
+)
+
+async def _get_user_out(db: AsyncSession, user_id: int) -> models.User:
+    return await db.scalar(
+        select(models.User).options(_WITH_MEMBERS).where(models.User.id == user_id)
+    )
+
 # --- 1. STARI KOD: Saznaj ko sam ja (Bitno za AuthProvider) ---
 @router.get("/me", response_model=schemas.UserOut)
-async def read_users_me(current_user: models.User = Depends(auth.get_current_active_user)):
-    return current_user
+async def read_users_me(
+    selection: Optional[projection.Selection] = Depends(projection.selector("user")),
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
+):
+    if selection:
+        user = await db.scalar(
+            select(models.User)
+            .options(*projection.query_options(selection))
+            .where(models.User.id == current_user.id)
+        )
+        return projection.respond(user, selection)
+    return await _get_user_out(db, current_user.id)
 
 # --- 1b. Promena lozinke (Change Password) ---
 @router.put("/me/password")
-def change_password(
+async def change_password(
     payload: schemas.PasswordChange,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user),
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
 ):
-    if not auth.verify_password(payload.old_password, current_user.hashed_password):
+    user = await db.get(models.User, current_user.id)
+    if not await auth.verify_password_async(payload.old_password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Stara lozinka nije tačna.")
 
-    current_user.hashed_password = auth.get_password_hash(payload.new_password)
-    db.commit()
+    user.hashed_password = await auth.get_password_hash_async(payload.new_password)
+    await db.commit()
+    auth.invalidate_user(user.id)
     return {"detail": "Lozinka je uspešno promenjena."}
 
 # --- 2. STARI KOD: Kreiraj korisnika (Bitno za pravljenje Trenera/Roditelja) ---
 @router.post("/", response_model=schemas.UserOut)
-def create_user(user: schemas.UserCreate, db: Session = Depends(auth.get_db)):
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(auth.get_db)):
     # 1. Provera da li email vec postoji
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+    db_user = await db.scalar(select(models.User).where(models.User.email == user.email))
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # 2. Hesiranje lozinke
-    hashed_password = auth.get_password_hash(user.password)
+    hashed_password = await auth.get_password_hash_async(user.password)
     
     # 3. Kreiranje korisnika
     db_user = models.User(
@@ -50,38 +77,74 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(auth.get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     
-    return db_user
+    return await _get_user_out(db, db_user.id)
 
 # --- 3. NOVI KOD: Izlistaj korisnike (Bitno da Owner vidi trenere) ---
-@router.get("/", response_model=List[schemas.UserOut])
+@router.get("/", response_model=Union[List[schemas.UserOut], List[schemas.UserListOut]])
 async def read_users(
+    response: Response,
     role: Optional[str] = None, # Možeš da filtriraš ?role=COACH
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    q: Optional[str] = Query(None, min_length=1, description="Prefix of name, email or phone"),
+    after_id: Optional[int] = Query(None, description="Keyset cursor: last id of the previous page"),
+    limit: int = Query(100, ge=1, le=500),
+    include_members: bool = False,
+    selection: Optional[projection.Selection] = Depends(projection.selector("user")),
+    db: AsyncSession = Depends(auth.get_read_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
+    """
+    Users ordered by id, paged by keyset (?after_id=). The next cursor is
+    returned in the X-Next-Cursor header. Members (with enrollments and
+    schedules) are only included with ?include_members=true, batch-loaded.
+    ?fields= / ?expand= return only the requested attributes and relations.
+    """
     # Samo Owner i Trener mogu da gledaju liste korisnika
     if current_user.role not in [models.Role.OWNER, models.Role.COACH]:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    query = db.query(models.User)
+    query = select(models.User)
     
     if role:
-        query = query.filter(models.User.role == role)
-        
-    users = query.offset(skip).limit(limit).all()
-    return users
+        query = query.where(models.User.role == role)
+
+    if q:
+        # Range on the casefolded columns so their indexes serve the prefix match
+        prefix = models.search_key(q)
+        upper = prefix + "\uffff"
+        query = query.where(or_(
+            and_(models.User.full_name_search >= prefix, models.User.full_name_search < upper),
+            and_(models.User.email_search >= prefix, models.User.email_search < upper),
+            and_(models.User.phone_number >= q.strip(), models.User.phone_number < q.strip() + "\uffff"),
+        ))
+
+    if after_id is not None:
+        query = query.where(models.User.id > after_id)
+
+    if selection:
+        query = query.options(*projection.query_options(selection))
+    elif include_members:
+        query = query.options(_WITH_MEMBERS)
+
+    users = (await db.scalars(query.order_by(models.User.id).limit(limit))).all()
+
+    if selection:
+        response = projection.respond(users, selection)
+    if len(users) == limit:
+        response.headers["X-Next-Cursor"] = str(users[-1].id)
+    if selection:
+        return response
+
+    out_schema = schemas.UserOut if include_members else schemas.UserListOut
+    return [out_schema.model_validate(u) for u in users]
 
 # --- 4. DELETE: Obriši korisnika (Staff) ---
 @router.delete("/{user_id}")
-def delete_user(
+async def delete_user(
     user_id: int,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user),
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
 ):
     if current_user.role != models.Role.OWNER:
         raise HTTPException(status_code=403, detail="Only Owner can delete users")
@@ -89,51 +152,100 @@ def delete_user(
     if user_id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     # --- Coach cleanup: nullify references before deleting ---
     if user.role == models.Role.COACH:
-        db.query(models.Schedule).filter(
+        await db.execute(update(models.Schedule).where(
             models.Schedule.coach_id == user_id
-        ).update({"coach_id": None})
+        ).values(coach_id=None))
 
-        db.query(models.Attendance).filter(
+        await db.execute(update(models.Attendance).where(
             models.Attendance.coach_id == user_id
-        ).update({"coach_id": None})
+        ).values(coach_id=None))
 
-        db.query(models.MemberSkill).filter(
+        await db.execute(update(models.MemberSkill).where(
             models.MemberSkill.coach_id == user_id
-        ).update({"coach_id": None})
+        ).values(coach_id=None))
+
+    # --- Revoke sessions: live access tokens stop working within seconds ---
+    await tokens.revoke_user(db, user_id)
+    await db.execute(delete(models.RefreshToken).where(
+        models.RefreshToken.user_id == user_id
+    ))
+
+    # --- Clean up schedule requests by/handled by this user ---
+    await db.execute(delete(models.ScheduleRequest).where(
+        models.ScheduleRequest.parent_id == user_id
+    ))
+    await db.execute(update(models.ScheduleRequest).where(
+        models.ScheduleRequest.handled_by_id == user_id
+    ).values(handled_by_id=None))
 
     # --- Clean up messages sent/received by this user ---
-    db.query(models.Message).filter(
+    await db.execute(delete(models.Message).where(
         models.Message.sender_id == user_id
-    ).delete()
-    db.query(models.Message).filter(
+    ))
+    await db.execute(update(models.Message).where(
         models.Message.recipient_id == user_id
-    ).update({"recipient_id": None})
+    ).values(recipient_id=None))
+    await db.execute(delete(models.MessageArchive).where(
+        models.MessageArchive.sender_id == user_id
+    ))
+    await db.execute(update(models.MessageArchive).where(
+        models.MessageArchive.recipient_id == user_id
+    ).values(recipient_id=None))
 
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    if user.role == models.Role.COACH:
+        await etags.bump(db, etags.SCHEDULES, etags.MEMBERS)  # Schedules lost their coach_id
+    await db.commit()
+    auth.invalidate_user(user_id)
+    visibility.invalidate_parent(user_id)
     return {"detail": "User deleted"}
 
+# --- 4b. Aktivacija / deaktivacija korisnika (Owner) ---
+@router.put("/{user_id}/status", response_model=schemas.UserOut)
+async def set_user_status(
+    user_id: int,
+    payload: schemas.UserStatusUpdate,
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
+):
+    if current_user.role != models.Role.OWNER:
+        raise HTTPException(status_code=403, detail="Only Owner can change user status")
+
+    if user_id == current_user.id:
+        raise HTTPException(status_code=400, detail="Cannot deactivate yourself")
+
+    user = await db.get(models.User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    user.is_active = payload.is_active
+    if not payload.is_active:
+        await tokens.revoke_user(db, user_id)
+    await db.commit()
+    auth.invalidate_user(user_id)
+    return await _get_user_out(db, user_id)
+
 # --- 5. ADMIN CREATE: Owner kreira korisnika (Trenera/Roditelja) ---
 @router.post("/admin-create", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
-def admin_create_user(
+async def admin_create_user(
     user: schemas.UserCreate,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user),
+    db: AsyncSession = Depends(auth.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user),
 ):
     if current_user.role != models.Role.OWNER:
         raise HTTPException(status_code=403, detail="Only Owner can create users")
 
-    existing = db.query(models.User).filter(models.User.email == user.email).first()
+    existing = await db.scalar(select(models.User).where(models.User.email == user.email))
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = auth.get_password_hash(user.password)
+    hashed_password = await auth.get_password_hash_async(user.password)
     db_user = models.User(
         email=user.email,
         hashed_password=hashed_password,
@@ -143,6 +255,5 @@ def admin_create_user(
         is_active=True,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
\ No newline at end of file
+    await db.commit()
+    return await _get_user_out(db, db_user.id)
\ No newline at end of file
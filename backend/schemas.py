@@ -1,12 +1,17 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict, Union
 from datetime import date
-from models import Role, MessageScope
+from models import Role, MessageScope, ScheduleRequestStatus
 
 # --- Token Schemas ---
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # seconds
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     email: Optional[str] = None
@@ -39,25 +44,31 @@ class UserCreate(UserBase):
     password: str
     role: Role = Role.PARENT
 
-class UserOut(UserBase):
+class UserListOut(UserBase):
+    """Lightweight row for user lists (no nested members)"""
     id: int
     role: Role
     is_active: bool
-    members: List[MemberOut] = []
 
     class Config:
         from_attributes = True
 
+class UserOut(UserListOut):
+    members: List[MemberOut] = []
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+class UserStatusUpdate(BaseModel):
+    is_active: bool
+
 class PasswordChange(BaseModel):
     old_password: str
     new_password: str
 
 # --- Schedule Schemas ---
-from datetime import time
+from datetime import time, datetime
 
 class ScheduleBase(BaseModel):
     day_of_week: str
@@ -95,8 +106,28 @@ class EnrollmentOut(BaseModel):
     class Config:
         from_attributes = True
 
+# --- Schedule Request Schemas ---
+class ScheduleRequestCreate(BaseModel):
+    message: str
+
+class ScheduleRequestUpdate(BaseModel):
+    status: ScheduleRequestStatus
+
+class ScheduleRequestOut(BaseModel):
+    id: int
+    parent_id: int
+    message: str
+    status: ScheduleRequestStatus
+    created_at: Optional[datetime] = None
+    handled_at: Optional[datetime] = None
+    handled_by_id: Optional[int] = None
+    parent_name: str = "" # Enriched field
+    parent_email: str = "" # Enriched field
+
+    class Config:
+        from_attributes = True
+
 # --- Message Schemas ---
-from datetime import datetime
 
 class MessageCreate(BaseModel):
     content: str
@@ -115,10 +146,21 @@ class MessageOut(BaseModel):
     recipient_id: Optional[int] = None
     target_schedule_id: Optional[int] = None
     sender_name: str = "" # Enriched field
+    image_variants: Optional[Dict[str, str]] = None # Enriched field (uploaded images only)
 
     class Config:
         from_attributes = True
 
+class MessageArchiveOut(MessageOut):
+    message_id: Optional[int] = None  # Id in the live table; `id` is the archive's own (the ?before_id= cursor)
+    sent_at: Optional[datetime] = None
+    archived_at: Optional[datetime] = None
+
+class ImageUploadOut(BaseModel):
+    id: str
+    url: str
+    variants: Dict[str, str]
+
 # --- Skill Schemas ---
 class SkillBase(BaseModel):
     name: str
@@ -209,3 +251,40 @@ class PaymentOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+# --- Admin: periodic jobs ---
+class JobRunOut(BaseModel):
+    id: int
+    job_name: str
+    trigger: str
+    worker: str
+    status: str
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    result: Optional[str] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class JobOut(BaseModel):
+    name: str
+    schedule: str
+    description: str
+    next_run_at: Optional[datetime] = None
+    running: bool = False
+    locked_by: Optional[str] = None
+    last_run: Optional[JobRunOut] = None
+
+# --- Admin: audit log ---
+class AuditOut(BaseModel):
+    id: int
+    created_at: datetime
+    actor_id: Optional[int] = None
+    actor_name: Optional[str] = None
+    source: Optional[str] = None
+    action: str
+    entity: str
+    entity_id: Optional[str] = None
+    changes: dict
+    txn_id: Optional[str] = None
@@ -0,0 +1,64 @@
+"""
+Copies the primary SQLite database into the replica files, for trying read replicas locally.
+
+Real Postgres replicas are kept in sync by streaming replication; this is
+the local stand-in. It uses SQLite's online backup API, so the copy is
+consistent even while the API is writing to the primary, and replica
+readers simply wait (busy_timeout) while a copy is in progress.
+
+    DATABASE_REPLICA_URLS=sqlite:///replica1.db,sqlite:///replica2.db python sync_replicas.py
+    python sync_replicas.py --interval 2      # keep copying every 2 seconds (simulated lag)
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+
+from sqlalchemy.engine import make_url
+
+import database
+
+
+def _sqlite_path(url: str) -> str:
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or not parsed.database:
+        sys.exit(f"Samo SQLite fajlovi mogu da se kopiraju: {url}")
+    return parsed.database
+
+
+def sync_once(primary_path: str, replica_paths) -> float:
+    started = time.perf_counter()
+    source = sqlite3.connect(primary_path)
+    try:
+        for path in replica_paths:
+            target = sqlite3.connect(path, timeout=database.SQLITE_BUSY_TIMEOUT_MS / 1000)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+    finally:
+        source.close()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy the primary SQLite database into the replica files.")
+    parser.add_argument("--interval", type=float, help="Repeat every N seconds instead of copying once")
+    args = parser.parse_args()
+
+    if not database.DATABASE_REPLICA_URLS:
+        sys.exit("DATABASE_REPLICA_URLS nije podešen.")
+    primary_path = _sqlite_path(database.SQLALCHEMY_DATABASE_URL)
+    replica_paths = [_sqlite_path(url) for url in database.DATABASE_REPLICA_URLS]
+
+    while True:
+        elapsed = sync_once(primary_path, replica_paths)
+        print(f"Kopirano na {len(replica_paths)} replika za {elapsed * 1000:.0f} ms")
+        if not args.interval:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Club (tenant) resolution for multi-club deployments.
+
+With TENANTS set, every request is bound to one club before it reaches the
+routers, and database.get_db / read_session open that club's database
+(see database.py, section 6). The club comes from, in order:
+
+1. the Host: the first label of usce.example.com, if it is a known club
+2. the X-Club header, for clients that talk to one shared API host
+   (login and refresh carry no access token yet)
+3. the `tid` claim of the bearer token, which login writes into every
+   access token
+
+The token's claim is read unverified here only to pick the database;
+utils.get_current_user verifies the signature and rejects a token whose
+`tid` is not the request's club. Requests that name no known club get 404
+from the first dependency that needs a database.
+
+Without TENANTS the middleware is not installed and everything runs against
+DATABASE_URL as before.
+"""
+
+from typing import Optional
+
+import database
+
+TENANT_HEADER = b"x-club"
+
+
+def _from_host(host: str) -> Optional[str]:
+    label = host.split(":", 1)[0].split(".", 1)[0].lower()
+    return label if label in database.TENANTS else None
+
+
+def _from_token(authorization: str) -> Optional[str]:
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    from jose import JWTError, jwt
+
+    try:
+        tenant = jwt.get_unverified_claims(token).get("tid")
+    except JWTError:
+        return None
+    return tenant if tenant in database.TENANTS else None
+
+
+def resolve(headers) -> Optional[str]:
+    """Club named by the request headers (list of (name, value) byte pairs), or None."""
+    values = {}
+    for key, value in headers:
+        if key in (b"host", TENANT_HEADER, b"authorization"):
+            values.setdefault(key, value.decode("latin-1"))
+    tenant = _from_host(values.get(b"host", ""))
+    if tenant is None:
+        header = values.get(TENANT_HEADER, "").strip().lower()
+        tenant = header if header in database.TENANTS else None
+    if tenant is None and b"authorization" in values:
+        tenant = _from_token(values[b"authorization"])
+    return tenant
+
+
+class TenantMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = database.current_tenant.set(resolve(scope["headers"]))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            database.current_tenant.reset(token)
@@ -0,0 +1,60 @@
+"""
+API tests: the app runs in-process (TestClient) against a temporary SQLite
+database, migrated by the lifespan like a real start.
+
+    cd backend && python -m pytest -q
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+_tmp = tempfile.mkdtemp(prefix="pk-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp, 'test.db')}")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_tmp, "uploads"))
+os.environ.setdefault("JOB_SCHEDULER", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+class Club:
+    """Owner, coach and parent with one child, created fresh for each test."""
+
+    def __init__(self, client: TestClient):
+        self.client = client
+        tag = uuid.uuid4().hex[:8]
+        self.owner = self.user(f"owner-{tag}@x.com", "OWNER")
+        self.coach = self.user(f"coach-{tag}@x.com", "COACH")
+        self.parent = self.user(f"parent-{tag}@x.com", "PARENT")
+        self.O, self.C, self.P = (self.login(u["email"]) for u in (self.owner, self.coach, self.parent))
+        self.member = client.post(
+            "/members/", json={"full_name": "Dete", "date_of_birth": "2015-01-01"}, headers=self.P,
+        ).json()
+
+    def user(self, email: str, role: str, full_name: str = None) -> dict:
+        r = self.client.post("/users/", json={
+            "email": email, "full_name": full_name or email.split("@")[0], "password": "pw12345", "role": role,
+        })
+        assert r.status_code in (200, 201), r.text
+        return r.json()
+
+    def login(self, email: str) -> dict:
+        r = self.client.post("/auth/token", data={"username": email, "password": "pw12345"})
+        assert r.status_code == 200, r.text
+        return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+@pytest.fixture
+def club(client) -> Club:
+    return Club(client)
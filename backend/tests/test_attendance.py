@@ -0,0 +1,36 @@
+def _take_attendance(client, club, days):
+    schedule = client.post("/schedules/", json={
+        "day_of_week": "PON", "start_time": "10:00:00", "end_time": "11:00:00", "capacity": 10,
+    }, headers=club.O).json()
+    r = client.post("/schedules/enrollments", json={
+        "member_id": club.member["id"], "schedule_id": schedule["id"], "start_date": "2025-01-01",
+    }, headers=club.O)
+    assert r.status_code == 201, r.text
+    for day in days:
+        r = client.post("/attendance/batch", json={
+            "schedule_id": schedule["id"], "date": day, "member_ids": [club.member["id"]],
+        }, headers=club.C)
+        assert r.status_code == 200, r.text
+
+
+def test_stats_filters_by_month_and_year(client, club):
+    _take_attendance(client, club, ["2025-11-30", "2025-12-01", "2025-12-31", "2026-01-01"])
+    url = f"/attendance/stats/{club.member['id']}"
+
+    def dates(**params):
+        r = client.get(url, params=params, headers=club.O)
+        assert r.status_code == 200, r.text
+        return [h["date"] for h in r.json()["history"]]
+
+    assert dates(month=12, year=2025) == ["2025-12-31", "2025-12-01"]
+    assert dates(year=2025) == ["2025-12-31", "2025-12-01", "2025-11-30"]
+    assert len(dates()) == 4
+    assert dates(month=12, year=9999) == []
+    assert dates(year=9999) == []
+
+
+def test_stats_rejects_bad_periods(client, club):
+    url = f"/attendance/stats/{club.member['id']}"
+    for params in ({"year": 0}, {"year": 10000}, {"month": 13, "year": 2025}, {"month": 0, "year": 2025},
+                   {"month": 5}):
+        assert client.get(url, params=params, headers=club.O).status_code == 422, params
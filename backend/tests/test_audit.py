@@ -0,0 +1,32 @@
+import asyncio
+
+import audit
+import jobs
+import retention
+
+
+def test_archive_job_records_one_summary_per_batch(client, club, monkeypatch):
+    for i in range(5):
+        r = client.post("/messages/", json={"content": f"stara {i}", "scope": "INTERNAL_STAFF"}, headers=club.C)
+        assert r.status_code == 201, r.text
+    client.portal.call(audit.flush)
+    last_id = client.get("/admin/audit", params={"limit": 1}, headers=club.O).json()[0]["id"]
+
+    monkeypatch.setattr(retention, "MESSAGE_RETENTION_DAYS", -1)
+    monkeypatch.setattr(retention, "MESSAGE_ARCHIVE_BATCH", 2)
+    r = client.post("/admin/jobs/archive_messages/run", headers=club.O)
+    assert r.status_code == 202, r.text
+
+    async def finish():
+        await asyncio.gather(*jobs._running)
+        await audit.flush()
+
+    client.portal.call(finish)
+    entries = [
+        e for e in client.get("/admin/audit", params={"limit": 200}, headers=club.O).json()
+        if e["id"] > last_id and e["source"] == "job:archive_messages"
+    ]
+    assert {(e["action"], e["entity"]) for e in entries} == {("archive", "messages")}
+    assert sum(e["changes"]["count"] for e in entries) >= 5
+    assert all(e["changes"]["count"] <= 2 for e in entries)
+    assert len({e["txn_id"] for e in entries}) == len(entries)  # One per batch transaction
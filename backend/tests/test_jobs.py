@@ -0,0 +1,28 @@
+import asyncio
+
+import audit
+import database
+import jobs
+
+
+def test_manual_run_does_not_inherit_the_request_context(client, club, monkeypatch):
+    seen = {}
+
+    async def probe(db):
+        seen.update(
+            user=database.current_user_id.get(),
+            writes=database.request_writes.get(),
+            tenant=database.current_tenant.get(),
+            source=audit.current_source.get(),
+        )
+        return "ok"
+
+    monkeypatch.setitem(jobs.JOBS, "probe", jobs.Job("probe", jobs.Cron("@daily"), "Test probe", probe))
+    r = client.post("/admin/jobs/probe/run", headers=club.O)
+    assert r.status_code == 202, r.text
+
+    async def wait():
+        await asyncio.gather(*jobs._running)
+
+    client.portal.call(wait)
+    assert seen == {"user": None, "writes": None, "tenant": None, "source": "job:probe"}
@@ -0,0 +1,49 @@
+import uuid
+
+import database
+import retention
+
+
+def _archive_all():
+    db = database.SessionLocal()
+    try:
+        retention.archive_messages(db, older_than_days=-1)
+    finally:
+        db.close()
+
+
+def test_archive_hides_other_peoples_direct_messages(client, club):
+    other_email = f"coach2-{uuid.uuid4().hex[:8]}@x.com"
+    other = club.user(other_email, "COACH")
+    r = client.post("/messages/", json={"content": "privatno", "scope": "DIRECT", "recipient_id": other["id"]},
+                    headers=club.P)
+    assert r.status_code == 201, r.text
+    r = client.post("/messages/", json={"content": "svima", "scope": "INTERNAL_STAFF"}, headers=club.O)
+    assert r.status_code == 201, r.text
+    _archive_all()
+
+    def archived(headers):
+        r = client.get("/messages/archive", params={"sender_id": club.parent["id"], "limit": 200}, headers=headers)
+        assert r.status_code == 200, r.text
+        staff = client.get("/messages/archive", params={"sender_id": club.owner["id"]}, headers=headers).json()
+        return [m["content"] for m in r.json()], [m["content"] for m in staff]
+
+    assert archived(club.login(other_email)) == (["privatno"], ["svima"])
+    assert archived(club.C) == ([], ["svima"])
+    assert archived(club.O) == ([], ["svima"])
+    assert client.get("/messages/archive", headers=club.P).status_code == 403
+
+
+def test_archive_survives_reused_message_ids(client, club):
+    # Archiving empties `messages`, so SQLite gives the next message an id that is already archived
+    sent = []
+    for content in ("prva", "druga"):
+        _archive_all()
+        r = client.post("/messages/", json={"content": content, "scope": "INTERNAL_STAFF"}, headers=club.C)
+        assert r.status_code == 201, r.text
+        sent.append(r.json()["id"])
+        _archive_all()
+    assert sent[0] == sent[1]
+
+    r = client.get("/messages/archive", params={"sender_id": club.coach["id"]}, headers=club.C)
+    assert [(m["content"], m["message_id"]) for m in r.json()] == [("druga", sent[1]), ("prva", sent[0])]
@@ -0,0 +1,10 @@
+def test_status_unknown_member_is_404_for_every_role(client, club):
+    for headers in (club.P, club.C, club.O):
+        assert client.get("/payments/status/999999", headers=headers).status_code == 404
+
+
+def test_status_ownership(client, club):
+    url = f"/payments/status/{club.member['id']}"
+    assert client.get(url, headers=club.P).status_code == 200
+    assert client.get(url, headers=club.O).status_code == 200
+    assert client.get(url, headers=club.C).status_code == 403
@@ -0,0 +1,24 @@
+import uuid
+
+
+def test_search_folds_non_ascii_names(client, club):
+    tag = uuid.uuid4().hex[:8]
+    saban = club.user(f"parent-{tag}@x.com", "PARENT", full_name="Šaban Šarić")
+    for q in ("Šab", "šab", "ŠABAN Š"):
+        r = client.get("/users/", params={"q": q, "limit": 500}, headers=club.O)
+        assert r.status_code == 200, r.text
+        assert saban["id"] in [u["id"] for u in r.json()], q
+
+    r = client.get("/users/", params={"q": "sab", "limit": 500}, headers=club.O)
+    assert saban["id"] not in [u["id"] for u in r.json()]
+
+
+def test_search_email_ignores_case(client, club):
+    tag = uuid.uuid4().hex[:8]
+    r = client.get("/users/", params={"q": f"email-{tag}"}, headers=club.O)
+    assert r.json() == []
+    user = club.user(f"Email-{tag}@x.com", "COACH", full_name="Đorđe Čolić")
+    r = client.get("/users/", params={"q": f"EMAIL-{tag}"}, headers=club.O)
+    assert [u["id"] for u in r.json()] == [user["id"]]
+    r = client.get("/users/", params={"q": "đorđe č", "limit": 500}, headers=club.O)
+    assert user["id"] in [u["id"] for u in r.json()]
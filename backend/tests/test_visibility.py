@@ -0,0 +1,56 @@
+import asyncio
+
+import database
+import visibility
+
+
+def _feed(client, club):
+    r = client.get("/messages/", headers=club.P)
+    assert r.status_code == 200, r.text
+    return [m["content"] for m in r.json()]
+
+
+def test_enrollment_changes_show_in_parents_feed(client, club, monkeypatch):
+    # The parent added the child just now; their reads would skip the cache
+    monkeypatch.setattr(database, "_primary_until", {})
+    schedule = client.post("/schedules/", json={
+        "day_of_week": "PON", "start_time": "10:00:00", "end_time": "11:00:00", "capacity": 10,
+    }, headers=club.O).json()
+    r = client.post("/messages/", json={"content": f"grupa {schedule['id']}", "scope": "GROUP_SCHEDULE",
+                                        "target_schedule_id": schedule["id"]}, headers=club.C)
+    assert r.status_code == 201, r.text
+    assert f"grupa {schedule['id']}" not in _feed(client, club)  # Cached: no schedules
+
+    # Written by staff: only the invalidation makes the parent see it
+    enrollment = client.post("/schedules/enrollments", json={
+        "member_id": club.member["id"], "schedule_id": schedule["id"], "start_date": "2026-01-01",
+    }, headers=club.O)
+    assert enrollment.status_code == 201, enrollment.text
+    assert f"grupa {schedule['id']}" in _feed(client, club)
+
+    r = client.put(f"/schedules/enrollments/{enrollment.json()['id']}/deactivate", headers=club.O)
+    assert r.status_code == 200, r.text
+    assert f"grupa {schedule['id']}" not in _feed(client, club)
+
+
+def test_load_racing_an_invalidation_is_not_kept(monkeypatch):
+    visibility.clear()
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_load(db, parent_id):
+        started.set()
+        await release.wait()
+        return frozenset({1})
+
+    monkeypatch.setattr(visibility, "_load_parent", slow_load)
+
+    async def scenario():
+        reader = asyncio.create_task(visibility.schedule_ids_for_parent(None, 42))
+        await started.wait()
+        visibility.invalidate_parent(42)  # Write committed while the old rows were in flight
+        release.set()
+        assert await reader == frozenset({1})
+        assert visibility._cached((None, 42)) is None
+        assert visibility._loading == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,207 @@
+"""
+Refresh tokens and the access-token revocation filter.
+
+Access tokens are short-lived JWTs checked purely in memory. Refresh tokens
+are opaque random strings stored hashed in `refresh_tokens` and rotated on
+every use; presenting an already rotated token revokes its whole family.
+Rotation is a conditional UPDATE, so of two concurrent refreshes with the
+same token only one rotates it. A token rotated less than
+REFRESH_REUSE_GRACE_SECONDS ago is not treated as reuse: clients that fire
+parallel refreshes when the access token expires get a sibling token in the
+same family instead of a logout.
+
+Revocations (deactivation, deletion) are written to `token_revocations`.
+Every process keeps a small user_id -> revoked_at map per club, reloaded from the
+table at most every REVOCATION_REFRESH_SECONDS, so revoking a user takes
+effect on all workers within seconds without a per-request query.
+"""
+
+import hashlib
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import database, models
+
+# ── Configuration ────────────────────────────────────────────
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 30))
+REFRESH_REUSE_GRACE_SECONDS = float(os.getenv("REFRESH_REUSE_GRACE_SECONDS", 10))
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", 5))
+# Revocations older than the longest access-token lifetime can't match any live token
+REVOCATION_WINDOW_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15)) + 1
+
+
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+# ── Refresh Tokens ───────────────────────────────────────────
+async def issue_refresh_token(db: AsyncSession, user_id: int, family_id: Optional[str] = None) -> Tuple[str, models.RefreshToken]:
+    """Creates (but does not commit) a refresh token, returns (plain token, row)."""
+    token = secrets.token_urlsafe(32)
+    row = models.RefreshToken(
+        user_id=user_id,
+        token_hash=_hash(token),
+        family_id=family_id or secrets.token_hex(8),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    db.add(row)
+    await db.flush()
+    return token, row
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> Optional[Tuple[str, models.RefreshToken]]:
+    """
+    Exchanges a refresh token for a new one in the same family.
+    Returns None if the token is unknown, expired or revoked; reuse of a
+    rotated token (outside the grace window) also revokes every token in its family.
+    """
+    now = datetime.utcnow()
+    row = await _find(db, token)
+    if row is None:
+        return None
+    if row.revoked_at is not None:
+        return await _reused(db, row, now)
+    if row.expires_at <= now:
+        return None
+
+    # Atomic claim: a concurrent refresh with the same token matches no row
+    claimed = await db.execute(
+        update(models.RefreshToken)
+        .where(models.RefreshToken.id == row.id, models.RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != 1:
+        await db.refresh(row)
+        return await _reused(db, row, now)
+
+    new_token, new_row = await issue_refresh_token(db, row.user_id, row.family_id)
+    row.revoked_at = now
+    row.replaced_by_id = new_row.id
+    return new_token, new_row
+
+
+async def _reused(db: AsyncSession, row: models.RefreshToken, now: datetime) -> Optional[Tuple[str, models.RefreshToken]]:
+    """A revoked token was presented again."""
+    if row.replaced_by_id is None:
+        return None  # Logged out or revoked, not rotated
+
+    if now - row.revoked_at <= timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS) and row.expires_at > now:
+        # Parallel refresh right after rotation; only while the family is still live
+        live = await db.scalar(
+            select(models.RefreshToken.id)
+            .where(models.RefreshToken.family_id == row.family_id, models.RefreshToken.revoked_at.is_(None))
+            .limit(1)
+        )
+        return await issue_refresh_token(db, row.user_id, row.family_id) if live is not None else None
+
+    await revoke_family(db, row.family_id)
+    await db.commit()
+    return None
+
+
+async def revoke_refresh_token(db: AsyncSession, token: str):
+    row = await _find(db, token)
+    if row is not None and row.revoked_at is None:
+        row.revoked_at = datetime.utcnow()
+
+
+async def revoke_family(db: AsyncSession, family_id: str):
+    await db.execute(
+        update(models.RefreshToken)
+        .where(models.RefreshToken.family_id == family_id, models.RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def _find(db: AsyncSession, token: str) -> Optional[models.RefreshToken]:
+    return await db.scalar(select(models.RefreshToken).where(models.RefreshToken.token_hash == _hash(token)))
+
+
+# ── Revocation Filter ────────────────────────────────────────
+# club -> user_id -> unix time; tokens issued before are invalid
+_revoked_after: Dict[Optional[str], Dict[int, float]] = {}
+_loaded_at: Dict[Optional[str], float] = {}
+_revocation_lock = threading.Lock()
+
+
+async def revoke_user(db: AsyncSession, user_id: int):
+    """Revokes all access and refresh tokens of a user (caller commits)."""
+    now = datetime.utcnow()
+    db.add(models.TokenRevocation(user_id=user_id, revoked_at=now))
+    await db.execute(
+        update(models.RefreshToken)
+        .where(models.RefreshToken.user_id == user_id, models.RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    # Applied to this worker's filter once the caller's commit succeeds
+    db.info.setdefault("revoked_users", []).append((database.current_tenant.get(), user_id, _epoch(now)))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_revocations(session: Session):
+    for tenant, user_id, revoked_at in session.info.pop("revoked_users", ()):
+        _remember(tenant, user_id, revoked_at)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_revocations(session: Session):
+    session.info.pop("revoked_users", None)
+
+
+async def is_revoked(db: AsyncSession, user_id: int, issued_at: float) -> bool:
+    await _refresh_if_stale(db)
+    revoked_after = _revoked_after.get(database.current_tenant.get(), {}).get(user_id)
+    return revoked_after is not None and issued_at <= revoked_after
+
+
+async def _refresh_if_stale(db: AsyncSession):
+    tenant = database.current_tenant.get()
+    if time.monotonic() - _loaded_at.get(tenant, 0.0) < REVOCATION_REFRESH_SECONDS:
+        return
+
+    since = datetime.utcnow() - timedelta(minutes=REVOCATION_WINDOW_MINUTES)
+    rows = await db.execute(
+        select(models.TokenRevocation.user_id, func.max(models.TokenRevocation.revoked_at))
+        .where(models.TokenRevocation.revoked_at >= since)
+        .group_by(models.TokenRevocation.user_id)
+    )
+    fresh = {user_id: _epoch(revoked_at) for user_id, revoked_at in rows}
+    with _revocation_lock:
+        _revoked_after[tenant] = fresh
+        _loaded_at[tenant] = time.monotonic()
+
+
+def _remember(tenant: Optional[str], user_id: int, revoked_at: float):
+    with _revocation_lock:
+        revoked = _revoked_after.setdefault(tenant, {})
+        revoked[user_id] = max(revoked_at, revoked.get(user_id, 0.0))
+
+
+def _epoch(value: datetime) -> float:
+    # Stored as naive UTC
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+async def purge_expired(db: AsyncSession) -> int:
+    """Deletes expired refresh tokens and stale revocations, returns rows removed."""
+    now = datetime.utcnow()
+    removed = (await db.execute(
+        delete(models.RefreshToken).where(models.RefreshToken.expires_at < now)
+    )).rowcount
+    removed += (await db.execute(
+        delete(models.TokenRevocation)
+        .where(models.TokenRevocation.revoked_at < now - timedelta(minutes=REVOCATION_WINDOW_MINUTES))
+    )).rowcount
+    await db.commit()
+    return removed
@@ -1,73 +1,277 @@
+import asyncio
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, FrozenSet, Optional, Set, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-import models
-from database import SessionLocal
+import models, tokens
+import database
 
 # ── Configuration ────────────────────────────────────────────
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))  # Renewed via /auth/refresh
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", 2))  # Concurrent bcrypt operations
+PASSWORD_MAX_QUEUE = int(os.getenv("PASSWORD_MAX_QUEUE", 64))  # Waiting beyond this -> 503
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 1024))
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", 60))  # seconds
 
 # ── Password Hashing ────────────────────────────────────────
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Changing BCRYPT_ROUNDS marks older hashes as needing an update; they are
+# rehashed on the next successful login. passlib is imported on first use so
+# it stays out of the cold start.
+_pwd_context = None
+
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    return _pwd_context
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+# bcrypt is deliberately slow (~250 ms), so request handlers run it in a small
+# dedicated pool instead of on the event loop. The semaphore caps concurrent
+# hashes at the pool size; callers beyond PASSWORD_MAX_QUEUE get a 503.
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+_password_slots = asyncio.Semaphore(PASSWORD_WORKERS)
+_password_waiting = 0
+
+# Queue-time metric: how long callers wait before their hash starts running
+password_metrics = {
+    "calls": 0,
+    "rejected": 0,
+    "queue_seconds_total": 0.0,
+    "queue_seconds_max": 0.0,
+}
+
+async def _run_password_job(func, *args):
+    global _password_waiting
+    if _password_waiting >= PASSWORD_MAX_QUEUE:
+        password_metrics["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again",
+            headers={"Retry-After": "2"},
+        )
+
+    queued_at = time.perf_counter()
+    _password_waiting += 1
+    try:
+        await _password_slots.acquire()
+    finally:
+        _password_waiting -= 1
+
+    try:
+        waited = time.perf_counter() - queued_at
+        password_metrics["calls"] += 1
+        password_metrics["queue_seconds_total"] += waited
+        password_metrics["queue_seconds_max"] = max(password_metrics["queue_seconds_max"], waited)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, func, *args)
+    finally:
+        _password_slots.release()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_job(get_pwd_context().verify, plain_password, hashed_password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Returns (is_valid, new_hash); new_hash is set when the stored hash uses an outdated cost."""
+    return await _run_password_job(get_pwd_context().verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_password_job(get_pwd_context().hash, password)
 
 # ── JWT Token ────────────────────────────────────────────────
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    from jose import jwt  # Lazy: python-jose pulls in cryptography (~50 ms at import)
+
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    # Fractional iat so a login right after a revocation is not mistaken for an older token
+    to_encode.update({"exp": expire, "iat": time.time()})
+    tenant = database.current_tenant.get()
+    if tenant is not None:
+        to_encode.setdefault("tid", tenant)  # The club the token is valid for
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 # ── Database Dependency ──────────────────────────────────────
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+get_db = database.get_db
+
+# ── Authenticated Principal ──────────────────────────────────
+@dataclass(frozen=True)
+class Principal:
+    """Detached snapshot of the logged-in user, safe to cache across requests."""
+    id: int
+    email: str
+    full_name: str
+    role: models.Role
+    is_active: bool
+    phone_number: Optional[str]
+    member_ids: FrozenSet[int]
+
+    def owns_member(self, member_id: int) -> bool:
+        return member_id in self.member_ids
+
+
+# (club, token) -> (expires_at, issued_at, principal); bounded LRU with per-entry TTL
+_principal_cache: "OrderedDict[Tuple[Optional[str], str], Tuple[float, float, Principal]]" = OrderedDict()
+_tokens_by_user: Dict[Tuple[Optional[str], int], Set[Tuple[Optional[str], str]]] = {}
+_principal_lock = threading.Lock()
+
+
+def _cache_get(token: str) -> Optional[Tuple[float, Principal]]:
+    key = (database.current_tenant.get(), token)
+    with _principal_lock:
+        entry = _principal_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, issued_at, principal = entry
+        if expires_at <= time.monotonic():
+            _cache_drop(key)
+            return None
+        _principal_cache.move_to_end(key)
+        return issued_at, principal
+
+
+def _cache_put(token: str, principal: Principal, issued_at: float, token_exp: Optional[float]):
+    ttl = PRINCIPAL_CACHE_TTL
+    if token_exp is not None:
+        ttl = min(ttl, token_exp - time.time())
+    if ttl <= 0:
+        return
+    tenant = database.current_tenant.get()
+    key = (tenant, token)
+    with _principal_lock:
+        _principal_cache[key] = (time.monotonic() + ttl, issued_at, principal)
+        _principal_cache.move_to_end(key)
+        _tokens_by_user.setdefault((tenant, principal.id), set()).add(key)
+        while len(_principal_cache) > PRINCIPAL_CACHE_SIZE:
+            _cache_drop(next(iter(_principal_cache)))
+
+
+def _cache_drop(key: Tuple[Optional[str], str]):
+    # Caller holds _principal_lock
+    entry = _principal_cache.pop(key, None)
+    if entry is not None:
+        user_key = (key[0], entry[2].id)
+        user_tokens = _tokens_by_user.get(user_key)
+        if user_tokens is not None:
+            user_tokens.discard(key)
+            if not user_tokens:
+                del _tokens_by_user[user_key]
+
+
+def invalidate_user(user_id: Optional[int]):
+    """Forget cached principals of a user after their account or children change."""
+    if user_id is None:
+        return
+    with _principal_lock:
+        for key in list(_tokens_by_user.get((database.current_tenant.get(), user_id), ())):
+            _cache_drop(key)
+
+
+async def _load_principal(db: AsyncSession, email: str) -> Optional[Principal]:
+    user = await db.scalar(select(models.User).where(models.User.email == email))
+    if user is None:
+        return None
+    member_ids = await db.execute(select(models.Member.id).where(models.Member.parent_id == user.id))
+    return Principal(
+        id=user.id,
+        email=user.email,
+        full_name=user.full_name,
+        role=user.role,
+        is_active=bool(user.is_active),
+        phone_number=user.phone_number,
+        member_ids=frozenset(row[0] for row in member_ids),
+    )
+
 
 # ── Current User Dependencies ────────────────────────────────
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> models.User:
+    db: AsyncSession = Depends(get_db),
+) -> Principal:
+    return await _authenticate(token, db)
+
+async def _authenticate(token: str, db: AsyncSession) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+    cached = _cache_get(token)
+    if cached is not None:
+        issued_at, principal = cached
+        if await tokens.is_revoked(db, principal.id, issued_at):
+            raise credentials_exception
+        database.current_user_id.set(principal.id)
+        return principal
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
+        # A token only opens the club it was issued for
+        if payload.get("tid") != database.current_tenant.get():
+            raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if user is None:
+    issued_at = float(payload.get("iat") or 0)
+    user_id = payload.get("uid")
+    if user_id is not None and await tokens.is_revoked(db, user_id, issued_at):
+        raise credentials_exception
+
+    principal = await _load_principal(db, email)
+    if principal is None or await tokens.is_revoked(db, principal.id, issued_at):
         raise credentials_exception
-    return user
+    _cache_put(token, principal, issued_at, payload.get("exp"))
+    database.current_user_id.set(principal.id)
+    return principal
 
 async def get_current_active_user(
-    current_user: models.User = Depends(get_current_user),
-) -> models.User:
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+async def get_stream_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    Active user for long-lived responses (SSE): the session used to check the
+    token is closed before the stream starts, so an open stream holds no pooled
+    connection (a get_db dependency would stay open until the response ends).
+    """
+    async with database.primary_session() as db:
+        principal = await _authenticate(token, db)
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return principal
+
+
+# ── Read-only Dependency ─────────────────────────────────────
+async def get_read_db(current_user: Principal = Depends(get_current_user)):
+    """Session for GET routes: a replica, or the primary right after this user's write."""
+    async with database.read_session(current_user.id) as db:
+        yield db
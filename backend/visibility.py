@@ -0,0 +1,147 @@
+"""
+Per-process index of which schedules each parent can see.
+
+Maps parent_id -> active schedule ids of that parent's children, so
+parent-scoped queries (messages) don't have to walk User -> Member ->
+Enrollment on every request. Entries are loaded lazily with one query per
+parent; a cached read costs no query at all.
+
+Writes that change a parent's active enrollments drop that parent's entry
+after their commit (invalidate_parent / schedule_removed), so the worker
+that made the change sees it at once. Other workers keep their entry until
+it expires after VISIBILITY_CACHE_TTL seconds, the same bound as the
+principal cache (utils.PRINCIPAL_CACHE_TTL); a parent who just wrote skips
+the cache while their reads go to the primary (database.reads_from_primary).
+
+Loads of one parent are single-flight per worker. A load that was running
+when its parent was invalidated returns its rows but doesn't keep them, so
+it can't install a set from before the write.
+
+The index holds at most VISIBILITY_CACHE_SIZE parents (least recently used
+are dropped first).
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database, models
+
+VISIBILITY_CACHE_SIZE = int(os.getenv("VISIBILITY_CACHE_SIZE", 10000))
+VISIBILITY_CACHE_TTL = float(os.getenv("VISIBILITY_CACHE_TTL", 60))  # seconds
+
+Key = Tuple[Optional[str], int]
+
+
+class _Load:
+    """A load in flight for one parent, shared by the requests waiting on it."""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+        self.stale = False  # Parent invalidated while loading
+
+
+# (club, parent_id) -> (expires_at, active schedule ids)
+_index: "OrderedDict[Key, Tuple[float, FrozenSet[int]]]" = OrderedDict()
+_loading: Dict[Key, _Load] = {}
+_lock = threading.Lock()
+
+
+def _key(parent_id: int) -> Key:
+    return database.current_tenant.get(), parent_id
+
+
+async def _load_parent(db: AsyncSession, parent_id: int) -> FrozenSet[int]:
+    rows = await db.scalars(
+        select(models.Enrollment.schedule_id)
+        .join(models.Member, models.Member.id == models.Enrollment.member_id)
+        .where(
+            models.Member.parent_id == parent_id,
+            models.Enrollment.active == True,
+        )
+    )
+    return frozenset(rows)
+
+
+def _cached(key: Key) -> Optional[FrozenSet[int]]:
+    with _lock:
+        entry = _index.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        _index.move_to_end(key)
+        return entry[1]
+
+
+def _install(key: Key, schedule_ids: FrozenSet[int]):
+    with _lock:
+        _index[key] = (time.monotonic() + VISIBILITY_CACHE_TTL, schedule_ids)
+        _index.move_to_end(key)
+        while len(_index) > VISIBILITY_CACHE_SIZE:
+            _index.popitem(last=False)
+
+
+# ── Reads ────────────────────────────────────────────────────
+async def schedule_ids_for_parent(db: AsyncSession, parent_id: int) -> FrozenSet[int]:
+    """Active schedule ids for the parent's children (cached)."""
+    key = _key(parent_id)
+    bypass = database.reads_from_primary(parent_id)
+    if not bypass:
+        schedule_ids = _cached(key)
+        if schedule_ids is not None:
+            return schedule_ids
+
+    load = _loading.setdefault(key, _Load())
+    load.users += 1
+    try:
+        async with load.lock:
+            # Another request may have loaded it while this one waited
+            schedule_ids = None if bypass else _cached(key)
+            if schedule_ids is None:
+                load.stale = False
+                schedule_ids = await _load_parent(db, parent_id)
+                if not load.stale:
+                    _install(key, schedule_ids)
+    finally:
+        load.users -= 1
+        if load.users == 0 and _loading.get(key) is load:
+            del _loading[key]
+    return schedule_ids
+
+
+# ── Invalidation (called after a successful commit) ──────────
+def invalidate_parent(parent_id: Optional[int]):
+    """Drops a parent's entry after their children or enrollments change."""
+    if parent_id is None:
+        return
+    key = _key(parent_id)
+    with _lock:
+        _index.pop(key, None)
+    load = _loading.get(key)
+    if load is not None:
+        load.stale = True
+
+
+def schedule_removed(schedule_id: int):
+    """Drops the entries of every parent that could see a deleted schedule."""
+    tenant = database.current_tenant.get()
+    with _lock:
+        parents = [key for key, (_, ids) in _index.items() if key[0] == tenant and schedule_id in ids]
+        for key in parents:
+            del _index[key]
+    for (club, _), load in list(_loading.items()):
+        if club == tenant:
+            load.stale = True
+
+
+def clear():
+    with _lock:
+        _index.clear()
+    for load in _loading.values():
+        load.stale = True
@@ -9,6 +9,14 @@ class ApiClient {
   final Dio _dio;
   final FlutterSecureStorage _storage;
 
+  // Refresh in flight; parallel 401s wait for it instead of rotating again
+  Future<String?>? _refreshing;
+
+  // Signed "read from the primary until" stamp from our last write; sent back
+  // so the next reads see that write on every server worker
+  static const String _readAfterHeader = 'X-Read-After';
+  static String? _readAfter;
+
   ApiClient()
     : _dio = Dio(BaseOptions(baseUrl: baseUrl)),
       _storage = const FlutterSecureStorage() {
@@ -20,10 +28,35 @@ class ApiClient {
           if (token != null) {
             options.headers['Authorization'] = 'Bearer $token';
           }
+          if (_readAfter != null) {
+            options.headers[_readAfterHeader] = _readAfter;
+          }
           return handler.next(options);
         },
-        onError: (DioException e, handler) {
-          // Handle 401 Unauthorized (Logout flow could trigger here)
+        onResponse: (response, handler) {
+          final readAfter = response.headers.value(_readAfterHeader);
+          if (readAfter != null) {
+            _readAfter = readAfter;
+          }
+          return handler.next(response);
+        },
+        onError: (DioException e, handler) async {
+          // 401: access token expired -> try once with a refreshed token
+          final isAuthCall = e.requestOptions.path.startsWith('/auth/');
+          final alreadyRetried = e.requestOptions.extra['retried'] == true;
+          if (e.response?.statusCode == 401 && !isAuthCall && !alreadyRetried) {
+            final newToken = await _freshAccessToken(e.requestOptions);
+            if (newToken != null) {
+              final options = e.requestOptions;
+              options.headers['Authorization'] = 'Bearer $newToken';
+              options.extra['retried'] = true;
+              try {
+                return handler.resolve(await _dio.fetch(options));
+              } on DioException catch (retryError) {
+                return handler.next(retryError);
+              }
+            }
+          }
           return handler.next(e);
         },
       ),
@@ -32,12 +65,48 @@ class ApiClient {
 
   Dio get dio => _dio;
 
+  // Access token to retry with: the one another request already refreshed,
+  // or the result of the single shared refresh
+  Future<String?> _freshAccessToken(RequestOptions failed) async {
+    final current = await _storage.read(key: 'access_token');
+    if (current != null && failed.headers['Authorization'] != 'Bearer $current') {
+      return current;
+    }
+    return _refreshing ??= _refreshAccessToken().whenComplete(() => _refreshing = null);
+  }
+
+  // Rotates the refresh token; returns the new access token or null
+  Future<String?> _refreshAccessToken() async {
+    final refreshToken = await _storage.read(key: 'refresh_token');
+    if (refreshToken == null) return null;
+
+    try {
+      final response = await Dio(BaseOptions(baseUrl: baseUrl)).post(
+        '/auth/refresh',
+        data: {'refresh_token': refreshToken},
+      );
+      final accessToken = response.data['access_token'] as String;
+      await setToken(accessToken);
+      await setRefreshToken(response.data['refresh_token'] as String?);
+      return accessToken;
+    } on DioException {
+      await clearToken();
+      return null;
+    }
+  }
+
   Future<void> setToken(String token) async {
     await _storage.write(key: 'access_token', value: token);
   }
 
+  Future<void> setRefreshToken(String? token) async {
+    if (token == null) return;
+    await _storage.write(key: 'refresh_token', value: token);
+  }
+
   Future<void> clearToken() async {
     await _storage.delete(key: 'access_token');
+    await _storage.delete(key: 'refresh_token');
   }
 
   Future<String?> getToken() async {
@@ -41,6 +41,7 @@ class AuthProvider with ChangeNotifier {
 
       // Save token using ApiClient (FlutterSecureStorage)
       await _apiClient.setToken(_token!);
+      await _apiClient.setRefreshToken(data['refresh_token']);
 
       // Fetch user profile
       await _fetchMe();